@@ -0,0 +1,240 @@
+"""
+Time the main endpoints on generated tenants and check them against budgets.
+
+    python -m benchmarks.endpoints                      # check against baseline.json
+    python -m benchmarks.endpoints --sizes small        # one tenant size
+    python -m benchmarks.endpoints --update             # record a new baseline
+
+For every tenant size a fresh SQLite database is filled with
+``flask paysync gen-data``'s generator, then each endpoint is called
+through the Flask test client: latency percentiles over a few timed
+calls (fewer for bigger tenants), plus SQL statements and peak Python
+memory of one extra call.
+
+Query counts are exact budgets. Latency and memory may exceed theirs by
+the baseline's tolerances; latencies are machine dependent, so record
+the baseline on the machine that runs the check. Exits 1 when any
+endpoint is over budget or stops answering 2xx.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# Before the app is imported: no emails leave the machine, no real database is touched
+os.environ["NOTIFICATION_TRANSPORT"] = "fake"
+BENCH_DIR = tempfile.mkdtemp(prefix="paysync-bench-")
+os.environ["FLASK_SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(BENCH_DIR, 'bench.db')}"
+
+import logging  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from server.app import create_app  # noqa: E402
+from server.extension import db  # noqa: E402
+from server.models import Business, Customer, Debt, User  # noqa: E402
+from server.service.data_generator import GENERATED_PASSWORD, generate  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Tenant sizes (businesses x customers per business x debts per customer)
+# and timed calls per endpoint at that size
+SIZES = {
+    "small": {"tenant": {"businesses": 2, "customers": 50, "debts": 4}, "repeat": 10},
+    "medium": {"tenant": {"businesses": 2, "customers": 250, "debts": 4}, "repeat": 5},
+    "large": {"tenant": {"businesses": 2, "customers": 1000, "debts": 5}, "repeat": 2},
+}
+
+# Fixed "today" so every run generates the same data
+AS_OF = datetime(2026, 1, 15)
+
+# Relative headroom over the recorded budgets, plus absolute slack for fast endpoints' jitter
+DEFAULT_TOLERANCE = {"latency": 0.5, "latency_ms": 25, "memory": 0.25}
+
+
+class Endpoint:
+    def __init__(self, method, path, role, repeat=None, body=None):
+        self.method = method
+        self.path = path
+        self.role = role
+        self.repeat = repeat  # at most this many timed calls
+        self.body = body
+
+    def name(self):
+        return f"{self.method} {self.path}"
+
+
+ENDPOINTS = [
+    Endpoint("GET", "/debts", "owner"),
+    Endpoint("GET", "/dashboard-owner", "owner"),
+    Endpoint("GET", "/dashboard-manager?business_id={business_id}", "admin"),
+    Endpoint("GET", "/dashboard-salesman", "salesperson"),
+    Endpoint("GET", "/changelogs", "owner"),
+    Endpoint("GET", "/customers/{customer_id}", "owner"),
+    Endpoint("POST", "/payments", "salesperson", body=lambda ids: {"debt_id": ids["debt_id"], "amount": 1, "method": "cash"}),
+    Endpoint("GET", "/export/business", "owner", repeat=5),
+    # Renders a PDF per open debt
+    Endpoint("POST", "/reminders/run", "owner", repeat=2),
+]
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def prepare(app, size):
+    """Fresh database with a generated tenant; returns the ids the endpoints need."""
+    db.drop_all()
+    db.create_all()
+    generate(db.session, seed=0, as_of=AS_OF, **SIZES[size]["tenant"])
+
+    business = Business.query.order_by(Business.id).first()
+    users = {
+        role: User.query.filter_by(business_id=business.id, role=role).order_by(User.id).first()
+        for role in ("owner", "admin", "salesperson")
+    }
+    customer = Customer.query.filter_by(business_id=business.id).order_by(Customer.id).first()
+    debt = Debt.query.filter_by(business_id=business.id, created_by=users["salesperson"].id).order_by(Debt.id).first()
+    db.session.remove()
+
+    client = app.test_client()
+    headers = {}
+    for role, user in users.items():
+        response = client.post("/login", json={"email": user.email, "password": GENERATED_PASSWORD})
+        headers[role] = {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+    ids = {"business_id": business.id, "customer_id": customer.id, "debt_id": debt.id}
+    return client, headers, ids
+
+
+def call(client, endpoint, headers, ids):
+    path = endpoint.path.format(**ids)
+    body = endpoint.body(ids) if endpoint.body else None
+    response = client.open(path, method=endpoint.method, headers=headers[endpoint.role], json=body)
+    db.session.remove()
+    return response.status_code
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(round(fraction * (len(values) - 1))), len(values) - 1)]
+
+
+def measure(client, endpoint, headers, ids, counter, repeat):
+    status = call(client, endpoint, headers, ids)  # warm-up (serializer compilation, caches)
+
+    timings = []
+    for _ in range(min(endpoint.repeat or repeat, repeat)):
+        start = time.perf_counter()
+        status = call(client, endpoint, headers, ids)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    counter.count = 0
+    tracemalloc.start()
+    call(client, endpoint, headers, ids)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "status": status,
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "max_ms": round(max(timings), 2),
+        "queries": counter.count,
+        "peak_kb": round(peak / 1024),
+    }
+
+
+def run(sizes, repeat):
+    app = create_app()
+    results = {}
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+        for size in sizes:
+            client, headers, ids = prepare(app, size)
+            size_repeat = repeat or SIZES[size]["repeat"]
+            debts = Debt.query.filter_by(business_id=ids["business_id"]).count()
+            db.session.remove()
+            print(f"\n{size}: {debts} debts in the measured business")
+
+            endpoints = {}
+            for endpoint in ENDPOINTS:
+                endpoints[endpoint.name()] = result = measure(client, endpoint, headers, ids, counter, size_repeat)
+                print(f"  {endpoint.name():<48} {result['status']}  p50 {result['p50_ms']:8.1f} ms  "
+                      f"p95 {result['p95_ms']:8.1f} ms  {result['queries']:5d} queries  {result['peak_kb']:7d} KiB")
+            results[size] = {"tenant": SIZES[size]["tenant"], "debts": debts, "endpoints": endpoints}
+    return results
+
+
+def check(results, baseline):
+    """Budget violations of ``results`` against ``baseline``."""
+    tolerance = {**DEFAULT_TOLERANCE, **baseline.get("tolerance", {})}
+    failures = []
+    for size, result in results.items():
+        budgets = baseline.get("sizes", {}).get(size, {}).get("endpoints", {})
+        for name, measured in result["endpoints"].items():
+            budget = budgets.get(name)
+            if budget is None:
+                failures.append(f"{size} {name}: no budget recorded (run with --update)")
+                continue
+            where = f"{size} {name}"
+            if 200 <= budget["status"] < 300 and not 200 <= measured["status"] < 300:
+                failures.append(f"{where}: status {measured['status']}, was {budget['status']}")
+            if measured["queries"] > budget["queries"]:
+                failures.append(f"{where}: {measured['queries']} queries, budget {budget['queries']}")
+            if measured["p95_ms"] > budget["p95_ms"] * (1 + tolerance["latency"]) + tolerance["latency_ms"]:
+                failures.append(f"{where}: p95 {measured['p95_ms']} ms, budget {budget['p95_ms']} ms")
+            if measured["peak_kb"] > budget["peak_kb"] * (1 + tolerance["memory"]):
+                failures.append(f"{where}: peak {measured['peak_kb']} KiB, budget {budget['peak_kb']} KiB")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(SIZES), help="Comma separated tenant sizes")
+    parser.add_argument("--repeat", type=int, help="Timed calls per endpoint (default: per size)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update", action="store_true", help="Write the results as the new baseline")
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+
+    logging.disable(logging.CRITICAL)
+    results = run(sizes, args.repeat)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.update:
+        baseline["tolerance"] = {**DEFAULT_TOLERANCE, **baseline.get("tolerance", {})}
+        baseline.setdefault("sizes", {}).update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    failures = check(results, baseline)
+    if failures:
+        print("\nOver budget:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll endpoints within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+HTTP load test against a local server.
+
+    python -m benchmarks.load_test --prepare --users 20 --duration 60
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --business-id 3
+
+Without ``--url`` a gunicorn (``wsgi:app``) is started on ``--port``
+against ``--database`` with the fake notification transport (slowed by
+``--notify-latency-ms`` if given); ``--prepare`` first fills that
+database with generated tenants. Each virtual user logs in as the owner,
+admin or a salesperson of the business and replays a weighted mix of
+requests until the time is up.
+
+Reports requests per second, error rate, latency percentiles and a
+latency histogram per endpoint; ``--json`` also writes them to a file.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import requests
+
+from server.service.data_generator import GENERATED_PASSWORD, generated_email
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open
+HISTOGRAM_MS = (10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# (weight, name, method, path) per role; paths are filled in by the scenario
+MIXES = {
+    "owner": [
+        (30, "list debts", "GET", "/debts"),
+        (10, "list debts (summary)", "GET", "/debts?view=summary"),
+        (15, "owner dashboard", "GET", "/dashboard-owner"),
+        (10, "list customers", "GET", "/customers"),
+        (10, "communications", "GET", "/communications"),
+        (10, "changelogs", "GET", "/changelogs"),
+        (10, "record payment", "POST", "/payments"),
+        (5, "create debt", "POST", "/debts"),
+    ],
+    "admin": [
+        (35, "list debts", "GET", "/debts"),
+        (20, "manager dashboard", "GET", "/dashboard-manager?business_id={business_id}"),
+        (15, "list payments", "GET", "/payments"),
+        (20, "record payment", "POST", "/payments"),
+        (10, "create debt", "POST", "/debts"),
+    ],
+    "salesperson": [
+        (30, "list debts (summary)", "GET", "/debts?view=summary"),
+        (20, "salesman dashboard", "GET", "/dashboard-salesman"),
+        (25, "record payment", "POST", "/payments"),
+        (20, "create debt", "POST", "/debts"),
+        (5, "communications", "GET", "/communications"),
+    ],
+}
+
+# Share of virtual users per role
+ROLE_WEIGHTS = (("owner", 1), ("admin", 2), ("salesperson", 5))
+
+ITEMS = (("Cement 50kg", "Building", 750), ("Nails 1kg", "Building", 200), ("Paint 4L", "Finishing", 2500))
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name, status, elapsed_ms):
+        with self.lock:
+            self.latencies[name].append(elapsed_ms)
+            self.statuses[name][status] += 1
+            if status == 0 or status >= 400:
+                self.errors[name] += 1
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(round(fraction * (len(values) - 1))), len(values) - 1)]
+
+
+def histogram(values):
+    counts = [0] * (len(HISTOGRAM_MS) + 1)
+    for value in values:
+        for index, bound in enumerate(HISTOGRAM_MS):
+            if value < bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"<{bound}ms" for bound in HISTOGRAM_MS] + [f">={HISTOGRAM_MS[-1]}ms"]
+    return dict(zip(labels, counts))
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, base_url, role, token, context, stats, deadline, think_time, seed):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.role = role
+        self.context = context
+        self.stats = stats
+        self.deadline = deadline
+        self.think_time = think_time
+        self.rng = random.Random(seed)
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {token}"
+        self.mix = MIXES[role]
+        self.weights = [weight for weight, *_ in self.mix]
+
+    def body(self, path):
+        if path == "/payments":
+            return {"debt_id": self.rng.choice(self.context["debt_ids"]), "amount": self.rng.choice((50, 100, 250)), "method": "cash"}
+        if path == "/debts":
+            name, category, price = self.rng.choice(ITEMS)
+            due = datetime.utcnow() + timedelta(days=self.rng.choice((7, 14, 30)))
+            return {
+                "customer_id": self.rng.choice(self.context["customer_ids"]),
+                "due_date": due.strftime("%Y-%m-%d"),
+                "items": [{"name": name, "category": category, "price": price, "quantity": self.rng.randint(1, 5)}],
+            }
+        return None
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            _, name, method, path = self.rng.choices(self.mix, self.weights)[0]
+            body = self.body(path) if method == "POST" else None
+            url = self.base_url + path.format(**self.context)
+            start = time.perf_counter()
+            try:
+                status = self.session.request(method, url, json=body, timeout=30).status_code
+            except requests.RequestException:
+                status = 0
+            self.stats.record(name, status, (time.perf_counter() - start) * 1000)
+            if self.think_time:
+                time.sleep(self.rng.uniform(0, self.think_time))
+
+
+def login(base_url, email):
+    response = requests.post(f"{base_url}/login", json={"email": email, "password": GENERATED_PASSWORD}, timeout=30)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def load_context(base_url, token, business_id):
+    """Ids the write requests pick from."""
+    headers = {"Authorization": f"Bearer {token}"}
+    debts = requests.get(f"{base_url}/debts?fields=id,balance", headers=headers, timeout=120).json()
+    customers = requests.get(f"{base_url}/customers?fields=id", headers=headers, timeout=120).json()
+    debt_ids = [debt["id"] for debt in debts if debt["balance"] > 0] or [debt["id"] for debt in debts]
+    if not debt_ids or not customers["customers"]:
+        raise SystemExit(f"Business {business_id} has no debts or customers; run with --prepare")
+    return {"business_id": business_id, "debt_ids": debt_ids, "customer_ids": [c["id"] for c in customers["customers"]]}
+
+
+def prepare_database(database_url, args):
+    os.environ["FLASK_SQLALCHEMY_DATABASE_URI"] = database_url
+    from server.app import create_app
+    from server.extension import db
+    from server.service.data_generator import generate
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        stats = generate(db.session, args.businesses, args.customers, args.debts, seed=args.seed)
+    print(f"Prepared {stats.businesses} businesses, {stats.debts} debts")
+
+
+def wait_until_up(base_url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("gunicorn exited during startup")
+        try:
+            requests.get(base_url + "/", timeout=2)
+            return
+        except requests.RequestException:
+            time.sleep(0.5)
+    raise SystemExit("gunicorn did not start in time")
+
+
+def start_server(database_url, args):
+    if not shutil.which("gunicorn"):
+        raise SystemExit("gunicorn is not installed; start a server yourself and pass --url")
+    env = {
+        **os.environ,
+        "FLASK_SQLALCHEMY_DATABASE_URI": database_url,
+        "NOTIFICATION_TRANSPORT": "fake",
+        "NOTIFICATION_FAKE_LATENCY_MS": str(args.notify_latency_ms),
+    }
+    command = [
+        "gunicorn", "wsgi:app", "--bind", f"127.0.0.1:{args.port}",
+        "--workers", str(args.workers), "--threads", str(args.threads), "--log-level", "warning",
+    ]
+    process = subprocess.Popen(command, env=env)
+    wait_until_up(f"http://127.0.0.1:{args.port}", process)
+    return process
+
+
+def report(stats, elapsed):
+    total = sum(len(values) for values in stats.latencies.values())
+    errors = sum(stats.errors.values())
+    results = {
+        "duration_s": round(elapsed, 1),
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "error_rate": round(errors / total, 4) if total else 0,
+        "endpoints": {},
+    }
+    print(f"\n{total} requests in {elapsed:.1f}s: {total / elapsed:.1f} req/s, "
+          f"{errors} errors ({results['error_rate'] * 100:.2f}%)\n")
+    print(f"{'endpoint':<24} {'req':>6} {'rps':>7} {'err%':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for name in sorted(stats.latencies):
+        values = stats.latencies[name]
+        entry = {
+            "requests": len(values),
+            "rps": round(len(values) / elapsed, 2),
+            "error_rate": round(stats.errors[name] / len(values), 4),
+            "statuses": dict(stats.statuses[name]),
+            "p50_ms": round(percentile(values, 0.5), 1),
+            "p90_ms": round(percentile(values, 0.9), 1),
+            "p99_ms": round(percentile(values, 0.99), 1),
+            "max_ms": round(max(values), 1),
+            "histogram": histogram(values),
+        }
+        results["endpoints"][name] = entry
+        print(f"{name:<24} {entry['requests']:>6} {entry['rps']:>7.1f} {entry['error_rate'] * 100:>6.1f} "
+              f"{entry['p50_ms']:>8.1f} {entry['p90_ms']:>8.1f} {entry['p99_ms']:>8.1f} {entry['max_ms']:>8.1f}")
+
+    print("\nlatency histogram")
+    for name, entry in results["endpoints"].items():
+        print(f"{name:<24} " + "  ".join(f"{label} {count}" for label, count in entry["histogram"].items()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Target an already running server instead of starting gunicorn")
+    parser.add_argument("--database", help="Database URL for the started server (default: a temporary SQLite file)")
+    parser.add_argument("--prepare", action="store_true", help="Generate data into the database first")
+    parser.add_argument("--businesses", type=int, default=2)
+    parser.add_argument("--customers", type=int, default=500)
+    parser.add_argument("--debts", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--business-id", type=int, default=1, help="Generated business the users log in to")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--think-time", type=float, default=0, help="Max random pause between requests (s)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--notify-latency-ms", type=float, default=0, help="Delay per email/SMS of the started server")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    database_url = args.database or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='paysync-load-'), 'load.db')}"
+    if args.url is None and args.database is None:
+        args.prepare = True  # a fresh temporary database is empty
+    if args.prepare:
+        if args.url:
+            parser.error("--prepare needs the server this tool starts (no --url)")
+        prepare_database(database_url, args)
+
+    server = None if args.url else start_server(database_url, args)
+    base_url = (args.url or f"http://127.0.0.1:{args.port}").rstrip("/")
+    try:
+        tokens = {
+            "owner": login(base_url, generated_email("owner", args.business_id)),
+            "admin": login(base_url, generated_email("admin", args.business_id)),
+            "salesperson": login(base_url, generated_email("salesperson", args.business_id)),
+        }
+        context = load_context(base_url, tokens["owner"], args.business_id)
+
+        roles, weights = zip(*ROLE_WEIGHTS)
+        assignment = random.Random(args.seed).choices(roles, weights, k=args.users)
+        stats = Stats()
+        deadline = time.monotonic() + args.duration
+        users = [
+            VirtualUser(base_url, role, tokens[role], context, stats, deadline, args.think_time, seed=args.seed * 1000 + index)
+            for index, role in enumerate(assignment)
+        ]
+        print(f"{args.users} users ({', '.join(f'{assignment.count(r)} {r}' for r in roles)}) for {args.duration:.0f}s")
+        start = time.monotonic()
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        results = report(stats, time.monotonic() - start)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        if server:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
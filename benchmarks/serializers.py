@@ -0,0 +1,105 @@
+"""
+Compare marshmallow list dumps with the compiled row serializers.
+
+    python -m benchmarks.serializers --debts 5000 --repeat 5
+
+Seeds an in-memory SQLite database, dumps the same debts, payments and
+customers both ways, checks the JSON is identical and prints the timings.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+import orjson
+from flask import Flask
+from sqlalchemy import insert
+
+from server.extension import db, ma
+from server.models import Business, Customer, Debt, Item, Payment, User
+from server.schemas import item_schema, user_schema  # noqa: F401  nested schemas are looked up by name
+from server.schemas.customer_schema import CustomerSchema
+from server.schemas.debt_schema import DebtSchema
+from server.schemas.payment_schema import PaymentSchema
+from server.schemas.row_serializers import CustomerRowSerializer, DebtRowSerializer, PaymentRowSerializer
+
+
+def create_bench_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    ma.init_app(app)
+    return app
+
+
+def seed(debt_count, customer_count):
+    now = datetime.utcnow()
+    db.session.execute(insert(User), [{"id": 1, "name": "Owner", "email": "owner@bench.local", "password_hash": "x", "role": "owner"}])
+    db.session.execute(insert(Business), [{"id": 1, "name": "Bench", "owner_id": 1, "phone": "0700000000"}])
+    db.session.execute(insert(Customer), [
+        {"id": i, "customer_name": f"Customer {i}", "phone": f"07{i:08d}", "id_number": str(i),
+         "created_by": 1, "business_id": 1, "created_at": now, "updated_at": now}
+        for i in range(1, customer_count + 1)
+    ])
+    db.session.execute(insert(Debt), [
+        {"id": i, "customer_id": i % customer_count + 1, "business_id": 1, "total": 300.0, "status": "partial",
+         "created_by": 1, "created_at": now, "updated_at": now, "due_date": now + timedelta(days=i % 60)}
+        for i in range(1, debt_count + 1)
+    ])
+    db.session.execute(insert(Item), [
+        {"debt_id": i, "name": name, "price": 50.0, "category": "General", "quantity": 3}
+        for i in range(1, debt_count + 1) for name in ("Cement", "Nails")
+    ])
+    db.session.execute(insert(Payment), [
+        {"debt_id": i, "amount": 75.5, "payment_date": now, "method": "cash", "received_by": 1}
+        for i in range(1, debt_count + 1)
+    ])
+    db.session.commit()
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def compare(name, model, schema, serializer, repeat):
+    marshmallow_time, expected = best_of(
+        repeat, lambda: orjson.dumps(schema.dump(model.query.order_by(model.id).all()))
+    )
+    compiled_time, actual = best_of(
+        repeat, lambda: orjson.dumps(serializer.dump(db.session.execute(serializer.select().order_by(model.id)).all()))
+    )
+    if json.loads(expected) != json.loads(actual) or expected != actual:
+        raise SystemExit(f"{name}: compiled output differs from marshmallow")
+
+    print(f"{name:<10} marshmallow {marshmallow_time * 1000:9.1f} ms   "
+          f"compiled {compiled_time * 1000:9.1f} ms   x{marshmallow_time / compiled_time:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--debts", type=int, default=2000)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    with app.app_context():
+        db.create_all()
+        seed(args.debts, args.customers)
+
+        debts_schema = DebtSchema(many=True)
+        payments_schema = PaymentSchema(many=True)
+        customers_schema = CustomerSchema(many=True)
+        compare("debts", Debt, debts_schema, DebtRowSerializer(debts_schema), args.repeat)
+        compare("payments", Payment, payments_schema, PaymentRowSerializer(payments_schema), args.repeat)
+        compare("customers", Customer, customers_schema, CustomerRowSerializer(customers_schema), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
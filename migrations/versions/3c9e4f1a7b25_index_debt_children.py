@@ -0,0 +1,32 @@
+"""Index items and payments by debt for set-based debt totals
+
+Revision ID: 3c9e4f1a7b25
+Revises: 7a3f52c9e1b4
+Create Date: 2026-10-19 14:20:11.402816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e4f1a7b25'
+down_revision = '7a3f52c9e1b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('items', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_items_debt_id'), ['debt_id'], unique=False)
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_payments_debt_id'), ['debt_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_payments_debt_id'))
+
+    with op.batch_alter_table('items', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_items_debt_id'))
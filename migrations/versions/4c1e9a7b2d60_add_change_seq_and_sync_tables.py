@@ -0,0 +1,90 @@
+"""Add change_seq columns and sync tables for delta sync
+
+Revision ID: 4c1e9a7b2d60
+Revises: 06b9a69b91e5
+Create Date: 2026-10-19 09:12:41.224318
+
+"""
+from collections import defaultdict
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c1e9a7b2d60'
+down_revision = '06b9a69b91e5'
+branch_labels = None
+depends_on = None
+
+
+# table -> query returning (id, business_id) for existing rows
+BACKFILL = {
+    'customers': "SELECT id, business_id FROM customers ORDER BY id",
+    'debts': "SELECT id, business_id FROM debts ORDER BY id",
+    'items': "SELECT items.id, debts.business_id FROM items JOIN debts ON debts.id = items.debt_id ORDER BY items.id",
+    'payments': "SELECT payments.id, debts.business_id FROM payments JOIN debts ON debts.id = payments.debt_id ORDER BY payments.id",
+}
+
+
+def upgrade():
+    op.create_table(
+        'sync_counters',
+        sa.Column('business_id', sa.Integer(), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('business_id')
+    )
+    op.create_table(
+        'sync_tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('business_id', sa.Integer(), nullable=False),
+        sa.Column('entity_type', sa.String(length=50), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('change_seq', sa.BigInteger(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sync_tombstones_business_seq', 'sync_tombstones', ['business_id', 'change_seq'], unique=False)
+
+    for table in BACKFILL:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('change_seq', sa.BigInteger(), nullable=True))
+
+    # Number existing rows per business so the first sync pulls everything
+    bind = op.get_bind()
+    counters = defaultdict(int)
+    for table, query in BACKFILL.items():
+        rows = []
+        for row_id, business_id in bind.execute(sa.text(query)):
+            counters[business_id] += 1
+            rows.append({'id': row_id, 'seq': counters[business_id]})
+        if rows:
+            bind.execute(sa.text(f"UPDATE {table} SET change_seq = :seq WHERE id = :id"), rows)
+
+    if counters:
+        bind.execute(
+            sa.text("INSERT INTO sync_counters (business_id, value) VALUES (:business_id, :value)"),
+            [{'business_id': b, 'value': v} for b, v in counters.items()]
+        )
+
+    op.create_index('ix_customers_business_change_seq', 'customers', ['business_id', 'change_seq'], unique=False)
+    op.create_index('ix_debts_business_change_seq', 'debts', ['business_id', 'change_seq'], unique=False)
+    op.create_index(op.f('ix_items_change_seq'), 'items', ['change_seq'], unique=False)
+    op.create_index(op.f('ix_payments_change_seq'), 'payments', ['change_seq'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_payments_change_seq'), table_name='payments')
+    op.drop_index(op.f('ix_items_change_seq'), table_name='items')
+    op.drop_index('ix_debts_business_change_seq', table_name='debts')
+    op.drop_index('ix_customers_business_change_seq', table_name='customers')
+
+    for table in BACKFILL:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('change_seq')
+
+    op.drop_index('ix_sync_tombstones_business_seq', table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
+    op.drop_table('sync_counters')
@@ -0,0 +1,76 @@
+"""Add normalized phone and email keys to customers
+
+Revision ID: 5b8f1e3a9c47
+Revises: e2a7c4d9b316
+Create Date: 2026-10-19 18:03:55.274610
+
+"""
+import re
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8f1e3a9c47'
+down_revision = 'e2a7c4d9b316'
+branch_labels = None
+depends_on = None
+
+# Same rules as server.utils.phone.normalize_phone with the default country code
+COUNTRY_CODE = '254'
+BATCH_SIZE = 5000
+
+
+def _normalize_phone(phone):
+    digits = re.sub(r"\D", "", phone or "")
+    if not digits:
+        return None
+    if (phone or "").lstrip().startswith("+") or digits.startswith(COUNTRY_CODE):
+        return f"+{digits}"
+    return f"+{COUNTRY_CODE}{digits.lstrip('0')}"
+
+
+def upgrade():
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('phone_norm', sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column('email_norm', sa.String(), nullable=True))
+
+    bind = op.get_bind()
+    op.execute("UPDATE customers SET email_norm = NULLIF(lower(trim(email)), '') WHERE email IS NOT NULL")
+
+    # Only the oldest customer of a (business, number) keeps the key, so the
+    # unique index can be built; `flask paysync dedupe-customers` merges the rest
+    customers = sa.table('customers', sa.column('id'), sa.column('phone_norm'))
+    update = customers.update().where(customers.c.id == sa.bindparam('customer_id')).values(
+        phone_norm=sa.bindparam('norm')
+    )
+    seen = set()
+    batch = []
+    for customer_id, business_id, phone in bind.execute(
+        sa.text("SELECT id, business_id, phone FROM customers ORDER BY id")
+    ).fetchall():
+        norm = _normalize_phone(phone)
+        if norm is None or (business_id, norm) in seen:
+            continue
+        seen.add((business_id, norm))
+        batch.append({'customer_id': customer_id, 'norm': norm})
+        if len(batch) >= BATCH_SIZE:
+            bind.execute(update, batch)
+            batch = []
+    if batch:
+        bind.execute(update, batch)
+
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.create_index('uq_customers_business_phone_norm', ['business_id', 'phone_norm'], unique=True)
+        batch_op.create_index('ix_customers_business_email_norm', ['business_id', 'email_norm'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.drop_index('ix_customers_business_email_norm')
+        batch_op.drop_index('uq_customers_business_phone_norm')
+
+    # Plain ALTER TABLE ... DROP COLUMN (SQLite 3.35+): recreating the table
+    # in batch mode would drop the customers_fts triggers
+    op.drop_column('customers', 'email_norm')
+    op.drop_column('customers', 'phone_norm')
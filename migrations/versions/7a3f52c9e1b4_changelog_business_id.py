@@ -0,0 +1,47 @@
+"""Add business_id to changelogs for tenant-scoped feeds
+
+Revision ID: 7a3f52c9e1b4
+Revises: d41a6c2e8b97
+Create Date: 2026-10-19 14:02:37.118540
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a3f52c9e1b4'
+down_revision = 'd41a6c2e8b97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('changelogs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('business_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_changelogs_business_id', 'businesses', ['business_id'], ['id'])
+
+    # The entity's business where it still exists, else the actor's
+    op.execute("""
+        UPDATE changelogs SET business_id = COALESCE(
+            (SELECT debts.business_id FROM debts
+             WHERE changelogs.entity_type = 'Debt' AND debts.id = changelogs.entity_id),
+            (SELECT customers.business_id FROM customers
+             WHERE changelogs.entity_type = 'Customer' AND customers.id = changelogs.entity_id),
+            (SELECT debts.business_id FROM payments JOIN debts ON debts.id = payments.debt_id
+             WHERE changelogs.entity_type = 'Payment' AND payments.id = changelogs.entity_id),
+            (SELECT finance_settings.business_id FROM finance_settings
+             WHERE changelogs.entity_type = 'finance_settings' AND finance_settings.id = changelogs.entity_id),
+            (SELECT users.business_id FROM users WHERE users.id = changelogs.changed_by)
+        )
+    """)
+
+    op.create_index('ix_changelogs_business_timestamp', 'changelogs', ['business_id', sa.text('timestamp DESC')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_changelogs_business_timestamp', table_name='changelogs')
+
+    with op.batch_alter_table('changelogs', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_changelogs_business_id', type_='foreignkey')
+        batch_op.drop_column('business_id')
@@ -0,0 +1,38 @@
+"""Add idempotency_keys table for offline batch uploads
+
+Revision ID: 8f2d3b61c0a4
+Revises: 4c1e9a7b2d60
+Create Date: 2026-10-19 10:02:17.540193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f2d3b61c0a4'
+down_revision = '4c1e9a7b2d60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('business_id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=128), nullable=False),
+        sa.Column('operation', sa.String(length=50), nullable=False),
+        sa.Column('entity_type', sa.String(length=50), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('created_by', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('business_id', 'key', name='uq_idempotency_keys_business_key')
+    )
+
+
+def downgrade():
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,69 @@
+"""Add customer_balances summary table
+
+Revision ID: 9d2e6b4c1f83
+Revises: 3c9e4f1a7b25
+Create Date: 2026-10-19 16:05:42.118304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2e6b4c1f83'
+down_revision = '3c9e4f1a7b25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'customer_balances',
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.Column('business_id', sa.Integer(), nullable=False),
+        sa.Column('total_issued', sa.Float(), nullable=False),
+        sa.Column('total_paid', sa.Float(), nullable=False),
+        sa.Column('outstanding', sa.Float(), nullable=False),
+        sa.Column('open_debts', sa.Integer(), nullable=False),
+        sa.Column('oldest_due_date', sa.DateTime(), nullable=True),
+        sa.Column('last_payment_date', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('customer_id')
+    )
+    with op.batch_alter_table('customer_balances', schema=None) as batch_op:
+        batch_op.create_index('ix_customer_balances_business_outstanding', ['business_id', sa.text('outstanding DESC')], unique=False)
+
+    # Backfill from the stored debt totals and the payments
+    op.execute("""
+        INSERT INTO customer_balances (
+            customer_id, business_id, total_issued, total_paid, outstanding,
+            open_debts, oldest_due_date, last_payment_date, updated_at
+        )
+        SELECT
+            c.id,
+            c.business_id,
+            COALESCE(SUM(d.total), 0),
+            COALESCE(SUM(COALESCE(p.paid, 0)), 0),
+            COALESCE(SUM(d.total - COALESCE(p.paid, 0)), 0),
+            COALESCE(SUM(CASE WHEN d.status IN ('unpaid', 'partial') THEN 1 ELSE 0 END), 0),
+            MIN(CASE WHEN d.status IN ('unpaid', 'partial') THEN d.due_date END),
+            MAX(p.last_payment_date),
+            CURRENT_TIMESTAMP
+        FROM customers c
+        LEFT JOIN debts d ON d.customer_id = c.id
+        LEFT JOIN (
+            SELECT debt_id, SUM(amount) AS paid, MAX(payment_date) AS last_payment_date
+            FROM payments
+            GROUP BY debt_id
+        ) p ON p.debt_id = d.id
+        GROUP BY c.id, c.business_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('customer_balances', schema=None) as batch_op:
+        batch_op.drop_index('ix_customer_balances_business_outstanding')
+
+    op.drop_table('customer_balances')
@@ -0,0 +1,26 @@
+"""Index debts by customer and creation date for customer statements
+
+Revision ID: a7d3e9b2c508
+Revises: f4c8a2d6e913
+Create Date: 2026-10-19 19:48:51.270634
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e9b2c508'
+down_revision = 'f4c8a2d6e913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('debts', schema=None) as batch_op:
+        batch_op.create_index('ix_debts_customer_created', ['customer_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('debts', schema=None) as batch_op:
+        batch_op.drop_index('ix_debts_customer_created')
@@ -0,0 +1,42 @@
+"""Add entity versions and delta details to changelogs
+
+Revision ID: b5e07c9d13f2
+Revises: 8f2d3b61c0a4
+Create Date: 2026-10-19 13:04:51.218734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e07c9d13f2'
+down_revision = '8f2d3b61c0a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('changelogs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('entity_version', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('details_format', sa.String(length=16), nullable=True))
+        batch_op.create_index('ix_changelogs_entity_version', ['entity_type', 'entity_id', 'entity_version'], unique=False)
+
+    op.create_table(
+        'changelog_heads',
+        sa.Column('entity_type', sa.String(length=50), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('state', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('entity_type', 'entity_id')
+    )
+
+
+def downgrade():
+    op.drop_table('changelog_heads')
+
+    with op.batch_alter_table('changelogs', schema=None) as batch_op:
+        batch_op.drop_index('ix_changelogs_entity_version')
+        batch_op.drop_column('details_format')
+        batch_op.drop_column('entity_version')
@@ -0,0 +1,30 @@
+"""Add job_cursors so the nightly reconciliation resumes where it stopped
+
+Revision ID: c5e2b8d1f407
+Revises: a7d3e9b2c508
+Create Date: 2026-10-19 21:12:40.318206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e2b8d1f407'
+down_revision = 'a7d3e9b2c508'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'job_cursors',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('position', sa.BigInteger(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('job_cursors')
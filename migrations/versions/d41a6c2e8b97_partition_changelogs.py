@@ -0,0 +1,121 @@
+"""Partition changelogs by month and add changelog retention setting
+
+Revision ID: d41a6c2e8b97
+Revises: b5e07c9d13f2
+Create Date: 2026-10-19 13:21:08.664210
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a6c2e8b97'
+down_revision = 'b5e07c9d13f2'
+branch_labels = None
+depends_on = None
+
+# Partitions created ahead of the current month
+MONTHS_AHEAD = 3
+
+CHANGELOG_COLUMNS = "id, entity_type, entity_id, action, changed_by, timestamp, details, entity_version, details_format"
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _partition_changelogs(bind):
+    op.execute("ALTER SEQUENCE changelogs_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE changelogs RENAME TO changelogs_unpartitioned")
+    op.execute("ALTER INDEX changelogs_pkey RENAME TO changelogs_unpartitioned_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_changelogs_entity_version")
+
+    # The partition key has to be part of the primary key
+    op.execute("""
+        CREATE TABLE changelogs (
+            id INTEGER NOT NULL DEFAULT nextval('changelogs_id_seq'),
+            entity_type VARCHAR(50),
+            entity_id INTEGER,
+            action VARCHAR(50),
+            changed_by INTEGER REFERENCES users (id),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            details JSON,
+            entity_version INTEGER,
+            details_format VARCHAR(16),
+            CONSTRAINT changelogs_pkey PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("CREATE TABLE changelogs_default PARTITION OF changelogs DEFAULT")
+
+    this_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    oldest = bind.execute(sa.text("SELECT min(timestamp) FROM changelogs_unpartitioned")).scalar() or this_month
+    month = min(oldest.replace(day=1, hour=0, minute=0, second=0, microsecond=0), this_month)
+    while month <= _add_months(this_month, MONTHS_AHEAD):
+        op.execute(
+            f"CREATE TABLE changelogs_y{month.year:04d}m{month.month:02d} PARTITION OF changelogs "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_add_months(month, 1):%Y-%m-%d}')"
+        )
+        month = _add_months(month, 1)
+
+    op.execute(f"""
+        INSERT INTO changelogs ({CHANGELOG_COLUMNS})
+        SELECT id, entity_type, entity_id, action, changed_by,
+               COALESCE(timestamp, now() AT TIME ZONE 'utc'), details, entity_version, details_format
+        FROM changelogs_unpartitioned
+    """)
+    op.execute("DROP TABLE changelogs_unpartitioned")
+    op.execute("ALTER SEQUENCE changelogs_id_seq OWNED BY changelogs.id")
+
+
+def _unpartition_changelogs():
+    op.execute("ALTER SEQUENCE changelogs_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE changelogs RENAME TO changelogs_partitioned")
+    op.execute("ALTER INDEX changelogs_pkey RENAME TO changelogs_partitioned_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_changelogs_entity_version")
+    op.execute("DROP INDEX IF EXISTS ix_changelogs_timestamp")
+    op.execute("""
+        CREATE TABLE changelogs (
+            id INTEGER NOT NULL DEFAULT nextval('changelogs_id_seq'),
+            entity_type VARCHAR(50),
+            entity_id INTEGER,
+            action VARCHAR(50),
+            changed_by INTEGER REFERENCES users (id),
+            timestamp TIMESTAMP WITHOUT TIME ZONE,
+            details JSON,
+            entity_version INTEGER,
+            details_format VARCHAR(16),
+            CONSTRAINT changelogs_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute(f"INSERT INTO changelogs ({CHANGELOG_COLUMNS}) SELECT {CHANGELOG_COLUMNS} FROM changelogs_partitioned")
+    op.execute("DROP TABLE changelogs_partitioned CASCADE")
+    op.execute("ALTER SEQUENCE changelogs_id_seq OWNED BY changelogs.id")
+
+
+def upgrade():
+    with op.batch_alter_table('finance_settings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('changelog_retention_months', sa.Integer(), nullable=True))
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        _partition_changelogs(bind)
+        # Indexes on the parent are created on every partition
+        op.execute("CREATE INDEX ix_changelogs_entity_version ON changelogs (entity_type, entity_id, entity_version)")
+
+    # SQLite and others keep a single table; only the range index is added
+    op.create_index('ix_changelogs_timestamp', 'changelogs', ['timestamp'], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        _unpartition_changelogs()
+        op.execute("CREATE INDEX ix_changelogs_entity_version ON changelogs (entity_type, entity_id, entity_version)")
+    else:
+        op.drop_index('ix_changelogs_timestamp', table_name='changelogs')
+
+    with op.batch_alter_table('finance_settings', schema=None) as batch_op:
+        batch_op.drop_column('changelog_retention_months')
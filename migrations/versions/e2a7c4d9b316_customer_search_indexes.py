@@ -0,0 +1,94 @@
+"""Add customer search indexes (tsvector and trigram on Postgres, FTS5 on SQLite)
+
+Revision ID: e2a7c4d9b316
+Revises: 9d2e6b4c1f83
+Create Date: 2026-10-19 17:12:30.905127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a7c4d9b316'
+down_revision = '9d2e6b4c1f83'
+branch_labels = None
+depends_on = None
+
+# Country calling code stripped from phone numbers (DEFAULT_PHONE_COUNTRY_CODE)
+COUNTRY_CODE = '254'
+
+
+def _digits(column):
+    expression = column
+    for separator in (' ', '-', '+', '(', ')', '.'):
+        expression = f"replace({expression}, '{separator}', '')"
+    return expression
+
+
+def _phone_tokens(column):
+    """Digits and national number of a phone column, as FTS5 tokens."""
+    digits = _digits(column)
+    national = (
+        f"CASE WHEN {digits} LIKE '{COUNTRY_CODE}%' THEN substr({digits}, {len(COUNTRY_CODE) + 1}) "
+        f"WHEN {digits} LIKE '0%' THEN ltrim({digits}, '0') ELSE {digits} END"
+    )
+    return f"{digits} || ' ' || {national}"
+
+
+def _upgrade_postgresql():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX ix_customers_name_tsv ON customers "
+        "USING gin (to_tsvector('simple', customer_name))"
+    )
+    op.execute(
+        "CREATE INDEX ix_customers_phone_digits_trgm ON customers "
+        "USING gin (regexp_replace(phone, '[^0-9]', '', 'g') gin_trgm_ops)"
+    )
+
+
+def _upgrade_sqlite():
+    op.execute("CREATE VIRTUAL TABLE customers_fts USING fts5(customer_name, phone)")
+    op.execute(f"""
+        CREATE TRIGGER customers_fts_insert AFTER INSERT ON customers BEGIN
+            INSERT INTO customers_fts (rowid, customer_name, phone)
+            VALUES (new.id, new.customer_name, {_phone_tokens('new.phone')});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER customers_fts_update AFTER UPDATE OF customer_name, phone ON customers BEGIN
+            DELETE FROM customers_fts WHERE rowid = old.id;
+            INSERT INTO customers_fts (rowid, customer_name, phone)
+            VALUES (new.id, new.customer_name, {_phone_tokens('new.phone')});
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER customers_fts_delete AFTER DELETE ON customers BEGIN
+            DELETE FROM customers_fts WHERE rowid = old.id;
+        END
+    """)
+    op.execute(f"""
+        INSERT INTO customers_fts (rowid, customer_name, phone)
+        SELECT id, customer_name, {_phone_tokens('phone')} FROM customers
+    """)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        _upgrade_postgresql()
+    elif dialect == 'sqlite':
+        _upgrade_sqlite()
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_customers_phone_digits_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_customers_name_tsv")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS customers_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS customers_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS customers_fts_insert")
+        op.execute("DROP TABLE IF EXISTS customers_fts")
@@ -0,0 +1,127 @@
+"""Add debt_search_documents with a tsvector GIN index on Postgres and FTS5 on SQLite
+
+Revision ID: f4c8a2d6e913
+Revises: 5b8f1e3a9c47
+Create Date: 2026-10-19 19:02:17.553410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c8a2d6e913'
+down_revision = '5b8f1e3a9c47'
+branch_labels = None
+depends_on = None
+
+# Country calling code of national numbers (DEFAULT_PHONE_COUNTRY_CODE)
+COUNTRY_CODE = '254'
+
+PG_DOCUMENT_VECTOR = (
+    "setweight(to_tsvector('simple', customer_text), 'A') || "
+    "setweight(to_tsvector('simple', items_text), 'B') || "
+    "setweight(to_tsvector('simple', categories_text), 'C')"
+)
+
+
+def _backfill(group_concat):
+    prefix = f'+{COUNTRY_CODE}'
+    phone_terms = (
+        f"CASE WHEN c.phone_norm LIKE '{prefix}%' "
+        f"THEN replace(c.phone_norm, '+', '') || ' ' || substr(c.phone_norm, {len(prefix) + 1}) "
+        "WHEN c.phone_norm IS NOT NULL THEN replace(c.phone_norm, '+', '') "
+        "ELSE COALESCE(c.phone, '') END"
+    )
+    op.execute(f"""
+        INSERT INTO debt_search_documents (
+            debt_id, business_id, customer_id, customer_text, items_text, categories_text, updated_at
+        )
+        SELECT
+            d.id,
+            d.business_id,
+            d.customer_id,
+            COALESCE(c.customer_name, '') || ' ' || COALESCE(c.id_number, '') || ' ' || {phone_terms},
+            COALESCE(i.names, ''),
+            COALESCE(d.category, '') || ' ' || COALESCE(i.categories, ''),
+            CURRENT_TIMESTAMP
+        FROM debts d
+        JOIN customers c ON c.id = d.customer_id
+        LEFT JOIN (
+            SELECT debt_id, {group_concat}(name, ' ') AS names, {group_concat}(category, ' ') AS categories
+            FROM items
+            GROUP BY debt_id
+        ) i ON i.debt_id = d.id
+    """)
+
+
+def _upgrade_sqlite():
+    op.execute(
+        "CREATE VIRTUAL TABLE debt_search_fts USING fts5(customer_text, items_text, categories_text)"
+    )
+    op.execute("""
+        CREATE TRIGGER debt_search_fts_insert AFTER INSERT ON debt_search_documents BEGIN
+            INSERT INTO debt_search_fts (rowid, customer_text, items_text, categories_text)
+            VALUES (new.debt_id, new.customer_text, new.items_text, new.categories_text);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER debt_search_fts_update AFTER UPDATE OF customer_text, items_text, categories_text
+        ON debt_search_documents BEGIN
+            DELETE FROM debt_search_fts WHERE rowid = old.debt_id;
+            INSERT INTO debt_search_fts (rowid, customer_text, items_text, categories_text)
+            VALUES (new.debt_id, new.customer_text, new.items_text, new.categories_text);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER debt_search_fts_delete AFTER DELETE ON debt_search_documents BEGIN
+            DELETE FROM debt_search_fts WHERE rowid = old.debt_id;
+        END
+    """)
+    # The insert trigger fills debt_search_fts
+    _backfill('group_concat')
+
+
+def upgrade():
+    op.create_table(
+        'debt_search_documents',
+        sa.Column('debt_id', sa.Integer(), nullable=False),
+        sa.Column('business_id', sa.Integer(), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.Column('customer_text', sa.Text(), nullable=False),
+        sa.Column('items_text', sa.Text(), nullable=False),
+        sa.Column('categories_text', sa.Text(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['debt_id'], ['debts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('debt_id')
+    )
+    with op.batch_alter_table('debt_search_documents', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_debt_search_documents_business_id'), ['business_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_debt_search_documents_customer_id'), ['customer_id'], unique=False)
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _upgrade_sqlite()
+        return
+    _backfill('string_agg')
+    if dialect == 'postgresql':
+        op.execute(f"CREATE INDEX ix_debt_search_documents_tsv ON debt_search_documents USING gin (({PG_DOCUMENT_VECTOR}))")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_debt_search_documents_tsv")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS debt_search_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS debt_search_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS debt_search_fts_insert")
+        op.execute("DROP TABLE IF EXISTS debt_search_fts")
+
+    with op.batch_alter_table('debt_search_documents', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_debt_search_documents_customer_id'))
+        batch_op.drop_index(batch_op.f('ix_debt_search_documents_business_id'))
+
+    op.drop_table('debt_search_documents')
@@ -4,11 +4,15 @@ from flask_restful import Api
 from dotenv import load_dotenv
 from server.extension import db, migrate, jwt,ma
 from server.routes_controller import register_routes
+from server.commands import paysync_cli
 import os
 from datetime import timedelta
 import logging
 from server.seed import seed
 from server.scheduler import init_scheduler
+from server.utils.change_tracking import init_change_tracking
+from server.utils.change_logger import init_changelog_writer
+from server.service.notifications.transports import init_notifications
 
 
 load_dotenv()
@@ -49,6 +53,9 @@ def create_app():
     api = Api(app)
     jwt.init_app(app)
     ma.init_app(app)
+    init_change_tracking()
+    init_changelog_writer()
+    init_notifications(app)
     init_scheduler(app)
 
     # with app.app_context():
@@ -59,6 +66,7 @@ def create_app():
 
     # Register routes
     register_routes(app)
+    app.cli.add_command(paysync_cli)
 
     
  
@@ -0,0 +1,8 @@
+from flask.cli import AppGroup
+
+paysync_cli = AppGroup("paysync", help="PaySync maintenance commands.")
+
+from .changelogs import *
+from .customers import *
+from .data import *
+from .debts import *
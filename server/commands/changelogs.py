@@ -0,0 +1,26 @@
+import click
+from server.extension import db
+from server.service.changelog_storage import apply_retention, ensure_partitions
+from . import paysync_cli
+
+
+@paysync_cli.command("changelog-partitions")
+@click.option("--months-ahead", default=3, show_default=True, help="Future months to create partitions for.")
+def changelog_partitions(months_ahead):
+    """Create upcoming monthly changelog partitions (Postgres only)."""
+    created = ensure_partitions(db.session, months_ahead=months_ahead)
+    db.session.commit()
+    if not created:
+        click.echo("changelogs is not partitioned; nothing to do")
+        return
+    click.echo(f"Partitions ready: {', '.join(created)}")
+
+
+@paysync_cli.command("archive-changelogs")
+def archive_changelogs():
+    """Move changelogs past each business's retention into the cold archive."""
+    archived = apply_retention(db.session)
+    if not archived:
+        click.echo("Nothing to archive")
+    for business_id, count in archived.items():
+        click.echo(f"business {business_id if business_id is not None else '-'}: {count} entries archived")
@@ -0,0 +1,25 @@
+import click
+from server.extension import db
+from server.service.customers import DEFAULT_MERGE_BATCH, merge_duplicate_customers
+from . import paysync_cli
+
+
+@paysync_cli.command("dedupe-customers")
+@click.option("--business-id", type=int, default=None, help="Only this business's customers.")
+@click.option("--batch-size", default=DEFAULT_MERGE_BATCH, show_default=True, help="Duplicate groups merged per transaction.")
+@click.option("--dry-run", is_flag=True, help="Only report duplicates, do not merge them.")
+def dedupe_customers(business_id, batch_size, dry_run):
+    """Merge customers sharing a phone number (in any spelling) into the oldest one."""
+    def progress(bid, report):
+        click.echo(f"business {bid}: {report.groups} duplicate groups so far")
+
+    report = merge_duplicate_customers(
+        db.session, business_id=business_id, batch_size=batch_size, dry_run=dry_run, progress=progress,
+    )
+    verb = "would be merged" if dry_run else "merged"
+    click.echo(
+        f"{report.scanned} customers scanned in {report.businesses} businesses, "
+        f"{report.merged} duplicates {verb} into {report.groups} customers, {report.debts_moved} debts moved"
+    )
+    for survivor, duplicates in sorted(report.merges.items())[:20]:
+        click.echo(f"  customer {survivor} <- {', '.join(str(d) for d in duplicates)}")
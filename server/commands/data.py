@@ -0,0 +1,29 @@
+import click
+from server.extension import db
+from server.service.data_generator import GENERATED_PASSWORD, generate
+from . import paysync_cli
+
+
+@paysync_cli.command("gen-data")
+@click.option("--businesses", default=1, show_default=True, help="Businesses (tenants) to create.")
+@click.option("--customers", default=100, show_default=True, help="Customers per business.")
+@click.option("--debts", default=5, show_default=True, help="Debts per customer.")
+@click.option("--salespeople", default=3, show_default=True, help="Salespeople per business.")
+@click.option("--seed", default=0, show_default=True, help="Random seed; the same seed gives the same data.")
+@click.option("--as-of", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Date the data is generated around (default: now). Fix it for reproducible dates.")
+@click.option("--batch-size", default=1000, show_default=True, help="Customers written per transaction.")
+def gen_data(businesses, customers, debts, salespeople, seed, as_of, batch_size):
+    """Generate synthetic businesses, customers, debts, payments and reminders."""
+    def progress(business_id, done, stats):
+        click.echo(f"business {business_id}: {done}/{customers} customers ({stats.debts} debts so far)")
+
+    stats = generate(
+        db.session, businesses, customers, debts, seed=seed, salespeople=salespeople,
+        batch_size=batch_size, as_of=as_of, progress=progress,
+    )
+    click.echo(
+        f"Created {stats.businesses} businesses, {stats.users} users, {stats.customers} customers, "
+        f"{stats.debts} debts, {stats.items} items, {stats.payments} payments, {stats.reminders} reminders"
+    )
+    click.echo(f"Generated users sign in with password '{GENERATED_PASSWORD}'")
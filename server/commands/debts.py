@@ -0,0 +1,53 @@
+import json
+import click
+from server.extension import db
+from server.service.reconciliation import DEFAULT_BATCH_SIZE, reconcile_balances, reconcile_debts
+from . import paysync_cli
+
+
+@paysync_cli.command("reconcile-debts")
+@click.option("--batch-size", default=DEFAULT_BATCH_SIZE, show_default=True, help="Debt ids scanned per transaction.")
+@click.option("--dry-run", is_flag=True, help="Only report drift, do not repair it.")
+@click.option("--business-id", type=int, default=None, help="Only this business's debts.")
+@click.option("--start-id", type=int, default=None, help="Resume the scan from this debt id.")
+@click.option("--balance-start-id", type=int, default=None, help="Resume the customer balance check from this customer id.")
+@click.option("--max-seconds", type=float, default=None, help="Stop each pass after this long and print where to resume.")
+@click.option("--json", "json_path", default=None, help="Also write the drift report to this file.")
+def reconcile_debts_command(batch_size, dry_run, business_id, start_id, balance_start_id, max_seconds, json_path):
+    """Recompute stored debt totals, statuses and customer balances from items and payments."""
+    def progress(upper, report):
+        click.echo(f"up to debt {upper}: {report.scanned} scanned, {report.drifted} drifted")
+
+    report = reconcile_debts(
+        db.session, batch_size=batch_size, dry_run=dry_run, business_id=business_id,
+        start_id=start_id, max_seconds=max_seconds, progress=progress,
+    )
+    reconcile_balances(
+        db.session, report, batch_size=batch_size, dry_run=dry_run, business_id=business_id,
+        start_id=balance_start_id, max_seconds=max_seconds,
+    )
+    verb = "would repair" if dry_run else "repaired"
+    click.echo(
+        f"{report.scanned} debts scanned, {report.drifted} drifted, "
+        f"{report.drifted if dry_run else report.repaired} {verb} (total drift {report.total_drift:.2f})"
+    )
+    for change, count in sorted(report.status_changes.items()):
+        click.echo(f"  status {change}: {count}")
+    for sample in report.samples:
+        click.echo(
+            f"  debt {sample['debt_id']} (business {sample['business_id']}): total {sample['stored_total']} -> "
+            f"{sample['total']}, status {sample['stored_status']} -> {sample['status']}"
+        )
+    click.echo(
+        f"{report.balances_scanned} customer balances scanned, {report.balances_drifted} drifted"
+        f"{' (not repaired)' if dry_run else ''}"
+    )
+    for customer_id in report.balance_samples:
+        click.echo(f"  customer {customer_id}")
+    if not report.completed:
+        click.echo(f"Debts stopped early; resume with --start-id {report.resume_from}")
+    if not report.balances_completed:
+        click.echo(f"Customer balances stopped early; resume with --balance-start-id {report.balances_resume_from}")
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report.as_dict(), f, indent=2)
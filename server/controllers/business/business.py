@@ -1,23 +1,40 @@
-from flask import request, g
+from flask import g
 from flask_restful import Resource, Api
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.exc import SQLAlchemyError
-from server.models import Business, User
+from server.models import Business, User, Customer
 from server.extension import db
 from . import business_bp
 from server.utils.decorators import role_required
 from server.utils.roles import ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON, ALL_ROLES
 from server.schemas.business_schema import BusinessSchema, BusinessCreateUpdateSchema
 from server.models import FinanceSettings
+from server.service.business_profile import business_counts
+from server.utils.helper import paginated, pagination_args
 
 api = Api(business_bp)
 
 # Schema instances
 business_schema = BusinessSchema()
-businesses_schema = BusinessSchema(many=True)
 business_create_update_schema = BusinessCreateUpdateSchema()
 
 
+def dump_profiles(businesses):
+    """Compact business profiles with customer, member and open debt counts."""
+    counts = business_counts(b.id for b in businesses)
+    return [{**business_schema.dump(b), "counts": counts[b.id]} for b in businesses]
+
+
+def dump_profile(business):
+    return dump_profiles([business])[0]
+
+
+def can_view_business(user, business):
+    if user.role == ROLE_OWNER:
+        return business.owner_id == user.id or business.id == user.business_id
+    return business.id == user.business_id
+
+
 # ---------------------------
 # /business/my
 # ---------------------------
@@ -32,7 +49,7 @@ class MyBusinessResource(Resource):
         else:
             businesses = [Business.query.get(current_user.business_id)] if current_user.business_id else []
 
-        return {"businesses": businesses_schema.dump(businesses)}, 200
+        return {"businesses": dump_profiles(businesses)}, 200
 
 
 # ---------------------------
@@ -51,7 +68,7 @@ class BusinessResource(Resource):
             if current_user.role in (ROLE_ADMIN, ROLE_SALESPERSON) and business.id != current_user.business_id:
                 return {"message": "Access denied"}, 403
 
-            return {"business": business_schema.dump(business)}, 200
+            return {"business": dump_profile(business)}, 200
 
         # List all businesses visible to user
         if current_user.role == ROLE_OWNER:
@@ -61,7 +78,7 @@ class BusinessResource(Resource):
         else:
             businesses = []
 
-        return {"businesses": businesses_schema.dump(businesses)}, 200
+        return {"businesses": dump_profiles(businesses)}, 200
 
     @jwt_required()
     @role_required(ROLE_OWNER)
@@ -82,7 +99,7 @@ class BusinessResource(Resource):
                     setattr(business, field, json_data[field])
             try:
                 db.session.commit()
-                return {"business": business_schema.dump(business), "message": "Business updated successfully"}, 200
+                return {"business": dump_profile(business), "message": "Business updated successfully"}, 200
             except SQLAlchemyError as e:
                 db.session.rollback()
                 return {"message": "Database error", "details": str(e)}, 422
@@ -108,7 +125,7 @@ class BusinessResource(Resource):
                 db.session.commit()
 
                 return {
-                    "business": business_schema.dump(business),
+                    "business": dump_profile(business),
                     "message": "Business created successfully"
                 }, 201
 
@@ -138,7 +155,7 @@ class BusinessResource(Resource):
 
         try:
             db.session.commit()
-            return {"business": business_schema.dump(business), "message": "Business updated successfully"}, 200
+            return {"business": dump_profile(business), "message": "Business updated successfully"}, 200
         except SQLAlchemyError as e:
             db.session.rollback()
             return {"message": "Database error", "details": str(e)}, 422
@@ -161,8 +178,54 @@ class BusinessResource(Resource):
             return {"message": "Database error", "details": str(e)}, 422
 
 
+# ---------------------------
+# /businesses/<id>/customers and /businesses/<id>/members
+# ---------------------------
+class BusinessCustomersResource(Resource):
+    @role_required(*ALL_ROLES)
+    def get(self, business_id):
+        """Customers of the business by name. ?page=, ?per_page= (max 100)."""
+        business = Business.query.get_or_404(business_id)
+        if not can_view_business(g.current_user, business):
+            return {"message": "Access denied"}, 403
+        try:
+            page, per_page = pagination_args()
+        except ValueError:
+            return {"message": "page and per_page must be integers"}, 400
+
+        query = Customer.query.filter_by(business_id=business.id).order_by(Customer.customer_name, Customer.id)
+        return paginated("customers", query, page, per_page, lambda c: {
+            "id": c.id,
+            "customer_name": c.customer_name,
+            "phone": c.phone,
+            "id_number": c.id_number,
+        }), 200
+
+
+class BusinessMembersResource(Resource):
+    @role_required(*ALL_ROLES)
+    def get(self, business_id):
+        """Admins and salespeople of the business. ?page=, ?per_page= (max 100)."""
+        business = Business.query.get_or_404(business_id)
+        if not can_view_business(g.current_user, business):
+            return {"message": "Access denied"}, 403
+        try:
+            page, per_page = pagination_args()
+        except ValueError:
+            return {"message": "page and per_page must be integers"}, 400
+
+        query = User.query.filter_by(business_id=business.id).order_by(User.name, User.id)
+        return paginated("members", query, page, per_page, lambda u: {
+            "id": u.id,
+            "name": u.name,
+            "role": u.role,
+        }), 200
+
+
 # ---------------------------
 # Register resources
 # ---------------------------
 api.add_resource(MyBusinessResource, "/business/my")
 api.add_resource(BusinessResource, "/businesses", "/businesses/<int:business_id>")
+api.add_resource(BusinessCustomersResource, "/businesses/<int:business_id>/customers")
+api.add_resource(BusinessMembersResource, "/businesses/<int:business_id>/members")
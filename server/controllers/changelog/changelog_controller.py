@@ -1,13 +1,20 @@
 import logging
-from flask import request
+from datetime import datetime
+from flask import g, request
 from flask_restful import Resource, Api
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from server.models import ChangeLog, User
 from server.extension import db
 from . import changelog_bp
-from server.utils.decorators import role_required
+from server.utils.decorators import role_required, conditional_get
 from server.utils.roles import ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON, ALL_ROLES
 from server.schemas.changelog_schema import ChangeLogSchema, ChangeLogCreateUpdateSchema
+from server.schemas.user_schema import UserSchema
+from server.utils.actors import resolve_actors
+from server.utils.helper import parse_date_range
+from server.utils.changelog_versions import reconstruct
+from server.service.changelog_storage import read_archived
+from werkzeug.exceptions import HTTPException
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -19,56 +26,74 @@ api = Api(changelog_bp)
 changelog_schema = ChangeLogSchema()
 changelogs_schema = ChangeLogSchema(many=True)
 changelog_create_schema = ChangeLogCreateUpdateSchema()
+# Actors are attached by format_changelogs instead of per-row relationship loads
+changelog_entries_schema = ChangeLogSchema(many=True, exclude=("changed_by_user", "changed_by_name"))
+actor_schema = UserSchema(only=("id", "name", "email", "role"))
+
+
+def format_changelogs(changelogs):
+    """Attach human-readable user details to changelog output, resolving actors in one query."""
+    actors = resolve_actors(changelog.changed_by for changelog in changelogs)
+    result = []
+    for changelog, entry in zip(changelogs, changelog_entries_schema.dump(changelogs)):
+        user = actors.get(changelog.changed_by)
+        data = {
+            "changed_by_user": actor_schema.dump(user) if user else None,
+            "changed_by_name": user.name if user else None,
+            **entry,
+        }
+        data["changed_by"] = {
+            "id": user.id,
+            "name": user.name,
+            "role": user.role
+        } if user else {"id": changelog.changed_by, "name": "Unknown", "role": "Unknown"}
+        result.append(data)
+    return result
 
 
 def format_changelog(changelog):
-    """Attach human-readable user details to changelog output."""
-    user = User.query.get(changelog.changed_by)
-    actor_info = {
-        "id": user.id,
-        "name": user.name,
-        "role": user.role
-    } if user else {"id": changelog.changed_by, "name": "Unknown", "role": "Unknown"}
-
-    data = changelog_schema.dump(changelog)
-    data["changed_by"] = actor_info
-    return data
+    return format_changelogs([changelog])[0]
 
 
 class ChangeLogListResource(Resource):
     @jwt_required()
     @role_required(*ALL_ROLES)
+    @conditional_get()
     def get(self):
         """
         Owners/Admins: see logs for their business.
         Salespersons: see only their own logs within business.
+        Optional ?start_date=/&end_date= (YYYY-MM-DD, inclusive) narrow the
+        range; ?include_archived=true also reads entries moved to the archive.
         """
         try:
             current_user = User.query.get_or_404(get_jwt_identity())
             logger.info(f"Fetching changelogs for user={current_user.name} role={current_user.role}")
 
-            if current_user.role in (ROLE_OWNER, ROLE_ADMIN):
-                changelogs = (
-                    ChangeLog.query
-                    .join(User, User.id == ChangeLog.changed_by)
-                    .filter(User.business_id == current_user.business_id)
-                    .order_by(ChangeLog.timestamp.desc())
-                    .all()
-                )
-            else:  # Salesperson
-                changelogs = (
-                    ChangeLog.query
-                    .join(User, User.id == ChangeLog.changed_by)
-                    .filter(
-                        ChangeLog.changed_by == current_user.id,
-                        User.business_id == current_user.business_id
-                    )
-                    .order_by(ChangeLog.timestamp.desc())
-                    .all()
-                )
+            try:
+                start, end = parse_date_range(request.args)
+            except ValueError:
+                return {"error": "start_date and end_date must be YYYY-MM-DD"}, 400
+            include_archived = request.args.get("include_archived", "").lower() in ("1", "true", "yes")
+
+            query = ChangeLog.query.filter(ChangeLog.business_id == current_user.business_id)
+            if current_user.role not in (ROLE_OWNER, ROLE_ADMIN):  # Salesperson
+                query = query.filter(ChangeLog.changed_by == current_user.id)
+            if start:
+                query = query.filter(ChangeLog.timestamp >= start)
+            if end:
+                query = query.filter(ChangeLog.timestamp < end)
+            changelogs = query.order_by(ChangeLog.timestamp.desc()).all()
+
+            if include_archived:
+                archived = [
+                    ChangeLog(**row) for row in read_archived(current_user.business_id, start, end)
+                    if current_user.role in (ROLE_OWNER, ROLE_ADMIN) or row["changed_by"] == current_user.id
+                ]
+                changelogs = sorted(changelogs + archived, key=lambda c: c.timestamp or datetime.min, reverse=True)
 
             logger.info(f"Returning {len(changelogs)} changelog entries")
-            return [format_changelog(c) for c in changelogs], 200
+            return format_changelogs(changelogs), 200
 
         except Exception as e:
             logger.error("Error in ChangeLogListResource GET", exc_info=e)
@@ -89,6 +114,7 @@ class ChangeLogListResource(Resource):
             # Validate and deserialize input
             data = changelog_create_schema.load(json_data)
             changelog = ChangeLog(**data)
+            changelog.business_id = g.current_user.business_id
 
             db.session.add(changelog)
             db.session.commit()
@@ -104,14 +130,14 @@ class ChangeLogListResource(Resource):
 class ChangeLogDetailResource(Resource):
     @jwt_required()
     @role_required(*ALL_ROLES)
+    @conditional_get()
     def get(self, log_id):
         try:
             current_user = User.query.get_or_404(get_jwt_identity())
             changelog = ChangeLog.query.get_or_404(log_id)
 
             # Verify business scope
-            actor = User.query.get(changelog.changed_by)
-            if not actor or actor.business_id != current_user.business_id:
+            if not current_user.business_id or changelog.business_id != current_user.business_id:
                 return {"error": "Access denied"}, 403
 
             if current_user.role in (ROLE_OWNER, ROLE_ADMIN) or changelog.changed_by == current_user.id:
@@ -134,8 +160,7 @@ class ChangeLogDetailResource(Resource):
             current_user = User.query.get_or_404(get_jwt_identity())
             changelog = ChangeLog.query.get_or_404(log_id)
 
-            actor = User.query.get(changelog.changed_by)
-            if not actor or actor.business_id != current_user.business_id:
+            if not current_user.business_id or changelog.business_id != current_user.business_id:
                 return {"error": "Access denied"}, 403
 
             json_data = request.get_json()
@@ -167,8 +192,7 @@ class ChangeLogDetailResource(Resource):
             current_user = User.query.get_or_404(get_jwt_identity())
             changelog = ChangeLog.query.get_or_404(log_id)
 
-            actor = User.query.get(changelog.changed_by)
-            if not actor or actor.business_id != current_user.business_id:
+            if not current_user.business_id or changelog.business_id != current_user.business_id:
                 return {"error": "Access denied"}, 403
 
             db.session.delete(changelog)
@@ -182,6 +206,44 @@ class ChangeLogDetailResource(Resource):
             return {"error": "Internal Server Error"}, 500
 
 
+class ChangeLogVersionResource(Resource):
+    @jwt_required()
+    @role_required(ROLE_OWNER, ROLE_ADMIN)
+    def get(self, entity_type, entity_id, version):
+        """
+        Rebuild an entity as it was at a version of its changelog history,
+        from the nearest full snapshot and the diffs after it.
+        """
+        try:
+            current_user = User.query.get_or_404(get_jwt_identity())
+            entry = ChangeLog.query.filter_by(
+                entity_type=entity_type, entity_id=entity_id, entity_version=version
+            ).first_or_404()
+
+            if not current_user.business_id or entry.business_id != current_user.business_id:
+                return {"error": "Access denied"}, 403
+
+            state = reconstruct(db.session, entity_type, entity_id, version)
+            if state is None:
+                return {"error": "History for this version is incomplete"}, 404
+
+            return {
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "version": version,
+                "action": entry.action,
+                "timestamp": entry.timestamp.isoformat() if entry.timestamp else None,
+                "state": state
+            }, 200
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("Error in ChangeLogVersionResource GET", exc_info=e)
+            return {"error": "Internal Server Error"}, 500
+
+
 # Register routes
 api.add_resource(ChangeLogListResource, '/changelogs')
 api.add_resource(ChangeLogDetailResource, '/changelogs/<int:log_id>')
+api.add_resource(ChangeLogVersionResource, '/changelogs/<string:entity_type>/<int:entity_id>/versions/<int:version>')
@@ -1,22 +1,49 @@
 from flask import request, g
 from flask_restful import Resource, Api
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from server.models import Customer, Debt, User
+from server.models import Customer, CustomerBalance, Debt, User
 from server.schemas.customer_schema import CustomerSchema
 from server.extension import db
 from . import customer_bp
-from server.utils.decorators import role_required
+from server.utils.decorators import role_required, conditional_get
 from server.utils.roles import ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON
 from server.utils.change_logger import log_change
 from server.schemas.debt_schema import DebtSchema
+from server.schemas.row_serializers import CustomerRowSerializer
+from server.utils.helper import pagination_args, parse_date_range
+from server.utils.json_output import output_json
+from server.utils.projection import ListProjection
+from server.service.customers import find_customer, upsert_customer
+from server.service.customer_search import DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT, search_customers
+from server.service.customer_statement import (
+    DEFAULT_PER_PAGE as DEFAULT_STATEMENT_PER_PAGE, MAX_PER_PAGE as MAX_STATEMENT_PER_PAGE, customer_statement,
+)
+from server.service.debt_search import refresh_customer_documents
+from sqlalchemy import select
 
 api = Api(customer_bp)
+api.representation("application/json")(output_json)
 
 customer_schema = CustomerSchema()
 customers_schema = CustomerSchema(many=True)
+customer_projection = ListProjection(
+    CustomerSchema, CustomerRowSerializer,
+    summary_fields=("id", "customer_name", "phone", "email"),
+)
 debt_schema = DebtSchema()
 debts_schema = DebtSchema(many=True)
 
+# ?sort= orders for the customer list; balances come from customer_balances
+CUSTOMER_SORTS = {
+    "id": (Customer.id,),
+    "name": (Customer.customer_name, Customer.id),
+    "outstanding": (CustomerBalance.outstanding.desc().nulls_last(), Customer.id),
+    "oldest_due": (CustomerBalance.oldest_due_date.asc().nulls_last(), Customer.id),
+}
+
+# Customer fields copied into their debts' search documents
+SEARCHED_FIELDS = {"customer_name", "phone", "id_number"}
+
 def can_access_customer(user, customer, allow_sales=False):
     if customer.business_id != user.business_id:
         return False
@@ -35,6 +62,7 @@ class CustomerResource(Resource):
 
     @jwt_required()
     @role_required(ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON)
+    @conditional_get()
     def get(self, customer_id=None):
         current_user = User.query.get_or_404(get_jwt_identity())
 
@@ -44,9 +72,11 @@ class CustomerResource(Resource):
                 return {"message": "Access denied"}, 403
             debts = Debt.query.filter_by(customer_id=customer.id).all()
             debts_data = debts_schema.dump(debts)
+            balance = db.session.get(CustomerBalance, customer.id)
 
             return {
                 "customer": customer_schema.dump(customer), 
+                "balance": balance.as_dict() if balance else CustomerBalance.EMPTY,
                 "debts": debts_data
             }, 200
         print("Current user ID:", current_user.id)
@@ -55,22 +85,27 @@ class CustomerResource(Resource):
 
 
         # List customers
-        if current_user.role in [ROLE_OWNER, ROLE_ADMIN]:
-            customers = Customer.query.filter_by(
-                business_id=current_user.business_id
-            ).all()
-        else:  # Salesperson
+        customer_rows, error, status = customer_projection.from_request()
+        if error:
+            return error, status
+        sort = request.args.get("sort", "id")
+        if sort not in CUSTOMER_SORTS:
+            return {"message": f"sort must be one of: {', '.join(CUSTOMER_SORTS)}"}, 400
+
+        query = customer_rows.select().where(Customer.business_id == current_user.business_id)
+        if current_user.role not in [ROLE_OWNER, ROLE_ADMIN]:  # Salesperson
             customer_ids = (
                 db.session.query(Debt.customer_id)
                 .filter_by(created_by=current_user.id)
                 .distinct()
             )
-            customers = Customer.query.filter(
-                Customer.id.in_(customer_ids),
-                Customer.business_id == current_user.business_id
-            ).all()
+            query = query.where(Customer.id.in_(customer_ids))
+
+        if sort in ("outstanding", "oldest_due"):
+            query = query.outerjoin(CustomerBalance, CustomerBalance.customer_id == Customer.id)
+        rows = db.session.execute(query.order_by(*CUSTOMER_SORTS[sort])).all()
 
-        return {"customers": customers_schema.dump(customers)}, 200
+        return {"customers": customer_rows.dump(rows)}, 200
 
     @jwt_required()
     @role_required(ROLE_OWNER, ROLE_ADMIN)
@@ -84,18 +119,20 @@ class CustomerResource(Resource):
         if data.get("business_id") != current_user.business_id:
             return {"message": "Invalid business assignment"}, 403
 
-        customer = Customer(
+        # A number already on file (in any spelling) returns that customer
+        customer, created = upsert_customer(
+            db.session, current_user.business_id, current_user.id,
             customer_name=data["customer_name"],
             phone=data["phone"],
             id_number=data["id_number"],
             email=data["email"],
-            business_id=current_user.business_id,
-            created_by=current_user.id
         )
+        if not created:
+            existing = customer_schema.dump(customer)
+            db.session.rollback()  # release the sequence number reserved for the insert
+            return {"customer": existing, "existing": True}, 200
 
-        db.session.add(customer)
-        db.session.flush()
-        log_change("Customer", customer.id, "create", customer_schema.dump(customer))
+        log_change("Customer", customer.id, "create", entity=customer)
         db.session.commit()
 
         return {"customer": customer_schema.dump(customer)}, 201
@@ -114,13 +151,20 @@ class CustomerResource(Resource):
         if errors:
             return {"errors": errors}, 400
 
+        if "phone" in data:
+            other = find_customer(db.session, customer.business_id, data["phone"])
+            if other is not None and other.id != customer.id:
+                return {"message": f"Customer {other.id} already has this phone number", "customer_id": other.id}, 409
+
         for key, value in data.items():
             if hasattr(customer, key) and key != "business_id":
                 setattr(customer, key, value)
 
         db.session.add(customer)
         db.session.flush()
-        log_change("Customer", customer.id, "update", customer_schema.dump(customer))
+        if SEARCHED_FIELDS.intersection(data):
+            refresh_customer_documents(db.session, [customer.id])
+        log_change("Customer", customer.id, "update", entity=customer)
         db.session.commit()
 
         return {"customer": customer_schema.dump(customer)}, 200
@@ -134,11 +178,74 @@ class CustomerResource(Resource):
         if not can_access_customer(current_user, customer):
             return {"message": "Access denied"}, 403
 
-        log_change("Customer", customer.id, "delete", customer_schema.dump(customer))
+        log_change("Customer", customer.id, "delete", entity=customer)
         db.session.delete(customer)
         db.session.commit()
 
         return {"message": f"Customer {customer_id} deleted"}, 200
 
 
+class CustomerStatementResource(Resource):
+
+    @role_required(ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON)
+    @conditional_get()
+    def get(self, customer_id):
+        """
+        The customer's debts (debits) and payments (credits) oldest first,
+        each with the running balance after it, from an opening balance
+        row. ?start_date=/&end_date= (YYYY-MM-DD) set the window, ?page=,
+        ?per_page= (default 50, max 200) page through it.
+        """
+        current_user = g.current_user
+        customer = Customer.query.get_or_404(customer_id)
+        if not can_access_customer(current_user, customer, allow_sales=True):
+            return {"message": "Access denied"}, 403
+
+        try:
+            start, end = parse_date_range(request.args)
+        except ValueError:
+            return {"message": "start_date and end_date must be YYYY-MM-DD"}, 400
+        try:
+            page, per_page = pagination_args(DEFAULT_STATEMENT_PER_PAGE, MAX_STATEMENT_PER_PAGE)
+        except ValueError:
+            return {"message": "page and per_page must be integers"}, 400
+
+        statement = customer_statement(db.session, customer.id, start, end, page, per_page)
+        return {
+            "customer": {"id": customer.id, "customer_name": customer.customer_name, "phone": customer.phone},
+            "start_date": request.args.get("start_date"),
+            "end_date": request.args.get("end_date"),
+            **statement,
+        }, 200
+
+
+class CustomerSearchResource(Resource):
+
+    @role_required(ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON)
+    def get(self):
+        """
+        Autocomplete: ?q= matches name word prefixes or, for numbers, the
+        phone number in any spelling (0712..., +254712...). ?limit= caps
+        the matches (default 10, at most 50), best first.
+        """
+        current_user = g.current_user
+        query = request.args.get("q", "")
+        try:
+            limit = int(request.args.get("limit", DEFAULT_SEARCH_LIMIT))
+        except ValueError:
+            return {"message": "limit must be an integer"}, 400
+
+        visible = None
+        if current_user.role not in [ROLE_OWNER, ROLE_ADMIN]:  # Salesperson
+            visible = select(Debt.customer_id).where(Debt.created_by == current_user.id)
+
+        matches = search_customers(current_user.business_id, query, limit, visible)
+        serializer = customer_projection.serializer(customer_projection.summary_fields)
+        rows = {row.id: row for row in serializer.rows_where_in(Customer.id, [cid for _, cid in matches])}
+        found = [rows[cid] for _, cid in matches if cid in rows]
+        return {"query": query, "customers": serializer.dump(found)}, 200
+
+
 api.add_resource(CustomerResource, "/customers", "/customers/<int:customer_id>")
+api.add_resource(CustomerSearchResource, "/customers/search")
+api.add_resource(CustomerStatementResource, "/customers/<int:customer_id>/statement")
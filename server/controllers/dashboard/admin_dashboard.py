@@ -1,16 +1,20 @@
 from flask_restful import Resource, reqparse, Api
+from flask import g
 from server.models import db, User, Business, Customer, Debt
-from server.utils.decorators import role_required
+from server.utils.decorators import role_required, conditional_get, visible_business_ids
+from server.utils.actors import resolve_actors
 from server.utils.roles import ROLE_ADMIN
 from sqlalchemy import func
 from datetime import datetime
-from . import dashboard_bp
+from . import dashboard_bp, DASHBOARD_TIME_BUCKET
+from .communications import recent_communications
 
 api = Api(dashboard_bp)
 
 
 class ManagerDashboard(Resource):
     @role_required(ROLE_ADMIN)
+    @conditional_get(time_bucket=DASHBOARD_TIME_BUCKET)
     def get(self):
         parser = reqparse.RequestParser()
         parser.add_argument("business_id", type=int, required=True, location="args")
@@ -39,10 +43,12 @@ class ManagerDashboard(Resource):
         # SUMMARY
         total_debts = base_query.count()
         total_amount = db.session.query(func.sum(Debt.total))\
+            .select_from(Debt)\
             .join(Customer)\
             .filter(Customer.business_id == business_id, *date_filter)\
             .scalar() or 0
         total_paid = db.session.query(func.sum(Debt.amount_paid))\
+            .select_from(Debt)\
             .join(Customer)\
             .filter(Customer.business_id == business_id, *date_filter)\
             .scalar() or 0
@@ -86,16 +92,23 @@ class ManagerDashboard(Resource):
 
         # OVERDUE DEBTS
         overdue_list = base_query.filter(Debt.balance > 0, Debt.due_date < datetime.utcnow()).order_by(Debt.due_date.asc()).all()
+        salespeople = resolve_actors(d.created_by for d in overdue_list)
         overdue_data = [
             {
                 "customer": d.customer.customer_name,
                 "due_date": d.due_date.isoformat() if d.due_date else None,
                 "balance": float(d.balance),
-                "salesperson": d.created_by_user.name
+                "salesperson": salespeople[d.created_by].name
             }
             for d in overdue_list
         ]
 
+        # RECENT COMMUNICATIONS
+        communications = recent_communications(
+            g.current_user,
+            [business_id] if business_id in visible_business_ids(g.current_user) else [],
+        )
+
         return {
             "business":{
                 "name": business.name
@@ -110,6 +123,7 @@ class ManagerDashboard(Resource):
             },
             "team_performance": team_data,
             "overdue_escalations": overdue_data,
+            "communications": communications,
             "collection_efficiency": recovery_rate
         }
 
@@ -0,0 +1,86 @@
+from flask import g, request
+from flask_restful import Resource, Api
+from sqlalchemy import or_, select
+from server.models import ChangeLog, Debt
+from server.utils.decorators import role_required, conditional_get, visible_business_ids
+from server.utils.helper import paginated, pagination_args, parse_date_range
+from server.utils.roles import ROLE_SALESPERSON, ALL_ROLES
+from . import dashboard_bp
+
+api = Api(dashboard_bp)
+
+
+def communications_query(user, business_ids, start=None, end=None):
+    """
+    Reminders sent for the given businesses, newest first (served by
+    ix_changelogs_business_timestamp). Salespersons only see reminders
+    they sent or that concern debts they created.
+    """
+    query = ChangeLog.query.filter(
+        ChangeLog.business_id.in_(business_ids),
+        ChangeLog.entity_type == "Debt",
+        ChangeLog.action == "reminder",
+    )
+    if user.role == ROLE_SALESPERSON:
+        query = query.filter(or_(
+            ChangeLog.changed_by == user.id,
+            ChangeLog.entity_id.in_(select(Debt.id).where(Debt.created_by == user.id)),
+        ))
+    if start:
+        query = query.filter(ChangeLog.timestamp >= start)
+    if end:
+        query = query.filter(ChangeLog.timestamp < end)
+    return query.order_by(ChangeLog.timestamp.desc(), ChangeLog.id.desc())
+
+
+def format_communication(log):
+    details = log.details or {}
+    return {
+        "id": log.id,
+        "debt_id": log.entity_id,
+        "business_id": log.business_id,
+        "channel": details.get("channel"),
+        "reminder_type": details.get("reminder_type"),
+        "status": details.get("status"),
+        "message": f"{details.get('reminder_type','')} reminder via {details.get('channel','')} ({details.get('status','')})",
+        "sent_by": log.changed_by,
+        "timestamp": log.timestamp.isoformat() if log.timestamp else None,
+    }
+
+
+def recent_communications(user, business_ids, start=None, end=None, limit=10):
+    """The first page of communications, as embedded in the dashboards."""
+    return [format_communication(log) for log in communications_query(user, business_ids, start, end).limit(limit)]
+
+
+class CommunicationListResource(Resource):
+    @role_required(*ALL_ROLES)
+    @conditional_get()
+    def get(self):
+        """
+        Paginated reminder log of the user's businesses.
+        ?page=, ?per_page= (max 100), ?start_date=/&end_date= (YYYY-MM-DD),
+        ?business_id= to narrow an owner's businesses to one.
+        """
+        user = g.current_user
+        try:
+            page, per_page = pagination_args()
+            business_id = request.args.get("business_id", type=int)
+        except ValueError:
+            return {"message": "page and per_page must be integers"}, 400
+        try:
+            start, end = parse_date_range(request.args)
+        except ValueError:
+            return {"message": "start_date and end_date must be YYYY-MM-DD"}, 400
+
+        business_ids = visible_business_ids(user)
+        if business_id is not None:
+            if business_id not in business_ids:
+                return {"message": "Business not found"}, 404
+            business_ids = [business_id]
+
+        query = communications_query(user, business_ids, start, end)
+        return paginated("communications", query, page, per_page, format_communication), 200
+
+
+api.add_resource(CommunicationListResource, "/communications")
@@ -1,17 +1,22 @@
 from cmath import log
 from flask_restful import Resource, reqparse, Api
 from flask import g
-from server.models import db, Business, Debt, Payment, User, Customer,ChangeLog
-from server.utils.decorators import role_required
+from server.models import db, Business, Debt, Payment, User, Customer, CustomerBalance
+from server.utils.decorators import role_required, conditional_get
+from server.utils.actors import resolve_actors
 from server.utils.roles import ROLE_OWNER
+from server.service.business_profile import OPEN_DEBT_STATUSES
+from server.utils.analytics import days_between, percentile
 from sqlalchemy import func, case,desc
 from datetime import datetime, timedelta
-from . import dashboard_bp
+from . import dashboard_bp, DASHBOARD_TIME_BUCKET
+from .communications import recent_communications
 
 api = Api(dashboard_bp)
 
 class OwnerDashboard(Resource):
     @role_required(ROLE_OWNER)
+    @conditional_get(time_bucket=DASHBOARD_TIME_BUCKET)
     def get(self):
         parser = reqparse.RequestParser()
         parser.add_argument(
@@ -98,31 +103,52 @@ class OwnerDashboard(Resource):
             .all()
         )
 
-        # TOP DEBTORS
-        top_debtors_query = (
-            db.session.query(
-                Customer.customer_name,
-                Customer.phone,
-                func.sum(Debt.balance).label("total_balance"),
-                Debt.status
+        # TOP DEBTORS: all-time balances come from the customer_balances
+        # summary; a date range needs the range's debts, so it reads them live
+        if date_filters:
+            open_debt = Debt.status.in_(OPEN_DEBT_STATUSES)
+            top_debtors_query = (
+                db.session.query(
+                    Customer.customer_name,
+                    Customer.phone,
+                    func.sum(Debt.balance).label("outstanding"),
+                    func.sum(case((open_debt, 1), else_=0)).label("open_debts"),
+                    func.min(case((open_debt, Debt.due_date))).label("oldest_due_date"),
+                )
+                .select_from(Debt)
+                .join(Customer, Debt.customer_id == Customer.id)
+                .filter(Customer.business_id.in_(business_ids), *date_filters, Debt.balance > 0)
+                .group_by(Customer.id, Customer.customer_name, Customer.phone)
+                .order_by(func.sum(Debt.balance).desc(), Customer.id)
+                .limit(10)
+                .all()
             )
-            .select_from(Debt)
-            .join(Customer, Debt.customer_id == Customer.id)
-            .filter(Customer.business_id.in_(business_ids), *date_filters, Debt.balance > 0)
-            .group_by(Customer.id, Customer.customer_name, Customer.phone, Debt.status)
-            .order_by(func.sum(Debt.balance).desc())
-            .limit(10)
-            .all()
-        )
-        
+        else:
+            top_debtors_query = (
+                db.session.query(
+                    Customer.customer_name,
+                    Customer.phone,
+                    CustomerBalance.outstanding,
+                    CustomerBalance.open_debts,
+                    CustomerBalance.oldest_due_date,
+                )
+                .select_from(CustomerBalance)
+                .join(Customer, CustomerBalance.customer_id == Customer.id)
+                .filter(CustomerBalance.business_id.in_(business_ids), CustomerBalance.outstanding > 0)
+                .order_by(CustomerBalance.outstanding.desc(), CustomerBalance.customer_id)
+                .limit(10)
+                .all()
+            )
+
         top_debtors = [
             {
                 "customer": customer,
                 "phone": phone,
-                "amount": float(total_balance),
-                "status": status
+                "amount": float(outstanding),
+                "open_debts": int(open_debts or 0),
+                "oldest_due_date": oldest_due_date.isoformat() if oldest_due_date else None,
             }
-            for customer, phone, total_balance, status in top_debtors_query
+            for customer, phone, outstanding, open_debts, oldest_due_date in top_debtors_query
         ]
 
         # UPCOMING PAYMENTS
@@ -162,35 +188,23 @@ class OwnerDashboard(Resource):
             "achievement_percent": (total_paid / (total_amount * 1.2) * 100) if total_amount > 0 else 0
         }
 
-        # RECENT COMMUNICATIONS (mock data - you'll need to implement actual communication logs)
-        logs = (
-            ChangeLog.query.filter(
-                ChangeLog.entity_type == "Debt",
-                ChangeLog.action == "reminder",
-                ChangeLog.timestamp >= start_date_obj if start_date else True,
-                ChangeLog.timestamp <= end_date_obj if end_date else True, 
-            )
-            .order_by(ChangeLog.timestamp.desc())
-            .limit(10)
-            .all()
+        # RECENT COMMUNICATIONS
+        communication_logs = recent_communications(
+            g.current_user,
+            business_ids,
+            start_date_obj if start_date else None,
+            end_date_obj + timedelta(days=1) if end_date else None,
         )
-        communication_logs = [
-            {
-                "message": f"{log.details.get('reminder_type','')} reminder via {log.details.get('channel','')} ({log.details.get('status','')})",
-                "timestamp": log.timestamp.isoformat(),
-                "debt_id": log.entity_id
-            }
-            for log in logs
-        ]
 
         # AVERAGE REPAYMENT TIME
-        avg_days_query = (
-            db.session.query(func.avg(func.date_part("day", Payment.payment_date - Debt.created_at)))
+        repayment_days = (
+            db.session.query(days_between(Payment.payment_date, Debt.created_at))
             .join(Debt, Debt.id == Payment.debt_id)
             .join(Customer)
             .filter(Customer.business_id.in_(business_ids), *date_filters)
         )
-        avg_repayment_days = avg_days_query.scalar() or 0
+        avg_repayment_days = db.session.query(func.avg(repayment_days.subquery().c[0])).scalar() or 0
+        median_repayment_days = percentile(db.session, repayment_days.statement, 0.5) or 0
 
         # SALES TEAM PERFORMANCE
         team_performance_query = (
@@ -224,14 +238,16 @@ class OwnerDashboard(Resource):
             Debt.due_date < datetime.utcnow()
         ).order_by(Debt.due_date.asc())
         
+        overdue_debts = overdue_query.all()
+        salespeople = resolve_actors(debt.created_by for debt in overdue_debts)
         overdue_data = [
             {
                 "customer": debt.customer.customer_name,
                 "due_date": debt.due_date.isoformat() if debt.due_date else None,
                 "balance": float(debt.balance),
-                "salesperson": debt.created_by_user.name
+                "salesperson": salespeople[debt.created_by].name
             }
-            for debt in overdue_query
+            for debt in overdue_debts
         ]
 
         return {
@@ -244,7 +260,8 @@ class OwnerDashboard(Resource):
                 "total_paid": float(total_paid),
                 "total_balance": float(total_balance),
                 "recovery_rate": recovery_rate,
-                "avg_repayment_days": avg_repayment_days,
+                "avg_repayment_days": round(float(avg_repayment_days), 1),
+                "median_repayment_days": round(median_repayment_days, 1),
                 "status_breakdown": status_breakdown
             },
             "performance_vs_target": performance_vs_target,
@@ -0,0 +1,115 @@
+from datetime import datetime
+from flask import g, request
+from flask_restful import Resource, Api
+from sqlalchemy import and_, case, func, select
+from server.models import db, Business, Debt, Payment
+from server.service.business_profile import OPEN_DEBT_STATUSES, business_counts
+from server.utils.analytics import with_rollup
+from server.utils.decorators import role_required, conditional_get, visible_business_ids
+from server.utils.helper import parse_date_range
+from server.utils.roles import ROLE_OWNER
+from . import dashboard_bp, DASHBOARD_TIME_BUCKET
+
+api = Api(dashboard_bp)
+
+
+def portfolio_rows(business_ids, start=None, end=None, now=None):
+    """
+    One grouped query: ``{business_id: metrics}`` for every business with
+    debts, plus the combined metrics under the key None.
+    """
+    now = now or datetime.utcnow()
+    debt_filters = [Debt.business_id.in_(business_ids)]
+    if start:
+        debt_filters.append(Debt.created_at >= start)
+    if end:
+        debt_filters.append(Debt.created_at < end)
+
+    paid = (
+        select(Payment.debt_id, func.sum(Payment.amount).label("amount"))
+        .join(Debt, Debt.id == Payment.debt_id)
+        .where(*debt_filters)
+        .group_by(Payment.debt_id)
+        .subquery()
+    )
+    amount_paid = func.coalesce(paid.c.amount, 0)
+    overdue = and_(Debt.due_date < now, Debt.total - amount_paid > 0)
+
+    stmt = (
+        select(
+            Debt.business_id,
+            func.count(Debt.id).label("debts"),
+            func.count(func.distinct(Debt.customer_id)).label("debtors"),
+            func.coalesce(func.sum(Debt.total), 0).label("total_amount"),
+            func.coalesce(func.sum(amount_paid), 0).label("total_paid"),
+            func.coalesce(func.sum(case((Debt.status.in_(OPEN_DEBT_STATUSES), 1), else_=0)), 0).label("open_debts"),
+            func.coalesce(func.sum(case((overdue, 1), else_=0)), 0).label("overdue_debts"),
+            func.coalesce(func.sum(case((overdue, Debt.total - amount_paid), else_=0)), 0).label("overdue_amount"),
+        )
+        .select_from(Debt)
+        .outerjoin(paid, paid.c.debt_id == Debt.id)
+        .where(*debt_filters)
+    )
+    return {row.business_id: row._asdict() for row in db.session.execute(with_rollup(db.session, stmt, Debt.business_id))}
+
+
+def format_metrics(row, customers):
+    row = row or {}
+    total_amount = float(row.get("total_amount") or 0)
+    total_paid = float(row.get("total_paid") or 0)
+    return {
+        "customers": customers,
+        "debts": int(row.get("debts") or 0),
+        "debtors": int(row.get("debtors") or 0),
+        "open_debts": int(row.get("open_debts") or 0),
+        "overdue_debts": int(row.get("overdue_debts") or 0),
+        "total_amount": round(total_amount, 2),
+        "total_paid": round(total_paid, 2),
+        "total_balance": round(total_amount - total_paid, 2),
+        "overdue_amount": round(float(row.get("overdue_amount") or 0), 2),
+        "recovery_rate": round(total_paid / total_amount * 100, 2) if total_amount > 0 else 0,
+    }
+
+
+class PortfolioDashboard(Resource):
+    @role_required(ROLE_OWNER)
+    @conditional_get(time_bucket=DASHBOARD_TIME_BUCKET)
+    def get(self):
+        """
+        Side by side metrics of all the owner's businesses plus their
+        combined totals. ?start_date=/&end_date= (YYYY-MM-DD) limit the
+        debts by creation date.
+        """
+        try:
+            start, end = parse_date_range(request.args)
+        except ValueError:
+            return {"message": "start_date and end_date must be YYYY-MM-DD"}, 400
+
+        business_ids = visible_business_ids(g.current_user)
+        if not business_ids:
+            return {"message": "No businesses found for this owner"}, 404
+
+        businesses = Business.query.filter(Business.id.in_(business_ids)).order_by(Business.name).all()
+        rows = portfolio_rows(business_ids, start, end)
+        counts = business_counts(business_ids)
+
+        portfolio = []
+        for business in businesses:
+            metrics = format_metrics(rows.get(business.id), counts[business.id]["customers"])
+            portfolio.append({"id": business.id, "name": business.name, **metrics})
+
+        combined = format_metrics(rows.get(None), sum(c["customers"] for c in counts.values()))
+        for entry in portfolio:
+            entry["share_of_balance"] = (
+                round(entry["total_balance"] / combined["total_balance"] * 100, 2) if combined["total_balance"] > 0 else 0
+            )
+        portfolio.sort(key=lambda entry: entry["total_balance"], reverse=True)
+
+        return {
+            "business_count": len(portfolio),
+            "businesses": portfolio,
+            "combined": combined,
+        }, 200
+
+
+api.add_resource(PortfolioDashboard, "/dashboard-portfolio")
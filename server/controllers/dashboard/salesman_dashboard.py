@@ -1,17 +1,19 @@
 from flask_restful import Resource, reqparse, Api
 from flask import g
-from server.models import db, Customer, Debt, ChangeLog
-from server.utils.decorators import role_required
+from server.models import db, ChangeLog, Customer, Debt
+from server.utils.decorators import role_required, conditional_get, visible_business_ids
 from server.utils.roles import ROLE_SALESPERSON
 from sqlalchemy import func
 from datetime import datetime
-from . import dashboard_bp
+from . import dashboard_bp, DASHBOARD_TIME_BUCKET
+from .communications import recent_communications
 
 api = Api(dashboard_bp)
 
 
 class SalesmanDashboard(Resource):
     @role_required(ROLE_SALESPERSON)
+    @conditional_get(time_bucket=DASHBOARD_TIME_BUCKET)
     def get(self):
         user_id = g.current_user.id
 
@@ -84,14 +86,27 @@ class SalesmanDashboard(Resource):
             for d in upcoming
         ]
 
-        # RECENT COMMUNICATIONS
+        # RECENT COMMUNICATIONS: the salesperson's own latest changelog entries
+        # (same keys as ever), plus the reminder feed under "reminders"
+        business_ids = visible_business_ids(g.current_user)
         communications = (
-            ChangeLog.query.filter_by(changed_by=user_id)
-            .order_by(ChangeLog.timestamp.desc())
+            ChangeLog.query.filter(ChangeLog.changed_by == user_id, ChangeLog.business_id.in_(business_ids))
+            .order_by(ChangeLog.timestamp.desc(), ChangeLog.id.desc())
             .limit(10)
             .all()
         )
-        comm_data = [{"timestamp": c.timestamp.isoformat(), "details": c.details} for c in communications]
+        comm_data = [
+            {
+                "timestamp": c.timestamp.isoformat() if c.timestamp else None,
+                "details": c.details,
+                "id": c.id,
+                "entity_type": c.entity_type,
+                "entity_id": c.entity_id,
+                "action": c.action,
+            }
+            for c in communications
+        ]
+        reminders = recent_communications(g.current_user, business_ids)
 
         # PERFORMANCE VS TARGET
         target_amount = 5000  # You can replace with dynamic target if needed
@@ -110,6 +125,7 @@ class SalesmanDashboard(Resource):
             "customers": customer_data,
             "upcoming_payments": upcoming_data,
             "communications": comm_data,
+            "reminders": reminders,
             "performance_vs_target": {
                 "target_amount": target_amount,
                 "collected": float(total_paid),
@@ -5,17 +5,29 @@ from server.extension import db
 from datetime import datetime
 from . import debt_bp
 from server.schemas.debt_schema import DebtSchema
+from server.schemas.row_serializers import DebtRowSerializer
 from server.utils.change_logger import log_change
 from server.utils.roles import ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON
-from server.utils.decorators import role_required
+from server.utils.decorators import role_required, conditional_get
 from sqlalchemy.orm import joinedload
 from server.service.debt_notifications import send_debt_notification
+from server.service.customer_balances import refresh_customer_balances
+from server.service.customers import upsert_customer
+from server.service.debt_search import refresh_debt_documents
+from server.service.debt_totals import recompute_debt
+from server.utils.json_output import output_json
+from server.utils.projection import ListProjection
 
 api = Api(debt_bp)
+api.representation("application/json")(output_json)
 
 # Schemas
 debt_schema = DebtSchema()
 debts_schema = DebtSchema(many=True)
+debt_projection = ListProjection(
+    DebtSchema, DebtRowSerializer,
+    summary_fields=("id", "customer_name", "total", "balance", "status", "due_date"),
+)
 
 
 # ---------------------------
@@ -44,6 +56,7 @@ def can_access_debt(user, debt):
 class DebtResource(Resource):
 
     @role_required(ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON)
+    @conditional_get()
     def get(self, debt_id=None):
         current_user = g.current_user
 
@@ -58,20 +71,23 @@ class DebtResource(Resource):
                 return {"message": "Access denied"}, 403
             return debt_schema.dump(debt), 200
 
+        debt_rows, error, status = debt_projection.from_request()
+        if error:
+            return error, status
+
         # Fetch all debts for user's business with proper filtering
-        query = Debt.query.options(
-            joinedload(Debt.customer),
-            joinedload(Debt.created_by_user)  # Include creator information
-        ).join(Customer).filter(Customer.business_id == current_user.business_id)
+        query = debt_rows.select().join(Customer, Customer.id == Debt.customer_id).where(
+            Customer.business_id == current_user.business_id
+        )
 
         # Salespeople can only see their own debts
         if current_user.role == ROLE_SALESPERSON:
-            query = query.filter(Debt.created_by == current_user.id)
+            query = query.where(Debt.created_by == current_user.id)
 
         # For owners and admins, no additional filtering needed - they see all
-        debts = query.order_by(Debt.created_at.desc()).all()
-        
-        return debts_schema.dump(debts), 200
+        rows = db.session.execute(query.order_by(Debt.created_at.desc())).all()
+
+        return debt_rows.dump(rows), 200
 
     @role_required(ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON)
     def post(self):
@@ -89,23 +105,14 @@ class DebtResource(Resource):
             if not all(data.get(field) for field in required_fields):
                 return {"message": "Customer details are required if customer_id is not provided"}, 400
 
-            customer = Customer.query.filter_by(
+            # Matched on the normalized phone, so any spelling of the number finds the customer
+            customer, _ = upsert_customer(
+                db.session, business_id, current_user.id,
                 customer_name=data["customer_name"],
                 phone=data["phone"],
-                business_id=business_id
-            ).first()
-
-            if not customer:
-                customer = Customer(
-                    customer_name=data["customer_name"],
-                    phone=data["phone"],
-                    id_number=data["id_number"],
-                    email=data.get("email"),
-                    business_id=business_id,
-                    created_by=current_user.id
-                )
-                db.session.add(customer)
-                db.session.flush()  
+                id_number=data["id_number"],
+                email=data.get("email"),
+            )
             customer_id = customer.id
         else:
             customer = Customer.query.get_or_404(customer_id)
@@ -144,7 +151,6 @@ class DebtResource(Resource):
                 category=item_data.get("category") or category
             ))
 
-        debt.calculate_total()
         initial_payment = data.get("amount_paid", 0)
         if initial_payment > 0:
             from server.models.payment import Payment
@@ -155,6 +161,9 @@ class DebtResource(Resource):
                 received_by=current_user.id
             )
             db.session.add(payment)
+        recompute_debt(db.session, debt)
+        refresh_debt_documents(db.session, [debt.id])
+        log_change("Debt", debt.id, "create", entity=debt)
         db.session.commit()
         send_debt_notification(debt, kind="receipt", via_email=True, via_sms=False)
 
@@ -162,8 +171,6 @@ class DebtResource(Resource):
             joinedload(Debt.customer),
             joinedload(Debt.created_by_user)
         ).get(debt.id)
-        
-        log_change("Debt", debt.id, "create", debt_schema.dump(debt_with_customer))
 
         return debt_schema.dump(debt_with_customer), 201
 
@@ -181,6 +188,7 @@ class DebtResource(Resource):
         data = request.get_json() or {}
 
         # Update customer
+        previous_customer_id = debt.customer_id
         if "customer_id" in data:
             new_customer = Customer.query.get_or_404(data["customer_id"])
             if new_customer.business_id != current_user.business_id:
@@ -244,9 +252,12 @@ class DebtResource(Resource):
                     if item.id not in payload_ids:
                         db.session.delete(item)
 
-        db.session.flush()
-        debt.calculate_total()
-        debt.update_status()  # Update status based on balance
+        recompute_debt(db.session, debt)
+        if debt.customer_id != previous_customer_id:
+            # recompute_debt refreshed the new owner; the old one loses the debt
+            refresh_customer_balances(db.session, [previous_customer_id])
+        refresh_debt_documents(db.session, [debt.id])
+        log_change("Debt", debt.id, "update", entity=debt)
         db.session.commit()
         send_debt_notification(debt, kind="receipt", via_email=True, via_sms=False)
 
@@ -256,7 +267,6 @@ class DebtResource(Resource):
             joinedload(Debt.created_by_user)
         ).get(debt_id)
         
-        log_change("Debt", debt.id, "update", debt_schema.dump(updated_debt))
         return debt_schema.dump(updated_debt), 200
 
     @role_required(ROLE_OWNER, ROLE_ADMIN)
@@ -270,8 +280,9 @@ class DebtResource(Resource):
         if not can_access_debt(current_user, debt):
             return {"message": "Access denied"}, 403
 
-        log_change("Debt", debt.id, "delete", debt_schema.dump(debt))
+        log_change("Debt", debt.id, "delete", entity=debt)
         db.session.delete(debt)
+        refresh_customer_balances(db.session, [debt.customer_id])
         db.session.commit()
         # send_debt_receipt(debt, send_email=True, send_sms=False)
         return {"message": f"Debt {debt_id} deleted"}, 200
@@ -103,7 +103,8 @@ class FinanceSettingsResource(Resource):
             'default_currency', 'payment_due_day', 'grace_period_days',
             'late_fee_type', 'late_fee_value', 'late_fee_max', 'late_fee_recurring',
             'reminder_before_due', 'reminder_before_days',
-            'reminder_after_due', 'reminder_after_days', 'reminder_method'
+            'reminder_after_due', 'reminder_after_days', 'reminder_method',
+            'changelog_retention_months'
         ]
         changes = {}
         for field in updatable_fields:
@@ -116,6 +117,9 @@ class FinanceSettingsResource(Resource):
                     new_value = float(new_value)
                 elif field in ['late_fee_recurring', 'reminder_before_due', 'reminder_after_due']:
                     new_value = bool(new_value)
+                elif field == 'changelog_retention_months':
+                    # None keeps every changelog entry
+                    new_value = max(int(new_value), 1) if new_value is not None else None
                 if old_value != new_value:
                     setattr(settings, field, new_value)
                     changes[field] = {'old': old_value, 'new': new_value}
@@ -130,6 +134,7 @@ class FinanceSettingsResource(Resource):
             entity_id=int(settings.id),
             action="update",
             changed_by=int(user_id),
+            business_id=settings.business_id,
             details={"changes": changes}
         )
         db.session.add(log)
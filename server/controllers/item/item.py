@@ -1,17 +1,26 @@
 from flask_restful import Resource, Api
-from flask import request
+from flask import request, g
 from flask_jwt_extended import get_jwt_identity
-from server.models import Item, Debt, User
+from sqlalchemy import and_, case, func, select
+from server.models import Item, Debt, User, Payment
 from server.extension import db
 from . import item_bp  
 from server.schemas.item_schema import ItemSchema
-from server.utils.decorators import role_required
+from server.utils.decorators import role_required, conditional_get, visible_business_ids
+from server.utils.helper import paginated, pagination_args, parse_date_range
 from server.utils.roles import ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON
+from server.service.debt_search import refresh_debt_documents
+from server.service.debt_totals import recompute_debt
 
 item_schema = ItemSchema()
-item_list_schema = ItemSchema(many=True)
+# Listings carry debt_id instead of the nested debt
+item_list_schema = ItemSchema(exclude=("debt",))
 api = Api(item_bp)
 
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+SUMMARY_GROUPS = {"category": (Item.category,), "product": (Item.name, Item.category)}
+
 
 def make_response(data, code=200):
     """Ensure consistent JSON response"""
@@ -20,12 +29,55 @@ def make_response(data, code=200):
     return {"message": str(data)}, code
 
 
+def scoped_debt_filters(user):
+    """
+    Filters on Debt limiting debts to the user's businesses (narrowed by
+    ?business_id=) and, for salespersons, to debts they created. Also
+    applies ?start_date=/&end_date= on the debt's creation date.
+    Returns ``(filters, error, status)``.
+    """
+    business_ids = visible_business_ids(user)
+    business_id = request.args.get("business_id", type=int)
+    if business_id is not None:
+        if business_id not in business_ids:
+            return None, {"message": "Business not found"}, 404
+        business_ids = [business_id]
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError:
+        return None, {"message": "start_date and end_date must be YYYY-MM-DD"}, 400
+
+    filters = [Debt.business_id.in_(business_ids)]
+    if user.role == ROLE_SALESPERSON:
+        filters.append(Debt.created_by == user.id)
+    if start:
+        filters.append(Debt.created_at >= start)
+    if end:
+        filters.append(Debt.created_at < end)
+    return filters, None, None
+
+
+def item_category_filters():
+    """?category= (comma separated) as filters on Item."""
+    categories = [c.strip() for c in request.args.get("category", "").split(",") if c.strip()]
+    return [Item.category.in_(categories)] if categories else []
+
+
+def scoped_item_filters(user):
+    """``scoped_debt_filters`` plus ``item_category_filters``."""
+    filters, error, status = scoped_debt_filters(user)
+    if error:
+        return None, error, status
+    return filters + item_category_filters(), None, None
+
+
 class ItemResource(Resource):
 
     @role_required(ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON)
+    @conditional_get()
     def get(self, item_id=None):
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = g.current_user
 
         if item_id:
             item = Item.query.get_or_404(item_id)
@@ -34,19 +86,26 @@ class ItemResource(Resource):
             if not debt:
                 return make_response({"message": "Associated debt not found"}, 404)
 
+            if debt.business_id not in visible_business_ids(current_user):
+                return make_response({"message": "Access denied"}, 403)
+
             if current_user.role == ROLE_SALESPERSON and debt.created_by != current_user_id:
                 return make_response({"message": "Access denied"}, 403)
 
             return make_response(item_schema.dump(item))
 
-        # List all items user has access to
-        query = Item.query.join(Debt)
-        if current_user.role in (ROLE_OWNER, ROLE_ADMIN):
-            items = query.all()
-        else:
-            items = query.filter(Debt.created_by == current_user_id).all()
+        # Items of the user's businesses, newest debt first.
+        # ?page=, ?per_page= (max 200), ?category=, ?business_id=, ?start_date=/&end_date=
+        try:
+            page, per_page = pagination_args(DEFAULT_PER_PAGE, MAX_PER_PAGE)
+        except ValueError:
+            return make_response({"message": "page and per_page must be integers"}, 400)
+        filters, error, status = scoped_item_filters(current_user)
+        if error:
+            return make_response(error, status)
 
-        return make_response(item_list_schema.dump(items))
+        query = Item.query.join(Debt, Debt.id == Item.debt_id).filter(*filters).order_by(Item.debt_id.desc(), Item.id)
+        return make_response(paginated("items", query, page, per_page, item_list_schema.dump))
 
     @role_required(ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON)
     def post(self):
@@ -69,6 +128,8 @@ class ItemResource(Resource):
         item.debt_id = debt_id
 
         db.session.add(item)
+        recompute_debt(db.session, debt)
+        refresh_debt_documents(db.session, [debt.id])
         db.session.commit()
 
         return make_response(item_schema.dump(item), 201)
@@ -87,9 +148,8 @@ class ItemResource(Resource):
         data = request.get_json() or {}
         item = item_schema.load(data, instance=item, session=db.session, partial=True)
 
-        db.session.commit()
-        debt.calculate_total()
-        debt.update_balance()
+        recompute_debt(db.session, debt)
+        refresh_debt_documents(db.session, [debt.id])
         db.session.commit()
 
         return make_response(item_schema.dump(item))
@@ -106,14 +166,85 @@ class ItemResource(Resource):
             return make_response({"message": "Access denied"}, 403)
 
         db.session.delete(item)
-        db.session.commit()
-
-        debt.calculate_total()
-        debt.update_balance()
+        recompute_debt(db.session, debt)
+        refresh_debt_documents(db.session, [debt.id])
         db.session.commit()
 
         return make_response({"message": f"Item {item_id} deleted"})
 
 
+class ItemSummaryResource(Resource):
+    @role_required(ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON)
+    @conditional_get()
+    def get(self):
+        """
+        Quantity, revenue and outstanding amount per category
+        (?group_by=category, default) or product (?group_by=product), with
+        the listing's filters. A debt's unpaid balance is spread over its
+        items in proportion to their value.
+        """
+        group_by = request.args.get("group_by", "category")
+        if group_by not in SUMMARY_GROUPS:
+            return make_response({"message": f"group_by must be one of: {', '.join(SUMMARY_GROUPS)}"}, 400)
+        debt_filters, error, status = scoped_debt_filters(g.current_user)
+        if error:
+            return make_response(error, status)
+        filters = debt_filters + item_category_filters()
+
+        # Payments of the debts in scope only
+        paid = (
+            select(Payment.debt_id, func.sum(Payment.amount).label("amount"))
+            .join(Debt, Debt.id == Payment.debt_id)
+            .where(*debt_filters)
+            .group_by(Payment.debt_id)
+            .subquery()
+        )
+        remaining = Debt.total - func.coalesce(paid.c.amount, 0)
+        unpaid_share = case((and_(Debt.total > 0, remaining > 0), remaining / Debt.total), else_=0)
+        value = Item.price * Item.quantity
+        columns = SUMMARY_GROUPS[group_by]
+
+        rows = (
+            db.session.query(
+                *columns,
+                func.sum(Item.quantity).label("quantity"),
+                func.sum(value).label("revenue"),
+                func.sum(value * unpaid_share).label("outstanding"),
+                func.count(func.distinct(Item.debt_id)).label("debts"),
+            )
+            .select_from(Item)
+            .join(Debt, Debt.id == Item.debt_id)
+            .outerjoin(paid, paid.c.debt_id == Debt.id)
+            .filter(*filters)
+            .group_by(*columns)
+            .order_by(func.sum(value).desc())
+            .all()
+        )
+
+        groups = []
+        for row in rows:
+            group = {"category": row.category}
+            if group_by == "product":
+                group["product"] = row.name
+            group.update({
+                "quantity": int(row.quantity or 0),
+                "revenue": round(float(row.revenue or 0), 2),
+                "outstanding": round(float(row.outstanding or 0), 2),
+                "debts": row.debts,
+            })
+            groups.append(group)
+
+        return make_response({
+            "group_by": group_by,
+            "groups": groups,
+            "totals": {
+                "quantity": sum(group["quantity"] for group in groups),
+                "revenue": round(sum(group["revenue"] for group in groups), 2),
+                "outstanding": round(sum(group["outstanding"] for group in groups), 2),
+            },
+        })
+
+
 # Register resource
 api.add_resource(ItemResource, "/items", "/items/<int:item_id>")
+api.add_resource(ItemSummaryResource, "/items/summary")
@@ -5,17 +5,26 @@ from datetime import datetime
 from server.extension import db
 from server.models import Payment, Debt, User, Customer
 from server.schemas.payment_schema import PaymentSchema
+from server.schemas.row_serializers import PaymentRowSerializer
 from server.utils.change_logger import log_change
 from server.utils.roles import ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON
-from server.utils.decorators import role_required
+from server.utils.decorators import role_required, conditional_get
+from server.utils.json_output import output_json
+from server.utils.projection import ListProjection
+from server.service.debt_totals import recompute_debt, recompute_debts
 from . import payment_bp
 from sqlalchemy.orm import joinedload
 
 api = Api(payment_bp)
+api.representation("application/json")(output_json)
 
 # Schemas
 payment_schema = PaymentSchema()
 payments_schema = PaymentSchema(many=True)
+payment_projection = ListProjection(
+    PaymentSchema, PaymentRowSerializer,
+    summary_fields=("id", "debt_id", "amount", "payment_date", "method"),
+)
 
 
 def can_access_payment(user, payment):
@@ -41,6 +50,7 @@ def can_access_payment(user, payment):
 class PaymentResource(Resource):
 
     @role_required(ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON)
+    @conditional_get()
     def get(self, payment_id=None):
         current_user = g.current_user
 
@@ -54,22 +64,21 @@ class PaymentResource(Resource):
 
             return payment_schema.dump(payment), 200
 
+        payment_rows, error, status = payment_projection.from_request()
+        if error:
+            return error, status
+
         # List payments based on role and business
-        if current_user.role in [ROLE_ADMIN, ROLE_OWNER]:
-            payments = Payment.query.options(
-                joinedload(Payment.debt).joinedload(Debt.customer)
-            ).join(Debt).join(Customer).filter(
-                Customer.business_id == current_user.business_id
-            ).all()
-        else:  # salesperson
-            payments = Payment.query.options(
-                joinedload(Payment.debt).joinedload(Debt.customer)
-            ).join(Debt).join(Customer).filter(
-                Customer.business_id == current_user.business_id,
-                Payment.received_by == current_user.id
-            ).all()
+        query = payment_rows.select().join(Debt, Debt.id == Payment.debt_id).join(
+            Customer, Customer.id == Debt.customer_id
+        ).where(Customer.business_id == current_user.business_id)
+
+        if current_user.role not in [ROLE_ADMIN, ROLE_OWNER]:  # salesperson
+            query = query.where(Payment.received_by == current_user.id)
+
+        rows = db.session.execute(query.order_by(Payment.id)).all()
 
-        return payments_schema.dump(payments), 200
+        return payment_rows.dump(rows), 200
 
     @role_required(ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON)
     def post(self):
@@ -90,13 +99,11 @@ class PaymentResource(Resource):
         )
 
         db.session.add(payment)
+        recompute_debt(db.session, debt)
 
-        
-        debt.update_status()
-
+        log_change("Payment", payment.id, "create", entity=payment)
         db.session.commit()
 
-        log_change("Payment", payment.id, "create", payment_schema.dump(payment))
         return payment_schema.dump(payment), 201
 
     @role_required(ROLE_OWNER, ROLE_ADMIN)
@@ -109,12 +116,10 @@ class PaymentResource(Resource):
         if not can_access_payment(current_user, payment):
             return {"message": "Access denied"}, 403
 
-        if payment.debt:
-            payment.debt.update_status()
-
-        log_change("Payment", payment.id, "delete", payment_schema.dump(payment))
+        log_change("Payment", payment.id, "delete", entity=payment)
 
         db.session.delete(payment)
+        recompute_debts(db.session, [payment.debt_id])
         db.session.commit()
 
         return {"message": f"Payment {payment_id} deleted"}, 200
@@ -135,15 +140,8 @@ class PaymentResource(Resource):
 
         data = request.get_json() or {}
 
-        # Adjust debt balance if amount changes
         if "amount" in data:
-            old_amount = payment.amount
-            new_amount = data["amount"]
-
-            if payment.debt:
-                payment.debt.update_status()
-
-            payment.amount = new_amount
+            payment.amount = data["amount"]
 
         if "method" in data:
             payment.method = data["method"]
@@ -154,9 +152,10 @@ class PaymentResource(Resource):
             except ValueError:
                 return {"error": "Invalid date format. Use ISO format."}, 400
 
+        recompute_debts(db.session, [payment.debt_id])
+        log_change("Payment", payment.id, "update", entity=payment)
         db.session.commit()
 
-        log_change("Payment", payment.id, "update", payment_schema.dump(payment))
         return payment_schema.dump(payment), 200
 
 
@@ -7,6 +7,7 @@ from server.models import db, Debt, User, Business, FinanceSettings
 
 from server.utils.reminders import log_reminder
 from server.service.debt_notifications import  send_debt_notification
+from server.service.debt_totals import recompute_debt
 from datetime import datetime
 from . import reminder_bp
 from server.utils.pdf_utils import generate_debt_pdf 
@@ -32,9 +33,7 @@ class SendSingleReminder(Resource):
             db.session.add(settings)
 
         # Recalculate totals & status
-        debt.calculate_total()
-        debt.update_status()
-        db.session.add(debt)
+        recompute_debt(db.session, debt)
         balance = float(debt.balance)
 
         # Build reminder details
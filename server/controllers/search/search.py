@@ -0,0 +1,60 @@
+from flask import g, request
+from flask_restful import Resource, Api
+from server.extension import db
+from server.models import Debt
+from server.schemas.debt_schema import DebtSchema
+from server.schemas.row_serializers import DebtRowSerializer
+from server.service.debt_search import DEFAULT_PER_PAGE, MAX_PER_PAGE, search_debts
+from server.utils.decorators import role_required, visible_business_ids
+from server.utils.helper import pagination, pagination_args
+from server.utils.json_output import output_json
+from server.utils.roles import ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON
+from . import search_bp
+
+api = Api(search_bp)
+api.representation("application/json")(output_json)
+
+RESULT_FIELDS = ("id", "customer_id", "customer_name", "phone", "total", "balance", "status", "category", "due_date", "created_at")
+debt_rows = DebtRowSerializer(DebtSchema(many=True, only=RESULT_FIELDS))
+
+
+class SearchResource(Resource):
+    @role_required(ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON)
+    def get(self):
+        """
+        Debts matching ?q= by customer name, phone or id number, item name,
+        category or invoice number ("cement john", "0712", "INV-00042"),
+        best first. ?page=, ?per_page= (max 100). Owners search all their
+        businesses, salespeople only the debts they created.
+        """
+        current_user = g.current_user
+        query = request.args.get("q", "").strip()
+        if not query:
+            return {"message": "q is required"}, 400
+        try:
+            page, per_page = pagination_args(DEFAULT_PER_PAGE, MAX_PER_PAGE)
+        except ValueError:
+            return {"message": "page and per_page must be integers"}, 400
+
+        created_by = current_user.id if current_user.role == ROLE_SALESPERSON else None
+        found = search_debts(
+            db.session, visible_business_ids(current_user), query, page, per_page, created_by=created_by
+        )
+
+        rows = {row.id: row for row in debt_rows.rows_where_in(Debt.id, [debt_id for debt_id, _ in found.matches])}
+        ordered = [rows[debt_id] for debt_id, _ in found.matches if debt_id in rows]
+        scores = dict(found.matches)
+        results = []
+        for row, data in zip(ordered, debt_rows.dump(ordered)):
+            data["invoice_number"] = f"INV-{row.id:05d}"
+            data["score"] = round(scores[row.id], 4)
+            results.append(data)
+
+        return {
+            "query": query,
+            "results": results,
+            "pagination": pagination(page, per_page, found.total),
+        }, 200
+
+
+api.add_resource(SearchResource, "/search")
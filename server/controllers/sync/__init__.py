@@ -0,0 +1,6 @@
+from flask import Blueprint
+
+sync_bp = Blueprint('sync_bp',__name__)
+
+from .sync import *
+from .upload import *
\ No newline at end of file
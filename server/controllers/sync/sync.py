@@ -0,0 +1,129 @@
+from flask import g
+from flask_restful import Resource, Api, reqparse
+from sqlalchemy.orm import joinedload, selectinload
+from server.models import db, Customer, Debt, Item, Payment, SyncTombstone
+from server.schemas.customer_schema import CustomerSchema
+from server.schemas.debt_schema import DebtSchema
+from server.schemas.item_schema import ItemSchema
+from server.schemas.payment_schema import PaymentSchema
+from server.utils.decorators import role_required
+from server.utils.roles import ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON
+from . import sync_bp
+
+api = Api(sync_bp)
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+
+# Flat schemas: related rows travel in their own lists
+sync_customers_schema = CustomerSchema(many=True, exclude=("debts",))
+sync_debts_schema = DebtSchema(many=True, exclude=("customer", "created_by_user", "items", "payments"))
+sync_items_schema = ItemSchema(many=True)
+sync_payments_schema = PaymentSchema(many=True, exclude=("debt", "received_by_user"))
+
+
+def sync_queries(user):
+    """
+    Change queries visible to the user, keyed by response section.
+    - Owners/Admins: every row of their business
+    - Salespersons: only their debts and the rows hanging off them
+    """
+    business_id = user.business_id
+
+    debts = Debt.query.options(joinedload(Debt.customer), selectinload(Debt.payments)).filter(
+        Debt.business_id == business_id
+    )
+    items = Item.query.join(Debt).filter(Debt.business_id == business_id)
+    payments = Payment.query.join(Debt).filter(Debt.business_id == business_id)
+    customers = Customer.query.filter(Customer.business_id == business_id)
+
+    if user.role == ROLE_SALESPERSON:
+        debts = debts.filter(Debt.created_by == user.id)
+        items = items.filter(Debt.created_by == user.id)
+        payments = payments.filter(Debt.created_by == user.id)
+        customer_ids = db.session.query(Debt.customer_id).filter_by(created_by=user.id).distinct()
+        customers = customers.filter(Customer.id.in_(customer_ids))
+
+    tombstones = SyncTombstone.query.filter(SyncTombstone.business_id == business_id)
+
+    return {
+        "customers": (customers, Customer),
+        "debts": (debts, Debt),
+        "items": (items, Item),
+        "payments": (payments, Payment),
+        "deleted": (tombstones, SyncTombstone),
+    }
+
+
+def collect_changes(queries, since, limit):
+    """
+    Pull up to ``limit`` rows changed after ``since`` across all sections.
+    The page is cut on a sequence boundary so rows sharing the last sequence
+    number are never split between two pages.
+    """
+    batches = {
+        name: query.filter(model.change_seq > since).order_by(model.change_seq, model.id).limit(limit).all()
+        for name, (query, model) in queries.items()
+    }
+
+    seqs = sorted(row.change_seq for rows in batches.values() for row in rows)
+    if not seqs:
+        return batches, since, False
+
+    truncated = len(seqs) > limit
+    cursor = seqs[limit - 1] if truncated else seqs[-1]
+    has_more = truncated or any(len(rows) == limit for rows in batches.values())
+
+    for name, rows in batches.items():
+        page = [row for row in rows if row.change_seq <= cursor]
+        if len(rows) == limit and rows[-1].change_seq == cursor:
+            query, model = queries[name]
+            seen = {row.id for row in page}
+            page += [row for row in query.filter(model.change_seq == cursor).all() if row.id not in seen]
+        batches[name] = page
+
+    return batches, cursor, has_more
+
+
+class SyncResource(Resource):
+
+    @role_required(ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON)
+    def get(self):
+        """
+        Delta sync: rows created, updated or deleted after ``since``.
+        Clients store the returned cursor and keep pulling while has_more is true.
+        """
+        parser = reqparse.RequestParser()
+        parser.add_argument("since", type=int, default=0, location="args")
+        parser.add_argument("limit", type=int, default=DEFAULT_PAGE_SIZE, location="args")
+        args = parser.parse_args()
+
+        current_user = g.current_user
+        if not current_user.business_id:
+            return {"message": "Current user is not linked to a business"}, 400
+
+        since = max(args["since"] or 0, 0)
+        limit = min(max(args["limit"] or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+
+        changes, cursor, has_more = collect_changes(sync_queries(current_user), since, limit)
+
+        return {
+            "cursor": cursor,
+            "has_more": has_more,
+            "customers": sync_customers_schema.dump(changes["customers"]),
+            "debts": sync_debts_schema.dump(changes["debts"]),
+            "items": sync_items_schema.dump(changes["items"]),
+            "payments": sync_payments_schema.dump(changes["payments"]),
+            "deleted": [
+                {
+                    "entity_type": t.entity_type,
+                    "entity_id": t.entity_id,
+                    "change_seq": t.change_seq,
+                    "deleted_at": t.deleted_at.isoformat() if t.deleted_at else None
+                }
+                for t in changes["deleted"]
+            ],
+        }, 200
+
+
+api.add_resource(SyncResource, "/sync")
@@ -0,0 +1,402 @@
+from datetime import datetime
+from flask import request, g
+from flask_restful import Resource, Api
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from server.models import db, Customer, Debt, Item, Payment, IdempotencyKey
+from server.service.debt_notifications import send_debt_notification
+from server.service.debt_search import refresh_debt_documents
+from server.service.debt_totals import recompute_debts
+from server.utils.change_logger import log_change
+from server.utils.change_tracking import allocate_change_seq
+from server.utils.decorators import role_required
+from server.utils.helper import normalize_email
+from server.utils.phone import normalize_phone
+from server.utils.roles import ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON
+from . import sync_bp
+
+api = Api(sync_bp)
+
+MAX_OPERATIONS = 500
+MAX_KEY_LENGTH = 128
+
+OP_CREATE_CUSTOMER = "create_customer"
+OP_CREATE_DEBT = "create_debt"
+OP_RECORD_PAYMENT = "record_payment"
+
+OPERATION_ENTITIES = {
+    OP_CREATE_CUSTOMER: "Customer",
+    OP_CREATE_DEBT: "Debt",
+    OP_RECORD_PAYMENT: "Payment",
+}
+
+CUSTOMER_FIELDS = ["customer_name", "phone", "id_number"]
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_item(item):
+    if not isinstance(item, dict):
+        return "each item must be an object"
+    if not isinstance(item.get("name"), str) or not item["name"]:
+        return "each item needs a name"
+    quantity = item.get("quantity", 1)
+    if not _is_number(quantity) or quantity <= 0 or quantity != int(quantity):
+        return "item quantity must be a positive whole number"
+    price = item.get("price", 0)
+    if not _is_number(price) or price < 0:
+        return "item price must be a non-negative number"
+    return None
+
+
+def _check_operation(op, seen_keys):
+    """Shape checks that do not need the database."""
+    if not isinstance(op, dict):
+        return "Operation must be an object"
+    if op.get("op") not in OPERATION_ENTITIES:
+        return f"op must be one of: {', '.join(OPERATION_ENTITIES)}"
+
+    key = op.get("key")
+    if not isinstance(key, str) or not key or len(key) > MAX_KEY_LENGTH:
+        return f"key must be a non-empty string of at most {MAX_KEY_LENGTH} characters"
+    if key in seen_keys:
+        return "Duplicate key in batch"
+
+    data = op.get("data")
+    if not isinstance(data, dict):
+        return "data must be an object"
+
+    if op["op"] == OP_CREATE_CUSTOMER:
+        if not all(data.get(field) for field in CUSTOMER_FIELDS):
+            return "customer_name, phone and id_number are required"
+
+    elif op["op"] == OP_CREATE_DEBT:
+        if not (data.get("customer_id") or data.get("customer_key") or all(data.get(f) for f in CUSTOMER_FIELDS)):
+            return "customer_id, customer_key or customer details are required"
+        if data.get("due_date"):
+            try:
+                datetime.strptime(data["due_date"], "%Y-%m-%d")
+            except (TypeError, ValueError):
+                return "due_date must be YYYY-MM-DD format"
+        if not isinstance(data.get("items", []), list):
+            return "items must be a list"
+        for item in data.get("items", []):
+            error = _check_item(item)
+            if error:
+                return error
+        if data.get("amount_paid") is not None and (not _is_number(data["amount_paid"]) or data["amount_paid"] < 0):
+            return "amount_paid must be a non-negative number"
+
+    elif op["op"] == OP_RECORD_PAYMENT:
+        if not (data.get("debt_id") or data.get("debt_key")):
+            return "debt_id or debt_key is required"
+        if not _is_number(data.get("amount")) or data["amount"] <= 0:
+            return "amount must be a positive number"
+        if data.get("payment_date"):
+            try:
+                datetime.fromisoformat(data["payment_date"])
+            except (TypeError, ValueError):
+                return "Invalid payment_date format. Use ISO format."
+
+    return None
+
+
+class SyncUploadResource(Resource):
+
+    @role_required(ROLE_OWNER, ROLE_ADMIN, ROLE_SALESPERSON)
+    def post(self):
+        """
+        Apply a batch of offline operations in one transaction.
+        Operations whose key was already applied are returned as duplicates
+        with their original server id and are not applied again.
+        """
+        data = request.get_json() or {}
+        operations = data.get("operations")
+        current_user = g.current_user
+        business_id = current_user.business_id
+
+        if not business_id:
+            return {"message": "Current user is not linked to a business"}, 400
+        if not isinstance(operations, list) or not operations:
+            return {"message": "operations must be a non-empty list"}, 400
+        if len(operations) > MAX_OPERATIONS:
+            return {"message": f"A batch can hold at most {MAX_OPERATIONS} operations"}, 400
+
+        errors = []
+        seen_keys = set()
+        for index, op in enumerate(operations):
+            error = _check_operation(op, seen_keys)
+            if error:
+                errors.append({"index": index, "key": op.get("key") if isinstance(op, dict) else None, "error": error})
+            else:
+                seen_keys.add(op["key"])
+        if errors:
+            return {"message": "Invalid operations", "errors": errors}, 400
+
+        # One lookup for replayed keys and keys referenced from earlier batches
+        referenced = set(seen_keys)
+        for op in operations:
+            referenced.update(filter(None, [op["data"].get("customer_key"), op["data"].get("debt_key")]))
+        applied = {
+            row.key: row
+            for row in IdempotencyKey.query.filter(
+                IdempotencyKey.business_id == business_id,
+                IdempotencyKey.key.in_(referenced)
+            )
+        }
+        pending = [op for op in operations if op["key"] not in applied]
+        batch_ops = {op["key"]: op for op in pending}
+
+        errors = self._check_references(pending, batch_ops, applied, business_id)
+        if errors:
+            return {"message": "Invalid operations", "errors": errors}, 400
+
+        try:
+            created = self._apply(pending, applied, current_user) if pending else {}
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return {"message": "Another upload with the same keys is in progress, retry the batch"}, 409
+
+        new_debt_ids = [created[op["key"]] for op in pending if op["op"] == OP_CREATE_DEBT]
+        if new_debt_ids:
+            debts = Debt.query.options(joinedload(Debt.customer)).filter(Debt.id.in_(new_debt_ids)).all()
+            for debt in debts:
+                send_debt_notification(debt, kind="receipt", via_email=True, via_sms=False)
+
+        results = []
+        for op in operations:
+            if op["key"] in created:
+                results.append({"key": op["key"], "op": op["op"], "status": "applied", "id": created[op["key"]]})
+            else:
+                results.append({"key": op["key"], "op": op["op"], "status": "duplicate", "id": applied[op["key"]].entity_id})
+
+        return {"results": results}, 200
+
+    def _check_references(self, pending, batch_ops, applied, business_id):
+        """Every customer/debt reference must point inside the business."""
+        customer_ids = {op["data"]["customer_id"] for op in pending if op["data"].get("customer_id")}
+        debt_ids = {op["data"]["debt_id"] for op in pending if op["data"].get("debt_id")}
+
+        valid_customers = {
+            cid for (cid,) in db.session.query(Customer.id).filter(
+                Customer.id.in_(customer_ids), Customer.business_id == business_id
+            )
+        } if customer_ids else set()
+        valid_debts = {
+            did for (did,) in db.session.query(Debt.id).filter(
+                Debt.id.in_(debt_ids), Debt.business_id == business_id
+            )
+        } if debt_ids else set()
+
+        def key_points_to(key, op_name):
+            if key in batch_ops:
+                return batch_ops[key]["op"] == op_name
+            return key in applied and applied[key].operation == op_name
+
+        errors = []
+        for op in pending:
+            data = op["data"]
+            error = None
+            if op["op"] == OP_CREATE_DEBT:
+                if data.get("customer_id") and data["customer_id"] not in valid_customers:
+                    error = "Customer not found in this business"
+                elif data.get("customer_key") and not key_points_to(data["customer_key"], OP_CREATE_CUSTOMER):
+                    error = "customer_key does not reference a create_customer operation"
+            elif op["op"] == OP_RECORD_PAYMENT:
+                if data.get("debt_id") and data["debt_id"] not in valid_debts:
+                    error = "Debt not found in this business"
+                elif data.get("debt_key") and not key_points_to(data["debt_key"], OP_CREATE_DEBT):
+                    error = "debt_key does not reference a create_debt operation"
+            if error:
+                errors.append({"key": op["key"], "error": error})
+        return errors
+
+    def _apply(self, pending, applied, current_user):
+        """Insert everything with one multi-row INSERT per table; returns key -> server id."""
+        business_id = current_user.business_id
+        now = datetime.utcnow()
+        created = {}
+        inserted_customer_ids = set()
+
+        def ref_id(key):
+            return created[key] if key in created else applied[key].entity_id
+
+        # CUSTOMERS (explicit and inline), matched on the normalized phone like POST /debts;
+        # numbers without digits never match and always create a customer
+        def customer_pair(data):
+            return normalize_phone(data["phone"]) or (data["customer_name"], data["phone"])
+
+        customer_sources = [
+            op["data"] for op in pending
+            if op["op"] == OP_CREATE_CUSTOMER
+            or (op["op"] == OP_CREATE_DEBT and not op["data"].get("customer_id") and not op["data"].get("customer_key"))
+        ]
+        pairs = {customer_pair(data) for data in customer_sources}
+        customers_by_pair = {}
+        if pairs:
+            customers_by_pair = dict(
+                db.session.query(Customer.phone_norm, Customer.id).filter(
+                    Customer.business_id == business_id,
+                    Customer.phone_norm.in_([pair for pair in pairs if isinstance(pair, str)])
+                )
+            )
+
+        new_customers = {}
+        for data in customer_sources:
+            pair = customer_pair(data)
+            if pair not in customers_by_pair and pair not in new_customers:
+                new_customers[pair] = {
+                    "customer_name": data["customer_name"],
+                    "phone": data["phone"],
+                    "phone_norm": normalize_phone(data["phone"]),
+                    "id_number": data["id_number"],
+                    "email": data.get("email"),
+                    "email_norm": normalize_email(data.get("email")),
+                    "business_id": business_id,
+                    "created_by": current_user.id,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+
+        # DEBTS, ITEMS and PAYMENTS
+        debt_ops = [op for op in pending if op["op"] == OP_CREATE_DEBT]
+        payment_ops = [op for op in pending if op["op"] == OP_RECORD_PAYMENT]
+        item_count = sum(len(op["data"].get("items", [])) for op in debt_ops)
+        initial_payments = [op for op in debt_ops if (op["data"].get("amount_paid") or 0) > 0]
+
+        row_count = len(new_customers) + len(debt_ops) + item_count + len(initial_payments) + len(payment_ops)
+        seq = allocate_change_seq(db.session, business_id, row_count) - row_count
+
+        def next_seq():
+            nonlocal seq
+            seq += 1
+            return seq
+
+        if new_customers:
+            rows = list(new_customers.values())
+            for row in rows:
+                row["change_seq"] = next_seq()
+            ids = db.session.execute(
+                insert(Customer).returning(Customer.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            customers_by_pair.update(zip(new_customers.keys(), ids))
+            inserted_customer_ids.update(ids)
+
+        for op in pending:
+            if op["op"] == OP_CREATE_CUSTOMER:
+                created[op["key"]] = customers_by_pair[customer_pair(op["data"])]
+
+        debt_rows = []
+        for op in debt_ops:
+            data = op["data"]
+            if data.get("customer_id"):
+                customer_id = data["customer_id"]
+            elif data.get("customer_key"):
+                customer_id = ref_id(data["customer_key"])
+            else:
+                customer_id = customers_by_pair[customer_pair(data)]
+
+            category = data.get("category", "Uncategorized")
+            total = sum(
+                (item.get("quantity", 1) or 0) * (item.get("price", 0) or 0)
+                for item in data.get("items", [])
+            )
+            paid = data.get("amount_paid") or 0
+            debt_rows.append({
+                "customer_id": customer_id,
+                "business_id": business_id,
+                "due_date": datetime.strptime(data["due_date"], "%Y-%m-%d") if data.get("due_date") else None,
+                "created_by": current_user.id,
+                "category": category,
+                "total": total,
+                "status": Debt.status_for(total, total - paid),
+                "created_at": now,
+                "updated_at": now,
+                "reminder_count": 0,
+                "change_seq": next_seq(),
+            })
+
+        if debt_rows:
+            ids = db.session.execute(
+                insert(Debt).returning(Debt.id, sort_by_parameter_order=True), debt_rows
+            ).scalars().all()
+            created.update((op["key"], debt_id) for op, debt_id in zip(debt_ops, ids))
+
+        item_rows = [
+            {
+                "debt_id": created[op["key"]],
+                "name": item.get("name"),
+                "quantity": item.get("quantity", 1),
+                "price": item.get("price", 0),
+                "category": item.get("category") or op["data"].get("category", "Uncategorized"),
+                "change_seq": next_seq(),
+            }
+            for op in debt_ops
+            for item in op["data"].get("items", [])
+        ]
+        if item_rows:
+            db.session.execute(insert(Item), item_rows)
+
+        payment_rows = [
+            {
+                "debt_id": created[op["key"]],
+                "amount": op["data"]["amount_paid"],
+                "method": "initial",
+                "received_by": current_user.id,
+                "payment_date": now,
+                "change_seq": next_seq(),
+            }
+            for op in initial_payments
+        ]
+        recorded_debt_ids = set()
+        for op in payment_ops:
+            data = op["data"]
+            debt_id = data["debt_id"] if data.get("debt_id") else ref_id(data["debt_key"])
+            recorded_debt_ids.add(debt_id)
+            payment_rows.append({
+                "debt_id": debt_id,
+                "amount": data["amount"],
+                "method": data.get("method"),
+                "received_by": current_user.id,
+                "payment_date": datetime.fromisoformat(data["payment_date"]) if data.get("payment_date") else now,
+                "change_seq": next_seq(),
+            })
+        if payment_rows:
+            ids = db.session.execute(
+                insert(Payment).returning(Payment.id, sort_by_parameter_order=True), payment_rows
+            ).scalars().all()
+            created.update((op["key"], payment_id) for op, payment_id in zip(payment_ops, ids[len(initial_payments):]))
+
+        # Refresh status of debts that received payments in this batch
+        recompute_debts(db.session, recorded_debt_ids)
+        refresh_debt_documents(db.session, [created[op["key"]] for op in debt_ops])
+
+        db.session.execute(insert(IdempotencyKey), [
+            {
+                "business_id": business_id,
+                "key": op["key"],
+                "operation": op["op"],
+                "entity_type": OPERATION_ENTITIES[op["op"]],
+                "entity_id": created[op["key"]],
+                "created_by": current_user.id,
+                "created_at": now,
+            }
+            for op in pending
+        ])
+
+        for op in pending:
+            if op["op"] == OP_CREATE_CUSTOMER and created[op["key"]] not in inserted_customer_ids:
+                continue
+            log_change(
+                OPERATION_ENTITIES[op["op"]], created[op["key"]], "create",
+                {"idempotency_key": op["key"], "source": "sync_upload"}
+            )
+
+        return created
+
+
+api.add_resource(SyncUploadResource, "/sync/upload")
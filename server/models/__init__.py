@@ -1,10 +1,15 @@
 from server.extension import db
-from .changelog import ChangeLog
+from .changelog import ChangeLog, ChangeLogHead
 from .customer import Customer
+from .customer_balance import CustomerBalance
 from .item import Item
 from .payment import Payment
 from .user import User
 from .business import Business
 from .debt import Debt 
+from .debt_search import DebtSearchDocument
 from .invitations import Invitation
-from .finance_settings import FinanceSettings
\ No newline at end of file
+from .finance_settings import FinanceSettings
+from .sync import SyncCounter, SyncTombstone
+from .idempotency import IdempotencyKey
+from .job_cursor import JobCursor
\ No newline at end of file
@@ -1,6 +1,11 @@
 from datetime import datetime
 from server.extension import db
 
+# ChangeLog.details_format values
+DETAILS_SNAPSHOT = "snapshot"  # full column state of the entity at entity_version
+DETAILS_DELTA = "delta"        # {"set": {...}, "unset": [...]} against entity_version - 1
+DETAILS_EVENT = "event"        # free-form details, not part of the entity history
+
 
 class ChangeLog(db.Model):
     __tablename__ = "changelogs"
@@ -10,9 +15,31 @@ class ChangeLog(db.Model):
     entity_id = db.Column(db.Integer)
     action = db.Column(db.String(50))  # create, update, delete
     changed_by = db.Column(db.Integer, db.ForeignKey("users.id"))
+    business_id = db.Column(db.Integer, db.ForeignKey("businesses.id"))  # tenant, denormalized for scoped queries
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     details = db.Column(db.JSON)
+    entity_version = db.Column(db.Integer)
+    details_format = db.Column(db.String(16))  # NULL: legacy full dump
 
     # Relationships
     changed_by_user = db.relationship("User", back_populates="changelogs")
-    
+
+    __table_args__ = (
+        db.Index("ix_changelogs_entity_version", "entity_type", "entity_id", "entity_version"),
+        db.Index("ix_changelogs_timestamp", "timestamp"),
+    )
+
+
+# Tenant-scoped feeds (changelog list, communications) read newest first
+db.Index("ix_changelogs_business_timestamp", ChangeLog.business_id, ChangeLog.timestamp.desc())
+
+
+class ChangeLogHead(db.Model):
+    """Latest version and state of each entity with a changelog history, to diff against."""
+    __tablename__ = "changelog_heads"
+
+    entity_type = db.Column(db.String(50), primary_key=True)
+    entity_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+    state = db.Column(db.JSON, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,5 +1,8 @@
 from datetime import datetime
+from sqlalchemy.orm import validates
 from server.extension import db
+from server.utils.helper import normalize_email
+from server.utils.phone import normalize_phone
 
 class Customer(db.Model):
     __tablename__ = 'customers'
@@ -8,12 +11,34 @@ class Customer(db.Model):
     customer_name = db.Column(db.String, nullable=False)
     phone = db.Column(db.String, nullable=False)
     email = db.Column(db.String, nullable=True)
+    # Lookup keys kept in step with phone and email (see the validators)
+    phone_norm = db.Column(db.String(32))
+    email_norm = db.Column(db.String)
     id_number = db.Column(db.String, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     business_id = db.Column(db.Integer, db.ForeignKey("businesses.id"), nullable=False)
+    change_seq = db.Column(db.BigInteger)
     
     # Relationships
     debts = db.relationship("Debt", back_populates='customer', cascade="all, delete-orphan")
     business = db.relationship("Business", back_populates="customers")
+    balance = db.relationship("CustomerBalance", back_populates="customer", uselist=False,
+                              cascade="all, delete-orphan")
+
+    __table_args__ = (
+        db.Index("ix_customers_business_change_seq", "business_id", "change_seq"),
+        db.Index("uq_customers_business_phone_norm", "business_id", "phone_norm", unique=True),
+        db.Index("ix_customers_business_email_norm", "business_id", "email_norm"),
+    )
+
+    @validates("phone")
+    def _set_phone_norm(self, key, phone):
+        self.phone_norm = normalize_phone(phone)
+        return phone
+
+    @validates("email")
+    def _set_email_norm(self, key, email):
+        self.email_norm = normalize_email(email)
+        return email
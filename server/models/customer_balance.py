@@ -0,0 +1,42 @@
+from datetime import datetime
+from server.extension import db
+
+
+class CustomerBalance(db.Model):
+    """
+    Per-customer debt totals, rewritten by ``refresh_customer_balances``
+    in the same transaction as every debt, item and payment write.
+    """
+    __tablename__ = "customer_balances"
+
+    customer_id = db.Column(db.Integer, db.ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey("businesses.id", ondelete="CASCADE"), nullable=False)
+    total_issued = db.Column(db.Float, nullable=False, default=0)
+    total_paid = db.Column(db.Float, nullable=False, default=0)
+    outstanding = db.Column(db.Float, nullable=False, default=0)
+    open_debts = db.Column(db.Integer, nullable=False, default=0)
+    oldest_due_date = db.Column(db.DateTime)
+    last_payment_date = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    customer = db.relationship("Customer", back_populates="balance")
+
+    __table_args__ = (
+        db.Index("ix_customer_balances_business_outstanding", "business_id", db.text("outstanding DESC")),
+    )
+
+    # What a customer without a row (no debt written yet) reads as
+    EMPTY = {
+        "total_issued": 0.0, "total_paid": 0.0, "outstanding": 0.0, "open_debts": 0,
+        "oldest_due_date": None, "last_payment_date": None,
+    }
+
+    def as_dict(self):
+        return {
+            "total_issued": round(self.total_issued, 2),
+            "total_paid": round(self.total_paid, 2),
+            "outstanding": round(self.outstanding, 2),
+            "open_debts": self.open_debts,
+            "oldest_due_date": self.oldest_due_date.isoformat() if self.oldest_due_date else None,
+            "last_payment_date": self.last_payment_date.isoformat() if self.last_payment_date else None,
+        }
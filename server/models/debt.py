@@ -19,6 +19,7 @@ class Debt(db.Model):
     last_reminder_sent = db.Column(db.DateTime)  
     reminder_count = db.Column(db.Integer, default=0)
     category = db.Column(db.String, nullable=False, default="Uncategorized")
+    change_seq = db.Column(db.BigInteger)
 
     
     # Relationships
@@ -27,6 +28,13 @@ class Debt(db.Model):
     items = db.relationship("Item", back_populates="debt", cascade="all, delete-orphan")
     payments = db.relationship("Payment", back_populates="debt", cascade="all, delete-orphan")
     business = db.relationship("Business", back_populates="debts")
+    search_document = db.relationship("DebtSearchDocument", back_populates="debt", uselist=False,
+                                      cascade="all, delete-orphan")
+
+    __table_args__ = (
+        db.Index("ix_debts_business_change_seq", "business_id", "change_seq"),
+        db.Index("ix_debts_customer_created", "customer_id", "created_at"),
+    )
     
     def calculate_total(self):
         self.total = sum(item.total_price for item in self.items)
@@ -62,10 +70,12 @@ class Debt(db.Model):
     # Update status based on current balance
    
     def update_status(self):
-        current_balance = self.balance
-        if current_balance <= 0:
-            self.status = 'paid'
-        elif current_balance == self.total:
-            self.status = 'unpaid'
-        else:
-            self.status = 'partial'
\ No newline at end of file
+        self.status = Debt.status_for(self.total, self.balance)
+
+    @staticmethod
+    def status_for(total, balance):
+        if balance <= 0:
+            return 'paid'
+        elif balance == total:
+            return 'unpaid'
+        return 'partial'
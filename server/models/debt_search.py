@@ -0,0 +1,25 @@
+from datetime import datetime
+from server.extension import db
+
+
+class DebtSearchDocument(db.Model):
+    """
+    The searchable text of one debt (its customer, item names and
+    categories), rewritten by ``refresh_debt_documents`` in the same
+    transaction as the writes that change it. Indexed by migration
+    f4c8a2d6e913: a weighted tsvector GIN index on Postgres, the
+    ``debt_search_fts`` FTS5 table on SQLite.
+    """
+    __tablename__ = "debt_search_documents"
+
+    debt_id = db.Column(db.Integer, db.ForeignKey("debts.id", ondelete="CASCADE"), primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey("businesses.id", ondelete="CASCADE"), nullable=False, index=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey("customers.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Name, id number and phone number (with and without country code)
+    customer_text = db.Column(db.Text, nullable=False, default="")
+    items_text = db.Column(db.Text, nullable=False, default="")
+    # The debt's category and its items' categories
+    categories_text = db.Column(db.Text, nullable=False, default="")
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    debt = db.relationship("Debt", back_populates="search_document")
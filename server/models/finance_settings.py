@@ -30,6 +30,9 @@ class FinanceSettings(db.Model):
     reminder_after_due = db.Column(db.Boolean, default=True)
     reminder_after_days = db.Column(db.Integer, default=1)
     reminder_method = db.Column(db.String(20), default="email")  # email, sms, both
+
+    # Changelog retention: older entries move to the cold archive (NULL keeps everything)
+    changelog_retention_months = db.Column(db.Integer, nullable=True)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
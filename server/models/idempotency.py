@@ -0,0 +1,20 @@
+from datetime import datetime
+from server.extension import db
+
+
+class IdempotencyKey(db.Model):
+    """Client-generated operation key, stored once the operation is applied."""
+    __tablename__ = "idempotency_keys"
+
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey("businesses.id", ondelete="CASCADE"), nullable=False)
+    key = db.Column(db.String(128), nullable=False)
+    operation = db.Column(db.String(50), nullable=False)
+    entity_type = db.Column(db.String(50), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("business_id", "key", name="uq_idempotency_keys_business_key"),
+    )
@@ -5,11 +5,12 @@ class Item(db.Model):
     __tablename__ = 'items'
 
     id = db.Column(db.Integer, primary_key=True)
-    debt_id = db.Column(db.Integer, db.ForeignKey("debts.id", ondelete='CASCADE'), nullable=False)
+    debt_id = db.Column(db.Integer, db.ForeignKey("debts.id", ondelete='CASCADE'), nullable=False, index=True)
     name = db.Column(db.String, nullable=False)
     price = db.Column(db.Float, nullable=False)
     category = db.Column(db.String, nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.BigInteger, index=True)
 
 
     # Rship
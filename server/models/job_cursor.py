@@ -0,0 +1,12 @@
+from datetime import datetime
+from server.extension import db
+
+
+class JobCursor(db.Model):
+    """Where a scheduled scan stopped, so the next run resumes from there."""
+    __tablename__ = "job_cursors"
+
+    name = db.Column(db.String(64), primary_key=True)
+    # First id not scanned yet; NULL starts from the beginning
+    position = db.Column(db.BigInteger)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
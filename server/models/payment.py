@@ -6,11 +6,12 @@ class Payment(db.Model):
     __tablename__ = "payments"
 
     id = db.Column(db.Integer, primary_key=True)
-    debt_id = db.Column(db.Integer, db.ForeignKey("debts.id", ondelete='CASCADE'), nullable=False)
+    debt_id = db.Column(db.Integer, db.ForeignKey("debts.id", ondelete='CASCADE'), nullable=False, index=True)
     amount = db.Column(db.Float, nullable=False)
     payment_date = db.Column(db.DateTime, default=datetime.utcnow)
     method = db.Column(db.String(50))  # cash, mobile money, bank
     received_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    change_seq = db.Column(db.BigInteger, index=True)
 
 
     # Relationships
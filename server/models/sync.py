@@ -0,0 +1,27 @@
+from datetime import datetime
+from server.extension import db
+
+
+class SyncCounter(db.Model):
+    """Per-business change sequence used as the delta sync cursor."""
+    __tablename__ = "sync_counters"
+
+    business_id = db.Column(db.Integer, db.ForeignKey("businesses.id", ondelete="CASCADE"), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SyncTombstone(db.Model):
+    """Marker left behind when a synced row is deleted."""
+    __tablename__ = "sync_tombstones"
+
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey("businesses.id", ondelete="CASCADE"), nullable=False)
+    entity_type = db.Column(db.String(50), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.BigInteger, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_sync_tombstones_business_seq", "business_id", "change_seq"),
+    )
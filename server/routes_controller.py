@@ -11,6 +11,8 @@ from server.controllers.customer import customer_bp
 from server.controllers.payment import payment_bp
 from server.controllers.reminder import reminder_bp
 from server.controllers.export import export_bp
+from server.controllers.sync import sync_bp
+from server.controllers.search import search_bp
 
 def register_routes(app):
     app.register_blueprint(auth_bp)
@@ -25,4 +27,6 @@ def register_routes(app):
     app.register_blueprint(customer_bp)
     app.register_blueprint(payment_bp)
     app.register_blueprint(reminder_bp)
-    app.register_blueprint(export_bp)
\ No newline at end of file
+    app.register_blueprint(export_bp)
+    app.register_blueprint(sync_bp)
+    app.register_blueprint(search_bp)
\ No newline at end of file
@@ -1,9 +1,13 @@
 # server/scheduler.py
 from apscheduler.schedulers.background import BackgroundScheduler
 from server.tasks.finance_reminders import process_payment_reminders
+from server.tasks.changelog_maintenance import run_changelog_maintenance
+from server.tasks.reconciliation import run_debt_reconciliation
 
 def init_scheduler(app):
     sched = BackgroundScheduler(timezone="UTC")
     sched.add_job(process_payment_reminders, "cron", hour=6, minute=0)
+    sched.add_job(run_changelog_maintenance, "cron", hour=3, minute=0, args=[app])
+    sched.add_job(run_debt_reconciliation, "cron", hour=2, minute=0, args=[app])
     sched.start()
     return sched
@@ -2,26 +2,17 @@ from marshmallow import fields,EXCLUDE
 from server.extension import ma
 from server.models import Business
 from server.schemas.user_schema import UserSchema
-from server.schemas.customer_schema import CustomerSchema
 
 
 
-# For reading responses
+# For reading responses. Customers and members are not embedded: their
+# counts come with the profile and the lists are paginated sub-resources.
 class BusinessSchema(ma.SQLAlchemyAutoSchema):
     owner = fields.Nested(
         UserSchema,
         only=("id", "name", "email", "role"),
         dump_only=True
     )
-    members = fields.List(
-        fields.Nested(UserSchema, only=("id", "name", "role")),
-        dump_only=True
-    )
-    customers = fields.List(
-        # Removed "email" because CustomerSchema does not have it
-        fields.Nested(CustomerSchema, only=("id", "customer_name", "phone", "id_number")),
-        dump_only=True
-    )
 
     class Meta:
         model = Business
@@ -15,7 +15,8 @@ class DebtSchema(ma.SQLAlchemyAutoSchema):
             "payments.debt",
             "created_by_user.debts",
             "created_by_user.payments",
-            "created_by_user.changelogs"
+            "created_by_user.changelogs",
+            "change_seq",
         )
 
     # Nested fields
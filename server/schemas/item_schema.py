@@ -9,6 +9,7 @@ class ItemSchema(ma.SQLAlchemyAutoSchema):
         include_fk = True  # Include debt_id foreign key
         exclude = (
             "debt",  
+            "change_seq",
         )
 
    
@@ -15,6 +15,7 @@ class PaymentSchema(ma.SQLAlchemyAutoSchema):
             "debt.created_by_user",
             "received_by_user.payments",
             "received_by_user.debts",
+            "change_seq",
         )
 
     payment_date = ma.DateTime(format="%Y-%m-%dT%H:%M:%S")
@@ -0,0 +1,332 @@
+"""
+Compiled serializers for the hot list endpoints.
+
+They return the same dicts as ``schema.dump`` for the schemas in this
+package, but read Core rows instead of ORM objects: no identity map, no
+lazy loads and no per-row marshmallow machinery. Field order and formatting
+are read once from a schema instance and turned into a plain function, so
+exclusions and formats stay defined in one place (the schema).
+"""
+from collections import defaultdict
+from marshmallow import fields
+from sqlalchemy import select
+from server.extension import db
+from server.models import Customer, Debt, Item, Payment, User
+
+# Keep IN (...) lists well under the bound-parameter limits of SQLite/Postgres
+IN_CHUNK_SIZE = 1000
+
+ISO_FORMATS = ("iso", "iso8601")
+
+# Bookkeeping columns no list endpoint returns (schemas exclude them)
+INTERNAL_COLUMNS = ("change_seq", "phone_norm", "email_norm")
+
+
+# Values the caller already prepared (or marshmallow returns untouched)
+PASS_THROUGH_FIELDS = (fields.Nested, fields.List, fields.Method, fields.Function)
+
+
+def _value_expr(field, value, namespace, slot):
+    """Python expression formatting ``value`` the way ``field`` dumps it (None: as is)."""
+    if isinstance(field, PASS_THROUGH_FIELDS) or type(field) is fields.Raw:
+        return None
+    if isinstance(field, fields.DateTime):
+        data_format = field.format or field.DEFAULT_FORMAT
+        if data_format in ISO_FORMATS:
+            return f"{value}.isoformat()"
+        if data_format not in field.SERIALIZATION_FUNCS:
+            return f"{value}.strftime({data_format!r})"
+    elif isinstance(field, fields.Float) and not field.as_string:
+        return f"float({value})"
+    elif isinstance(field, fields.Integer) and not field.as_string:
+        return f"int({value})"
+    elif isinstance(field, fields.String):
+        return f"str({value})"
+
+    # Anything else goes through the field itself
+    namespace[slot] = field
+    return f"{slot}._serialize({value}, None, None)"
+
+
+def compile_row_serializer(schema, columns, extras=()):
+    """
+    Build ``serialize(row, *extras)`` returning what ``schema.dump`` returns.
+
+    ``columns`` are the attribute names in select order. Fields named in
+    ``extras`` are passed in by the caller instead of read from the row
+    (nested data, method fields, hybrid properties); extras the schema does
+    not dump are accepted and ignored.
+
+    The schema's per-item ``post_dump`` hooks run on each result, like in
+    ``schema.dump``; schemas with ``pass_many`` or ``pass_original`` hooks,
+    or dumping an internal column, are refused.
+    """
+    positions = {name: index for index, name in enumerate(columns)}
+    params = [f"extra_{index}" for index in range(len(extras))]
+    extra_params = dict(zip(extras, params))
+    namespace = {}
+    entries = []
+
+    hooks = _post_dump_hooks(schema)
+    for index, (name, field) in enumerate(schema.dump_fields.items()):
+        if (field.attribute or name) in INTERNAL_COLUMNS:
+            raise ValueError(f"{type(schema).__name__}.{name} is an internal column")
+        if name in extra_params:
+            value = extra_params[name]
+        else:
+            attribute = field.attribute or name
+            if attribute not in positions:
+                raise ValueError(f"{type(schema).__name__}.{name} is neither a column nor an extra")
+            value = f"row[{positions[attribute]}]"
+
+        expr = _value_expr(field, value, namespace, f"field_{index}")
+        if expr is not None:
+            value = f"(None if {value} is None else {expr})"
+        entries.append(f"{(field.data_key or name)!r}: {value}")
+
+    body = f"data = {{{', '.join(entries)}}}"
+    for index, hook in enumerate(hooks):
+        namespace[f"hook_{index}"] = hook
+        body += f"\n    data = hook_{index}(data, many={schema.many!r})"
+    source = "def serialize({}):\n    {}\n    return data\n".format(", ".join(["row"] + params), body)
+    exec(compile(source, f"<serializer {type(schema).__name__}>", "exec"), namespace)
+    return namespace["serialize"]
+
+
+def _post_dump_hooks(schema):
+    """Bound ``post_dump`` processors of ``schema``, in marshmallow's order."""
+    hooks = []
+    for attr_name, pass_many, options in schema._hooks["post_dump"]:
+        if pass_many or options.get("pass_original"):
+            raise ValueError(f"{type(schema).__name__}.{attr_name} cannot run on single compiled rows")
+        hooks.append(getattr(schema, attr_name))
+    return hooks
+
+
+def table_columns(model):
+    return [column.key for column in model.__table__.columns]
+
+
+def projection_columns(model, schema, required=()):
+    """Columns of ``model`` that ``schema`` dumps plus ``required``, in table order."""
+    wanted = set(required)
+    for name, field in schema.dump_fields.items():
+        wanted.add(field.attribute or name)
+    return [key for key in table_columns(model) if key in wanted]
+
+
+def select_rows(model, columns=None):
+    """SELECT of ``columns`` (default: every column) of ``model``, as plain rows."""
+    table = model.__table__
+    if columns is None:
+        return select(*table.columns)
+    return select(*(table.c[key] for key in columns))
+
+
+def rows_where_in(model, column, ids, order_by=None, columns=None):
+    """Fetch rows of ``model`` whose ``column`` is in ``ids``, in chunks."""
+    ids = list(ids)
+    rows = []
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        stmt = select_rows(model, columns).where(column.in_(ids[start:start + IN_CHUNK_SIZE]))
+        if order_by is not None:
+            stmt = stmt.order_by(order_by)
+        rows.extend(db.session.execute(stmt).all())
+    return rows
+
+
+def _nested_schema(schema, name):
+    field = schema.dump_fields.get(name)
+    return field.schema if field is not None else None
+
+
+class CompiledSerializer:
+    """
+    Compiles on first use: nested schemas referenced by class name only
+    resolve once every schema module has been imported.
+
+    Only the columns the schema dumps (plus ``REQUIRED`` and ``required``)
+    are selected, so a narrow schema means a narrow SELECT.
+    """
+
+    model = None
+    EXTRAS = ()
+    REQUIRED = ("id",)
+
+    def __init__(self, schema, required=()):
+        self.schema = schema
+        self.required = tuple(required)
+        self._compiled = False
+
+    def ensure_compiled(self):
+        if not self._compiled:
+            self.columns = projection_columns(self.model, self.schema, self.REQUIRED + self.required + self.compile(self.schema))
+            self.serialize = compile_row_serializer(self.schema, self.columns, self.EXTRAS)
+            self._compiled = True
+
+    def compile(self, schema):
+        """Prepare nested serializers; return the extra columns they need."""
+        return ()
+
+    def select(self):
+        self.ensure_compiled()
+        return select_rows(self.model, self.columns)
+
+    def rows_where_in(self, column, ids, order_by=None):
+        self.ensure_compiled()
+        return rows_where_in(self.model, column, ids, order_by, self.columns)
+
+
+class UserRowSerializer(CompiledSerializer):
+    model = User
+
+    def by_id(self, user_ids):
+        return {row.id: self.serialize(row) for row in self.rows_where_in(User.id, user_ids)}
+
+
+class DebtRowSerializer(CompiledSerializer):
+    """Serialize debt rows exactly like the given DebtSchema instance."""
+
+    model = Debt
+    EXTRAS = ("customer", "created_by_user", "items", "payments", "customer_name", "phone", "amount_paid", "balance")
+
+    def compile(self, schema):
+        dump_fields = schema.dump_fields
+        required = []
+
+        customer_schema = _nested_schema(schema, "customer")
+        self.customer_serialize = compile_row_serializer(customer_schema, table_columns(Customer)) if customer_schema else None
+        self.needs_customers = customer_schema is not None or "customer_name" in dump_fields or "phone" in dump_fields
+        if self.needs_customers:
+            required.append("customer_id")
+
+        user_schema = _nested_schema(schema, "created_by_user")
+        self.creators = UserRowSerializer(user_schema) if user_schema else None
+        if self.creators:
+            required.append("created_by")
+
+        item_schema = _nested_schema(schema, "items")
+        self.item_serialize = compile_row_serializer(item_schema, table_columns(Item), ("total_price",)) if item_schema else None
+
+        self.needs_amounts = "amount_paid" in dump_fields or "balance" in dump_fields
+        if self.needs_amounts:
+            required.append("total")
+
+        payment_schema = _nested_schema(schema, "payments")
+        self.payments = PaymentRowSerializer(payment_schema, ("debt_id", "amount")) if payment_schema else None
+        return tuple(required)
+
+    def dump(self, rows):
+        if not rows:
+            return []
+        self.ensure_compiled()
+        debt_ids = [row.id for row in rows]
+
+        customers = {}
+        if self.needs_customers:
+            customers = {row.id: row for row in rows_where_in(Customer, Customer.id, {r.customer_id for r in rows})}
+        customer_data = {}
+        if self.customer_serialize:
+            customer_data = {cid: self.customer_serialize(row) for cid, row in customers.items()}
+
+        creators = self.creators.by_id({row.created_by for row in rows}) if self.creators else {}
+
+        items = defaultdict(list)
+        if self.item_serialize:
+            for row in rows_where_in(Item, Item.debt_id, debt_ids, Item.id):
+                items[row.debt_id].append(self.item_serialize(row, row.quantity * row.price))
+
+        # Payment amounts in id order, summed in Python like Debt.amount_paid
+        amounts = defaultdict(list)
+        payments = defaultdict(list)
+        if self.payments:
+            for row, data in self.payments.dump_with_rows(self.payments.rows_where_in(Payment.debt_id, debt_ids, Payment.id)):
+                amounts[row.debt_id].append(row.amount)
+                payments[row.debt_id].append(data)
+        elif self.needs_amounts:
+            for start in range(0, len(debt_ids), IN_CHUNK_SIZE):
+                for debt_id, amount in db.session.execute(
+                    select(Payment.debt_id, Payment.amount)
+                    .where(Payment.debt_id.in_(debt_ids[start:start + IN_CHUNK_SIZE]))
+                    .order_by(Payment.id)
+                ):
+                    amounts[debt_id].append(amount)
+
+        result = []
+        for row in rows:
+            customer = customers.get(row.customer_id) if self.needs_customers else None
+            paid = sum(amounts[row.id])
+            result.append(self.serialize(
+                row,
+                customer_data.get(row.customer_id) if self.customer_serialize else None,
+                creators.get(row.created_by) if self.creators else None,
+                items[row.id],
+                payments[row.id],
+                customer.customer_name if customer else None,
+                customer.phone if customer else None,
+                paid,
+                row.total - paid if self.needs_amounts else None,
+            ))
+        return result
+
+
+class PaymentRowSerializer(CompiledSerializer):
+    """Serialize payment rows exactly like the given PaymentSchema instance."""
+
+    model = Payment
+    EXTRAS = ("debt", "received_by_user")
+
+    def compile(self, schema):
+        required = []
+
+        debt_schema = _nested_schema(schema, "debt")
+        self.debts = DebtRowSerializer(debt_schema) if debt_schema else None
+        if self.debts:
+            required.append("debt_id")
+
+        user_schema = _nested_schema(schema, "received_by_user")
+        self.receivers = UserRowSerializer(user_schema) if user_schema else None
+        if self.receivers:
+            required.append("received_by")
+        return tuple(required)
+
+    def dump_with_rows(self, rows):
+        self.ensure_compiled()
+        debts = {}
+        if self.debts and rows:
+            debt_rows = self.debts.rows_where_in(Debt.id, {row.debt_id for row in rows})
+            debts = {row.id: data for row, data in zip(debt_rows, self.debts.dump(debt_rows))}
+        receivers = self.receivers.by_id({row.received_by for row in rows}) if self.receivers else {}
+
+        return [
+            (row, self.serialize(
+                row,
+                debts.get(row.debt_id) if self.debts else None,
+                receivers.get(row.received_by) if self.receivers else None,
+            ))
+            for row in rows
+        ]
+
+    def dump(self, rows):
+        return [data for _, data in self.dump_with_rows(rows)]
+
+
+class CustomerRowSerializer(CompiledSerializer):
+    """Serialize customer rows exactly like the given CustomerSchema instance."""
+
+    model = Customer
+    EXTRAS = ("debts",)
+
+    def compile(self, schema):
+        debt_schema = _nested_schema(schema, "debts")
+        self.debts = DebtRowSerializer(debt_schema, ("customer_id",)) if debt_schema else None
+        return ()
+
+    def dump(self, rows):
+        self.ensure_compiled()
+        debts = defaultdict(list)
+        if self.debts and rows:
+            debt_rows = self.debts.rows_where_in(Debt.customer_id, [row.id for row in rows], Debt.id)
+            for debt_row, data in zip(debt_rows, self.debts.dump(debt_rows)):
+                debts[debt_row.customer_id].append(data)
+        return [self.serialize(row, debts[row.id]) for row in rows]
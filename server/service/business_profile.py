@@ -0,0 +1,63 @@
+import threading
+from sqlalchemy import func, select
+from server.extension import db
+from server.models import Customer, Debt, User, SyncCounter
+
+OPEN_DEBT_STATUSES = ("unpaid", "partial")
+
+# business_id -> (sync counter value, counts). The counter grows with every
+# customer, debt or member change, so an entry is valid while it matches.
+_counts_cache = {}
+_cache_lock = threading.Lock()
+MAX_CACHED_BUSINESSES = 10000
+
+
+def _grouped_count(column, business_column, business_ids, *filters):
+    rows = db.session.execute(
+        select(business_column, func.count(column))
+        .where(business_column.in_(business_ids), *filters)
+        .group_by(business_column)
+    )
+    return dict(rows.all())
+
+
+def _count_businesses(business_ids):
+    customers = _grouped_count(Customer.id, Customer.business_id, business_ids)
+    members = _grouped_count(User.id, User.business_id, business_ids)
+    open_debts = _grouped_count(Debt.id, Debt.business_id, business_ids, Debt.status.in_(OPEN_DEBT_STATUSES))
+    return {
+        business_id: {
+            "customers": customers.get(business_id, 0),
+            "members": members.get(business_id, 0),
+            "open_debts": open_debts.get(business_id, 0),
+        }
+        for business_id in business_ids
+    }
+
+
+def business_counts(business_ids):
+    """
+    ``{business_id: {"customers", "members", "open_debts"}}``, recounted
+    only for businesses whose sync counter moved since the last call.
+    """
+    business_ids = list(business_ids)
+    if not business_ids:
+        return {}
+    versions = dict(db.session.execute(
+        select(SyncCounter.business_id, SyncCounter.value).where(SyncCounter.business_id.in_(business_ids))
+    ).all())
+
+    with _cache_lock:
+        cached = {bid: _counts_cache.get(bid) for bid in business_ids}
+    stale = [bid for bid, entry in cached.items() if entry is None or entry[0] != versions.get(bid, 0)]
+
+    counts = {bid: entry[1] for bid, entry in cached.items() if bid not in stale}
+    if stale:
+        fresh = _count_businesses(stale)
+        counts.update(fresh)
+        with _cache_lock:
+            if len(_counts_cache) + len(fresh) > MAX_CACHED_BUSINESSES:
+                _counts_cache.clear()
+            for bid, value in fresh.items():
+                _counts_cache[bid] = (versions.get(bid, 0), value)
+    return counts
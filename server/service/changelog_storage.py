@@ -0,0 +1,297 @@
+"""
+Changelog storage lifecycle: monthly partitions (Postgres), per-business
+retention and a cold archive of gzipped NDJSON files, one per business
+and month, that the changelog API can still read on demand.
+"""
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, delete, func, or_, select, text
+from server.models import Business, ChangeLog, ChangeLogHead, FinanceSettings
+from server.models.changelog import DETAILS_SNAPSHOT
+from server.utils.change_tracking import allocate_change_seq
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "changelogs_y"
+DEFAULT_PARTITION = "changelogs_default"
+PARTITION_NAME = re.compile(r"^changelogs_y(\d{4})m(\d{2})$")
+ARCHIVE_NAME = re.compile(r"^changelogs-(\d{4})-(\d{2})\.ndjson\.gz$")
+UNSCOPED_DIR = "unscoped"
+
+# Rows moved to the archive per transaction
+ARCHIVE_BATCH_SIZE = 5000
+# Rows deleted per statement once archived
+DELETE_CHUNK_SIZE = 1000
+
+
+def month_start(moment):
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month):
+    return f"{PARTITION_PREFIX}{month.year:04d}m{month.month:02d}"
+
+
+# ---------------------------
+# Partitions (Postgres only)
+# ---------------------------
+def is_partitioned(session):
+    """True when changelogs is a native Postgres partitioned table."""
+    if session.get_bind().dialect.name != "postgresql":
+        return False
+    relkind = session.execute(text(
+        "SELECT relkind FROM pg_class WHERE relname = 'changelogs' AND pg_table_is_visible(oid)"
+    )).scalar()
+    return relkind == "p"
+
+
+def _create_partition(session, name, start, end):
+    """
+    Create the partition of ``start`` to ``end``. Postgres refuses while
+    the default partition holds rows of that range (the job missed their
+    month), so those are moved over with the default detached.
+    """
+    bounds = f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    in_range = f"timestamp >= '{start:%Y-%m-%d}' AND timestamp < '{end:%Y-%m-%d}'"
+    stranded = session.execute(text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})")).scalar()
+    if not stranded:
+        session.execute(text(f"CREATE TABLE {name} PARTITION OF changelogs {bounds}"))
+        return
+    session.execute(text(f"ALTER TABLE changelogs DETACH PARTITION {DEFAULT_PARTITION}"))
+    session.execute(text(f"CREATE TABLE {name} PARTITION OF changelogs {bounds}"))
+    session.execute(text(f"INSERT INTO changelogs SELECT * FROM {DEFAULT_PARTITION} WHERE {in_range}"))
+    moved = session.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}")).rowcount
+    session.execute(text(f"ALTER TABLE changelogs ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    logger.info(f"Moved {moved} changelogs from {DEFAULT_PARTITION} into {name}")
+
+
+def ensure_partitions(session, months_ahead=3, now=None):
+    """Create the monthly partitions for this month and the next ``months_ahead``."""
+    if not is_partitioned(session):
+        return []
+    month = month_start(now or datetime.utcnow())
+    created = []
+    for offset in range(months_ahead + 1):
+        start = add_months(month, offset)
+        name = partition_name(start)
+        if session.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None:
+            _create_partition(session, name, start, add_months(start, 1))
+        created.append(name)
+    return created
+
+
+def drop_empty_partitions(session, before):
+    """Drop monthly partitions that end on or before ``before`` and hold no rows."""
+    if not is_partitioned(session):
+        return []
+    names = session.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "WHERE parent.relname = 'changelogs'"
+    )).scalars().all()
+
+    dropped = []
+    for name in sorted(names):
+        match = PARTITION_NAME.match(name)
+        if not match:
+            continue
+        month = datetime(int(match.group(1)), int(match.group(2)), 1)
+        if add_months(month, 1) > before:
+            continue
+        if session.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+            continue
+        session.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    return dropped
+
+
+# ---------------------------
+# Archive files
+# ---------------------------
+def archive_root():
+    return current_app.config.get("CHANGELOG_ARCHIVE_DIR") or os.path.join(current_app.instance_path, "changelog_archive")
+
+
+def archive_dir(business_id):
+    return os.path.join(archive_root(), f"business_{business_id}" if business_id else UNSCOPED_DIR)
+
+
+def archive_path(business_id, month):
+    return os.path.join(archive_dir(business_id), f"changelogs-{month:%Y-%m}.ndjson.gz")
+
+
+def _archived_ids(path):
+    if not os.path.exists(path):
+        return set()
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        return {json.loads(line)["id"] for line in archive if line.strip()}
+
+
+def _to_line(row):
+    data = dict(row)
+    data["timestamp"] = data["timestamp"].isoformat() if data["timestamp"] else None
+    return json.dumps(data, default=str) + "\n"
+
+
+def read_archived(business_id, start=None, end=None):
+    """
+    Yield archived changelog rows of a business (as dicts) with
+    ``start <= timestamp < end``, oldest month first.
+    """
+    directory = archive_dir(business_id)
+    for path in sorted(glob.glob(os.path.join(directory, "changelogs-*.ndjson.gz"))):
+        match = ARCHIVE_NAME.match(os.path.basename(path))
+        if not match:
+            continue
+        month = datetime(int(match.group(1)), int(match.group(2)), 1)
+        if (start and add_months(month, 1) <= start) or (end and month >= end):
+            continue
+        with gzip.open(path, "rt", encoding="utf-8") as archive:
+            for line in archive:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                row["timestamp"] = datetime.fromisoformat(row["timestamp"]) if row["timestamp"] else None
+                if start and (row["timestamp"] is None or row["timestamp"] < start):
+                    continue
+                if end and (row["timestamp"] is None or row["timestamp"] >= end):
+                    continue
+                yield row
+
+
+# ---------------------------
+# Retention
+# ---------------------------
+def retention_policies():
+    """
+    {business_id: months} for every business with a retention: its finance
+    setting, else CHANGELOG_RETENTION_MONTHS. The None key (rows with no
+    business) only follows the app default.
+    """
+    default = current_app.config.get("CHANGELOG_RETENTION_MONTHS")
+    policies = {}
+    if default:
+        policies = {business_id: default for (business_id,) in Business.query.with_entities(Business.id)}
+        policies[None] = default
+    for business_id, months in FinanceSettings.query.with_entities(
+        FinanceSettings.business_id, FinanceSettings.changelog_retention_months
+    ):
+        if months:
+            policies[business_id] = months
+    return policies
+
+
+def archived_rows(business_id, cutoff):
+    """
+    SELECT of the business's changelog rows older than ``cutoff`` that can
+    leave the table. The newest snapshot of an entity that still has a
+    head, and the deltas after it, stay: ``reconstruct`` and the next
+    versions written need them.
+    """
+    table = ChangeLog.__table__
+    heads = ChangeLogHead.__table__
+    condition = table.c.business_id.is_(None) if business_id is None else table.c.business_id == business_id
+    snapshots = (
+        select(table.c.entity_type, table.c.entity_id, func.max(table.c.entity_version).label("version"))
+        .where(condition, table.c.details_format == DETAILS_SNAPSHOT)
+        .group_by(table.c.entity_type, table.c.entity_id)
+        .subquery()
+    )
+    return (
+        select(table)
+        .outerjoin(snapshots, and_(snapshots.c.entity_type == table.c.entity_type, snapshots.c.entity_id == table.c.entity_id))
+        .outerjoin(heads, and_(heads.c.entity_type == table.c.entity_type, heads.c.entity_id == table.c.entity_id))
+        .where(
+            condition,
+            table.c.timestamp < cutoff,
+            or_(
+                table.c.entity_version.is_(None),
+                heads.c.entity_id.is_(None),
+                snapshots.c.version.is_(None),
+                table.c.entity_version < snapshots.c.version,
+            ),
+        )
+        .order_by(table.c.timestamp, table.c.id)
+    )
+
+
+def archive_business(session, business_id, cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move changelog rows of a business older than ``cutoff`` into its archive
+    files, except the history live entities still diff against (see
+    ``archived_rows``), ``batch_size`` rows per transaction so memory and
+    lock time stay bounded. Files are written before rows are deleted; ids
+    already in a file are skipped, so a rerun after a failure never
+    duplicates rows.
+    """
+    table = ChangeLog.__table__
+    # Ids already in each file: read once, the rows appended here are deleted
+    seen = {}
+    total = 0
+    while True:
+        # Archived rows leave the table, so each pass picks up the next batch
+        rows = session.execute(archived_rows(business_id, cutoff).limit(batch_size)).mappings().all()
+        if not rows:
+            break
+
+        os.makedirs(archive_dir(business_id), exist_ok=True)
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(month_start(row["timestamp"]), []).append(row)
+        for month, month_rows in by_month.items():
+            path = archive_path(business_id, month)
+            if path not in seen:
+                seen[path] = _archived_ids(path)
+            with gzip.open(path, "at", encoding="utf-8") as archive:
+                for row in month_rows:
+                    if row["id"] not in seen[path]:
+                        archive.write(_to_line(row))
+
+        ids = [row["id"] for row in rows]
+        for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+            session.execute(delete(table).where(table.c.id.in_(ids[start:start + DELETE_CHUNK_SIZE])))
+        if business_id is not None:
+            allocate_change_seq(session, business_id)
+        session.commit()
+        total += len(ids)
+        if len(rows) < batch_size:
+            break
+    return total
+
+
+def apply_retention(session, now=None):
+    """
+    Archive every business's changelogs past its retention (whole months),
+    then drop the partitions nothing lives in anymore.
+    Returns {business_id: rows archived}.
+    """
+    this_month = month_start(now or datetime.utcnow())
+    archived = {}
+    oldest_cutoff = None
+    for business_id, months in retention_policies().items():
+        cutoff = add_months(this_month, -months)
+        count = archive_business(session, business_id, cutoff)
+        session.commit()
+        if count:
+            archived[business_id] = count
+            logger.info("Archived %d changelog rows of business %s before %s", count, business_id, cutoff.date())
+        oldest_cutoff = cutoff if oldest_cutoff is None else min(oldest_cutoff, cutoff)
+
+    if oldest_cutoff is not None:
+        dropped = drop_empty_partitions(session, oldest_cutoff)
+        session.commit()
+        if dropped:
+            logger.info("Dropped empty changelog partitions: %s", ", ".join(dropped))
+    return archived
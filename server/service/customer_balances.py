@@ -0,0 +1,114 @@
+from datetime import datetime
+from sqlalchemy import DateTime, case, func, literal, or_, select
+from server.models import Customer, CustomerBalance, Debt, Payment
+from server.service.business_profile import OPEN_DEBT_STATUSES
+from server.utils.derived_tables import id_chunks, refresh_in_chunks
+from server.utils.upsert import dialect_insert
+
+MONEY_TOLERANCE = 0.005
+
+
+def balance_rows(customer_filter):
+    """
+    SELECT of one ``customer_balances`` row per customer matched by
+    ``customer_filter(customer_id_column)``, aggregated from its debts
+    and payments. Customers without debts get zeros.
+    """
+    debts = Debt.__table__
+    payments = (
+        select(
+            Payment.debt_id,
+            func.sum(Payment.amount).label("paid"),
+            func.max(Payment.payment_date).label("last_payment_date"),
+        )
+        .join(debts, debts.c.id == Payment.debt_id)
+        .where(customer_filter(debts.c.customer_id))
+        .group_by(Payment.debt_id)
+        .subquery()
+    )
+    paid = func.coalesce(payments.c.paid, 0)
+    is_open = debts.c.status.in_(OPEN_DEBT_STATUSES)
+    return (
+        select(
+            Customer.id.label("customer_id"),
+            Customer.business_id,
+            func.coalesce(func.sum(debts.c.total), 0).label("total_issued"),
+            func.coalesce(func.sum(paid), 0).label("total_paid"),
+            func.coalesce(func.sum(debts.c.total - paid), 0).label("outstanding"),
+            func.coalesce(func.sum(case((is_open, 1), else_=0)), 0).label("open_debts"),
+            func.min(case((is_open, debts.c.due_date))).label("oldest_due_date"),
+            func.max(payments.c.last_payment_date).label("last_payment_date"),
+            literal(datetime.utcnow(), DateTime).label("updated_at"),
+        )
+        .select_from(Customer)
+        .outerjoin(debts, debts.c.customer_id == Customer.id)
+        .outerjoin(payments, payments.c.debt_id == debts.c.id)
+        .where(customer_filter(Customer.id))
+        .group_by(Customer.id, Customer.business_id)
+    )
+
+
+def drifted_balances(customer_filter):
+    """
+    SELECT of the ids of customers matched by ``customer_filter`` whose
+    customer_balances row is missing or differs from ``balance_rows``.
+    """
+    live = balance_rows(customer_filter).subquery()
+    stored = CustomerBalance.__table__
+    return (
+        select(live.c.customer_id)
+        .outerjoin(stored, stored.c.customer_id == live.c.customer_id)
+        .where(or_(
+            stored.c.customer_id.is_(None),
+            # Sums of floats can differ in the last bits with the row order
+            *(func.abs(stored.c[name] - live.c[name]) > MONEY_TOLERANCE
+              for name in ("total_issued", "total_paid", "outstanding")),
+            stored.c.open_debts != live.c.open_debts,
+            stored.c.oldest_due_date.is_distinct_from(live.c.oldest_due_date),
+            stored.c.last_payment_date.is_distinct_from(live.c.last_payment_date),
+        ))
+    )
+
+
+def write_balances(session, rows):
+    """Upsert the rows of a ``balance_rows`` select into customer_balances."""
+    table = CustomerBalance.__table__
+    columns = [column.name for column in rows.selected_columns]
+    stmt = dialect_insert(session, table).from_select(columns, rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.customer_id],
+        set_={name: stmt.excluded[name] for name in columns if name != "customer_id"},
+    )
+    session.execute(stmt)
+
+
+def _refresh(session, customer_filter, chunks):
+    refresh_in_chunks(
+        session, CustomerBalance,
+        lambda chunk: write_balances(session, balance_rows(lambda column: customer_filter(column, chunk))),
+        chunks,
+    )
+
+
+def refresh_customer_balances(session, customer_ids):
+    """
+    Rewrite the customer_balances rows of the given customers from their
+    debts and payments, one INSERT ... SELECT ... ON CONFLICT per chunk,
+    in the caller's transaction. Call it after the debts' stored totals
+    and statuses are current.
+    """
+    chunks = id_chunks(customer_ids)
+    if chunks:
+        _refresh(session, lambda column, chunk: column.in_(chunk), chunks)
+
+
+def refresh_debt_customer_balances(session, debt_ids):
+    """``refresh_customer_balances`` for the customers owning the given debts."""
+    chunks = id_chunks(debt_ids)
+    if chunks:
+        owners = Debt.__table__
+        _refresh(
+            session,
+            lambda column, chunk: column.in_(select(owners.c.customer_id).where(owners.c.id.in_(chunk))),
+            chunks,
+        )
@@ -0,0 +1,337 @@
+import bisect
+import itertools
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from sqlalchemy import case, func, literal_column, or_, select, text
+from server.extension import db
+from server.models import Customer, SyncTombstone
+from server.utils.derived_tables import sqlite_table_exists
+from server.utils.phone import national_number, phone_digits
+
+# "memory": per-business prefix index kept in the process, falling back to
+# the database for tenants above CUSTOMER_SEARCH_MEMORY_LIMIT customers.
+# "database": always query the search indexes (tsvector/trigram, FTS5).
+SEARCH_BACKEND = os.getenv("CUSTOMER_SEARCH_BACKEND", "memory")
+MEMORY_LIMIT = int(os.getenv("CUSTOMER_SEARCH_MEMORY_LIMIT", "250000"))
+MAX_INDEXED_BUSINESSES = 64
+# More changed customers than this since the last look rebuilds the index
+MAX_INCREMENTAL_CHANGES = 1000
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# Index entries walked per lookup at most, however broad the prefix
+MAX_SCAN = 20000
+# Multi-word queries with a word matching at most this many keys are ranked exactly
+SMALL_RUN = 2000
+# Phone queries need this many digits before they are matched on numbers
+MIN_PHONE_DIGITS = 3
+
+_WORDS = re.compile(r"\w+", re.UNICODE)
+_PHONE_QUERY = re.compile(r"[\d\s()+\-.]+")
+
+# Match ranks: the name starts with the first word, a phone number matches,
+# only later words of the name match
+RANK_NAME, RANK_PHONE, RANK_WORD = 0, 1, 2
+
+
+class SearchQuery:
+    """A search string split into name words or a phone number prefix."""
+
+    def __init__(self, raw):
+        self.raw = (raw or "").strip()
+        self.words = name_words(self.raw)
+        self.phone = None
+        if _PHONE_QUERY.fullmatch(self.raw) and len(phone_digits(self.raw)) >= MIN_PHONE_DIGITS:
+            self.phone = national_number(self.raw) or phone_digits(self.raw)
+
+    def __bool__(self):
+        return bool(self.words or self.phone)
+
+
+def name_words(name):
+    return _WORDS.findall((name or "").lower())
+
+
+class CustomerPrefixIndex:
+    """
+    One business's customers in two sorted lists: ``(name, id)`` for
+    whole-name prefixes and ``(key, name, id)`` for every word of the name
+    and the national phone number. A lookup bisects to the prefix and
+    walks the run in order, so it stops after ``limit`` matches instead of
+    ranking every candidate. ``seq`` is the customer change_seq the index
+    is current up to.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.names = []
+        self.keys = []
+        self.customers = {}  # customer_id -> (name, keys)
+        self.seq = 0
+
+    @staticmethod
+    def _entry(name, phone):
+        name = sys.intern((name or "").lower())
+        keys = {sys.intern(word) for word in name_words(name)}
+        number = national_number(phone)
+        if number:
+            keys.add(number)
+        return name, tuple(keys)
+
+    def load(self, rows, seq):
+        names, keys, customers = [], [], {}
+        for customer_id, name, phone in rows:
+            name, entry_keys = customers[customer_id] = self._entry(name, phone)
+            names.append((name, customer_id))
+            keys.extend((key, name, customer_id) for key in entry_keys)
+        names.sort()
+        keys.sort()
+        self.names, self.keys, self.customers, self.seq = names, keys, customers, seq
+
+    @staticmethod
+    def _discard(entries, entry):
+        index = bisect.bisect_left(entries, entry)
+        if index < len(entries) and entries[index] == entry:
+            del entries[index]
+
+    def remove(self, customer_id):
+        entry = self.customers.pop(customer_id, None)
+        if entry is None:
+            return
+        name, entry_keys = entry
+        self._discard(self.names, (name, customer_id))
+        for key in entry_keys:
+            self._discard(self.keys, (key, name, customer_id))
+
+    def put(self, customer_id, name, phone):
+        self.remove(customer_id)
+        name, entry_keys = self.customers[customer_id] = self._entry(name, phone)
+        bisect.insort(self.names, (name, customer_id))
+        for key in entry_keys:
+            bisect.insort(self.keys, (key, name, customer_id))
+
+    @staticmethod
+    def _run(entries, prefix):
+        start = bisect.bisect_left(entries, (prefix,))
+        for index in range(start, min(start + MAX_SCAN, len(entries))):
+            entry = entries[index]
+            if not entry[0].startswith(prefix):
+                break
+            yield entry
+
+    @staticmethod
+    def _count(entries, prefix):
+        return bisect.bisect_left(entries, (prefix + "\U0010ffff",)) - bisect.bisect_left(entries, (prefix,))
+
+    def _matches_all(self, customer_id, words):
+        keys = self.customers[customer_id][1]
+        return all(any(key.startswith(word) for key in keys) for word in words)
+
+    def search(self, query, limit):
+        """``[(rank, customer_id)]`` of the first ``limit`` matches, best first."""
+        if query.phone:
+            return [(RANK_PHONE, customer_id) for _, _, customer_id in
+                    itertools.islice(self._run(self.keys, query.phone), limit)]
+
+        runs = sorted((self._count(self.keys, word), word) for word in query.words)
+        size, rarest = runs[0]
+        if size == 0:
+            return []
+        if len(query.words) > 1 and size <= SMALL_RUN:
+            # A rare word: rank all of its customers exactly
+            matches = []
+            for _, name, customer_id in self._run(self.keys, rarest):
+                if self._matches_all(customer_id, query.words):
+                    matches.append((RANK_NAME if name.startswith(query.words[0]) else RANK_WORD, name, customer_id))
+            return [(rank, customer_id) for rank, _, customer_id in sorted(set(matches))[:limit]]
+
+        found = []
+        seen = set()
+        # Names starting with the first word, in name order
+        for _, customer_id in self._run(self.names, query.words[0]):
+            if len(found) == limit:
+                return found
+            if self._matches_all(customer_id, query.words[1:]):
+                found.append((RANK_NAME, customer_id))
+                seen.add(customer_id)
+        # Then later words of the name, in word order
+        for _, _, customer_id in self._run(self.keys, query.words[0]):
+            if len(found) == limit:
+                break
+            if customer_id not in seen and self._matches_all(customer_id, query.words[1:]):
+                found.append((RANK_WORD, customer_id))
+                seen.add(customer_id)
+        return found
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _customer_changes(business_id, since):
+    rows = db.session.execute(
+        select(Customer.id, Customer.customer_name, Customer.phone, Customer.change_seq)
+        .where(Customer.business_id == business_id, Customer.change_seq > since)
+        .limit(MAX_INCREMENTAL_CHANGES + 1)
+    ).all()
+    removed = db.session.execute(
+        select(SyncTombstone.entity_id, SyncTombstone.change_seq)
+        .where(
+            SyncTombstone.business_id == business_id,
+            SyncTombstone.change_seq > since,
+            SyncTombstone.entity_type == "Customer",
+        )
+        .limit(MAX_INCREMENTAL_CHANGES + 1)
+    ).all()
+    return rows, removed
+
+
+def _build_index(business_id):
+    # Read the cursor first: a customer committed in between is picked up
+    # again by the next incremental update instead of being missed
+    seq = db.session.execute(
+        select(func.coalesce(func.max(Customer.change_seq), 0)).where(Customer.business_id == business_id)
+    ).scalar()
+    tombstone_seq = db.session.execute(
+        select(func.coalesce(func.max(SyncTombstone.change_seq), 0))
+        .where(SyncTombstone.business_id == business_id, SyncTombstone.entity_type == "Customer")
+    ).scalar()
+    rows = db.session.execute(
+        select(Customer.id, Customer.customer_name, Customer.phone)
+        .where(Customer.business_id == business_id)
+    ).all()
+    index = CustomerPrefixIndex()
+    index.load(rows, max(seq, tombstone_seq))
+    return index
+
+
+def business_index(business_id):
+    """
+    The business's prefix index, built on first use and brought up to
+    date with the customers and customer tombstones written since.
+    """
+    with _indexes_lock:
+        index = _indexes.get(business_id)
+        if index is not None:
+            _indexes.move_to_end(business_id)
+
+    if index is None:
+        index = _build_index(business_id)
+        with _indexes_lock:
+            _indexes[business_id] = index
+            while len(_indexes) > MAX_INDEXED_BUSINESSES:
+                _indexes.popitem(last=False)
+        return index
+
+    with index.lock:
+        rows, removed = _customer_changes(business_id, index.seq)
+        if len(rows) > MAX_INCREMENTAL_CHANGES or len(removed) > MAX_INCREMENTAL_CHANGES:
+            fresh = _build_index(business_id)
+            index.names, index.keys, index.customers, index.seq = fresh.names, fresh.keys, fresh.customers, fresh.seq
+            return index
+        for customer_id, seq in removed:
+            index.remove(customer_id)
+            index.seq = max(index.seq, seq)
+        for customer_id, name, phone, seq in rows:
+            index.put(customer_id, name, phone)
+            index.seq = max(index.seq, seq)
+    return index
+
+
+# -- database backends -------------------------------------------------------
+
+# Same expressions as the Postgres indexes in migration e2a7c4d9b316
+def _pg_name_vector():
+    return func.to_tsvector(literal_column("'simple'"), Customer.customer_name)
+
+
+def _pg_phone_digits():
+    return func.regexp_replace(Customer.phone, literal_column("'[^0-9]'"), literal_column("''"), literal_column("'g'"))
+
+
+def _name_rank(query):
+    return case((func.lower(Customer.customer_name).startswith(query.words[0], autoescape=True), RANK_NAME), else_=RANK_WORD)
+
+
+def _fts_match(match):
+    matched = select(literal_column("rowid")).select_from(text("customers_fts")).where(
+        text("customers_fts MATCH :match").bindparams(match=match)
+    )
+    return Customer.id.in_(matched)
+
+
+def database_matches(session, business_id, query, limit, visible=None):
+    """``[(rank, customer_id)]`` from the database's search indexes."""
+    dialect = session.get_bind().dialect.name
+    fts = dialect == "sqlite" and sqlite_table_exists(session, "customers_fts")
+    filters = [Customer.business_id == business_id]
+    if visible is not None:
+        filters.append(Customer.id.in_(visible))
+
+    if query.phone:
+        rank = literal_column(str(RANK_PHONE))
+        if dialect == "postgresql":
+            # Trigram index on the digits; the national number can sit anywhere in them
+            filters.append(_pg_phone_digits().contains(query.phone, autoescape=True))
+        elif fts:
+            filters.append(_fts_match(f'phone : "{query.phone}"*'))
+        else:
+            filters.append(func.replace(func.replace(Customer.phone, " ", ""), "-", "").contains(query.phone, autoescape=True))
+    else:
+        rank = _name_rank(query)
+        if dialect == "postgresql":
+            tsquery = " & ".join(f"{word}:*" for word in query.words)
+            filters.append(_pg_name_vector().op("@@")(func.to_tsquery(literal_column("'simple'"), tsquery)))
+        elif fts:
+            words = " AND ".join(f'"{word}"*' for word in query.words)
+            filters.append(_fts_match(f"customer_name : ({words})"))
+        else:
+            filters.extend(
+                or_(func.lower(Customer.customer_name).startswith(word, autoescape=True),
+                    func.lower(Customer.customer_name).contains(f" {word}", autoescape=True))
+                for word in query.words
+            )
+
+    rows = session.execute(
+        select(rank.label("rank"), Customer.id)
+        .where(*filters)
+        .order_by(rank, func.lower(Customer.customer_name), Customer.id)
+        .limit(limit)
+    ).all()
+    return [(row.rank, row.id) for row in rows]
+
+
+def _use_memory(business_id):
+    if SEARCH_BACKEND != "memory":
+        return False
+    with _indexes_lock:
+        index = _indexes.get(business_id)
+    if index is not None:
+        return True
+    size = db.session.execute(select(func.count(Customer.id)).where(Customer.business_id == business_id)).scalar()
+    return size <= MEMORY_LIMIT
+
+
+def search_customers(business_id, raw_query, limit=DEFAULT_LIMIT, visible=None):
+    """
+    Best matches for ``raw_query`` in one business as ``[(rank, customer_id)]``:
+    name word prefixes ("jo ka" finds "John Kamau") or, for number-like
+    queries, national phone number prefixes ("0712", "+254712").
+    ``visible`` optionally restricts the customers (a SELECT of ids); such
+    searches always run in the database, where the restriction applies
+    before the limit.
+    """
+    query = SearchQuery(raw_query)
+    if not query:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    if visible is None and _use_memory(business_id):
+        index = business_index(business_id)
+        with index.lock:
+            return index.search(query, limit)
+
+    return database_matches(db.session, business_id, query, limit, visible)
@@ -0,0 +1,120 @@
+from sqlalchemy import Float, Integer, String, and_, case, false, func, literal, select, true, union_all
+from server.models import Debt, Payment
+from server.utils.helper import pagination
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+ENTRY_DEBT, ENTRY_PAYMENT, ENTRY_OPENING = "debt", "payment", "opening_balance"
+
+
+def ledger(customer_id):
+    """
+    UNION ALL of the customer's debts (debits, at creation) and payments
+    (credits, at payment date) as ``(entry_date, entry_order, entry_type,
+    entry_id, debt_id, description, debit, credit)``. ``entry_order`` puts
+    a debt before a payment made at the same instant.
+    """
+    debts = Debt.__table__
+    payments = Payment.__table__
+    debits = select(
+        debts.c.created_at.label("entry_date"),
+        literal(0, Integer).label("entry_order"),
+        literal(ENTRY_DEBT, String).label("entry_type"),
+        debts.c.id.label("entry_id"),
+        debts.c.id.label("debt_id"),
+        debts.c.category.label("description"),
+        debts.c.total.label("debit"),
+        literal(0.0, Float).label("credit"),
+    ).where(debts.c.customer_id == customer_id)
+    credits = (
+        select(
+            payments.c.payment_date,
+            literal(1, Integer),
+            literal(ENTRY_PAYMENT, String),
+            payments.c.id,
+            payments.c.debt_id,
+            payments.c.method,
+            literal(0.0, Float),
+            payments.c.amount,
+        )
+        .join(debts, debts.c.id == payments.c.debt_id)
+        .where(debts.c.customer_id == customer_id)
+    )
+    return union_all(debits, credits).subquery("ledger")
+
+
+def _entry(row):
+    return {
+        "date": row.entry_date.isoformat() if row.entry_date else None,
+        "type": row.entry_type,
+        "debt_id": row.debt_id,
+        "payment_id": row.entry_id if row.entry_type == ENTRY_PAYMENT else None,
+        "invoice_number": f"INV-{row.debt_id:05d}",
+        "description": row.description,
+        "debit": round(float(row.debit or 0), 2),
+        "credit": round(float(row.credit or 0), 2),
+        "balance": round(row.balance, 2),
+    }
+
+
+def customer_statement(session, customer_id, start=None, end=None, page=1, per_page=DEFAULT_PER_PAGE):
+    """
+    One page of the customer's statement between ``start`` and ``end``
+    (end exclusive): ledger entries oldest first, each with the running
+    balance (debits less credits) after it. The running balance is a SUM
+    window over the ledger union, offset by the opening balance, the net
+    of every entry before ``start``, which page 1 lists as its first entry.
+    Two queries whatever the customer's history: the opening/closing
+    totals and the page.
+    """
+    entries = ledger(customer_id)
+    net = entries.c.debit - entries.c.credit
+    before = entries.c.entry_date < start if start else false()
+    window = [entries.c.entry_date >= start] if start else []
+    if end:
+        window.append(entries.c.entry_date < end)
+    in_window = and_(true(), *window)
+
+    totals = session.execute(
+        select(
+            func.coalesce(func.sum(case((before, net), else_=0)), 0).label("opening"),
+            func.coalesce(func.sum(case((in_window, entries.c.debit), else_=0)), 0).label("debits"),
+            func.coalesce(func.sum(case((in_window, entries.c.credit), else_=0)), 0).label("credits"),
+            func.count(case((in_window, 1))).label("count"),
+        ).select_from(entries)
+    ).one()
+    opening = float(totals.opening)
+
+    order = (entries.c.entry_date, entries.c.entry_order, entries.c.entry_id)
+    running = literal(opening, Float) + func.sum(net).over(order_by=order, rows=(None, 0))
+    rows = session.execute(
+        select(entries, running.label("balance"))
+        .where(in_window)
+        .order_by(*order)
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+    ).all()
+
+    lines = [_entry(row) for row in rows]
+    if page == 1:
+        lines.insert(0, {
+            "date": start.isoformat() if start else None,
+            "type": ENTRY_OPENING,
+            "debt_id": None,
+            "payment_id": None,
+            "invoice_number": None,
+            "description": "Opening balance",
+            "debit": 0.0,
+            "credit": 0.0,
+            "balance": round(opening, 2),
+        })
+
+    return {
+        "opening_balance": round(opening, 2),
+        "total_debits": round(float(totals.debits), 2),
+        "total_credits": round(float(totals.credits), 2),
+        "closing_balance": round(opening + float(totals.debits) - float(totals.credits), 2),
+        "entries": lines,
+        "pagination": pagination(page, per_page, totals.count),
+    }
@@ -0,0 +1,202 @@
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List
+from sqlalchemy import delete, select, update
+from server.models import Business, Customer, CustomerBalance, Debt, IdempotencyKey, SyncTombstone
+from server.service.customer_balances import refresh_customer_balances
+from server.service.debt_search import refresh_customer_documents
+from server.utils.change_logger import log_change
+from server.utils.change_tracking import allocate_change_seq
+from server.utils.helper import normalize_email
+from server.utils.phone import normalize_phone
+from server.utils.upsert import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MERGE_BATCH = 500
+
+
+def find_customer(session, business_id, phone):
+    """The business's customer with this phone number in any spelling, if any."""
+    phone_norm = normalize_phone(phone)
+    if phone_norm is None:
+        return None
+    return session.execute(
+        select(Customer).where(Customer.business_id == business_id, Customer.phone_norm == phone_norm)
+    ).scalar_one_or_none()
+
+
+def upsert_customer(session, business_id, created_by, customer_name, phone, id_number, email=None):
+    """
+    Return ``(customer, created)``: the business's customer with this phone
+    number, inserted with the given details unless one already exists.
+    One INSERT ... ON CONFLICT DO NOTHING on (business_id, phone_norm), so
+    concurrent requests for the same number end up with the same row.
+    """
+    phone_norm = normalize_phone(phone)
+    if phone_norm is not None:
+        session.flush()
+        table = Customer.__table__
+        now = datetime.utcnow()
+        customer_id = session.execute(
+            dialect_insert(session, table)
+            .values(
+                customer_name=customer_name,
+                phone=phone,
+                phone_norm=phone_norm,
+                email=email,
+                email_norm=normalize_email(email),
+                id_number=id_number,
+                business_id=business_id,
+                created_by=created_by,
+                created_at=now,
+                updated_at=now,
+                # Core inserts skip the flush hook that stamps change_seq
+                change_seq=allocate_change_seq(session, business_id),
+            )
+            .on_conflict_do_nothing(index_elements=[table.c.business_id, table.c.phone_norm])
+            .returning(table.c.id)
+        ).scalar()
+        if customer_id is not None:
+            return session.get(Customer, customer_id), True
+        return find_customer(session, business_id, phone), False
+
+    # Nothing to key on: always a new customer
+    customer = Customer(
+        customer_name=customer_name, phone=phone, id_number=id_number, email=email,
+        business_id=business_id, created_by=created_by,
+    )
+    session.add(customer)
+    session.flush()
+    return customer, True
+
+
+@dataclass
+class MergeReport:
+    businesses: int = 0
+    scanned: int = 0
+    groups: int = 0
+    merged: int = 0
+    debts_moved: int = 0
+    dry_run: bool = False
+    # survivor id -> merged customer ids
+    merges: Dict[int, List[int]] = field(default_factory=dict)
+
+
+def duplicate_groups(session, business_id):
+    """
+    ``{phone_norm: [customer ids]}`` of the business's customers sharing a
+    phone number in any spelling, oldest id first. Reads the raw phone, so
+    rows whose phone_norm was left empty (duplicates at migration time)
+    are found too.
+    """
+    groups = defaultdict(list)
+    rows = session.execute(
+        select(Customer.id, Customer.phone).where(Customer.business_id == business_id).order_by(Customer.id)
+        .execution_options(yield_per=5000)
+    )
+    scanned = 0
+    for customer_id, phone in rows:
+        scanned += 1
+        phone_norm = normalize_phone(phone)
+        if phone_norm is not None:
+            groups[phone_norm].append(customer_id)
+    return {phone_norm: ids for phone_norm, ids in groups.items() if len(ids) > 1}, scanned
+
+
+def merge_customers(session, business_id, survivor_id, duplicate_ids, phone_norm):
+    """
+    Move the debts (and offline upload keys) of ``duplicate_ids`` to
+    ``survivor_id`` and delete the duplicates, leaving sync tombstones and
+    changelog entries. Core statements, so sequence numbers are allocated
+    here. Returns the number of debts moved.
+    """
+    count = len(duplicate_ids) + 1
+    seq = allocate_change_seq(session, business_id, count) - count
+
+    debts = Debt.__table__
+    moved = session.execute(
+        update(debts)
+        .where(debts.c.customer_id.in_(duplicate_ids))
+        .values(customer_id=survivor_id, change_seq=seq + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    # Replayed uploads that created a duplicate now resolve to the survivor
+    keys = IdempotencyKey.__table__
+    session.execute(
+        update(keys)
+        .where(keys.c.business_id == business_id, keys.c.entity_type == "Customer", keys.c.entity_id.in_(duplicate_ids))
+        .values(entity_id=survivor_id)
+    )
+
+    customers = Customer.__table__
+    survivor_email = session.execute(select(customers.c.email_norm).where(customers.c.id == survivor_id)).scalar()
+    email_norm = survivor_email or session.execute(
+        select(customers.c.email_norm)
+        .where(customers.c.id.in_(duplicate_ids), customers.c.email_norm.isnot(None))
+        .order_by(customers.c.id)
+        .limit(1)
+    ).scalar()
+
+    session.execute(delete(CustomerBalance.__table__).where(CustomerBalance.__table__.c.customer_id.in_(duplicate_ids)))
+    session.execute(delete(customers).where(customers.c.id.in_(duplicate_ids)))
+    session.execute(
+        update(customers)
+        .where(customers.c.id == survivor_id)
+        .values(phone_norm=phone_norm, email_norm=email_norm, change_seq=seq + 1, updated_at=datetime.utcnow())
+    )
+    session.add_all(
+        SyncTombstone(business_id=business_id, entity_type="Customer", entity_id=customer_id,
+                      change_seq=seq + 1 + index, deleted_at=datetime.utcnow())
+        for index, customer_id in enumerate(duplicate_ids, start=1)
+    )
+    for customer_id in duplicate_ids:
+        log_change("Customer", customer_id, "delete", details={"merged_into": survivor_id}, business_id=business_id)
+    refresh_customer_balances(session, [survivor_id])
+    refresh_customer_documents(session, [survivor_id])
+    return moved
+
+
+def merge_duplicate_customers(session, business_id=None, batch_size=DEFAULT_MERGE_BATCH, dry_run=False, progress=None):
+    """
+    Merge customers of the same business that share a phone number into
+    the oldest of them, ``batch_size`` groups per transaction.
+    """
+    report = MergeReport(dry_run=dry_run)
+    if business_id is not None:
+        business_ids = [business_id]
+    else:
+        business_ids = session.execute(select(Business.id).order_by(Business.id)).scalars().all()
+
+    for bid in business_ids:
+        groups, scanned = duplicate_groups(session, bid)
+        report.businesses += 1
+        report.scanned += scanned
+        report.groups += len(groups)
+        pending = 0
+        for phone_norm, ids in groups.items():
+            survivor, duplicates = ids[0], ids[1:]
+            report.merges[survivor] = duplicates
+            report.merged += len(duplicates)
+            if dry_run:
+                continue
+            report.debts_moved += merge_customers(session, bid, survivor, duplicates, phone_norm)
+            pending += 1
+            if pending >= batch_size:
+                session.commit()
+                pending = 0
+        if dry_run:
+            session.rollback()
+        else:
+            session.commit()
+        if progress:
+            progress(bid, report)
+
+    logger.info(
+        f"Customer dedup: {report.groups} duplicate groups, {report.merged} customers merged, "
+        f"{report.debts_moved} debts moved{' (dry run)' if dry_run else ''}"
+    )
+    return report
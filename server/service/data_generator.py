@@ -0,0 +1,303 @@
+"""
+Synthetic tenants for load testing and benchmarks.
+
+Every business gets an owner, an admin, salespeople, finance settings and
+``customers`` customers with ``debts`` debts each; debts get items,
+payments and reminder logs drawn from fixed distributions. Rows are
+written with multi-row Core inserts and explicit ids, a batch of
+customers per transaction, so millions of debts load in minutes on
+SQLite or Postgres.
+
+Output depends only on the seed, the sizes and ``as_of`` (the "today"
+dates are drawn around), not on the batch size or the database; only
+password hashes (salted) and change sequence numbers differ between runs.
+"""
+import logging
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select, text, update
+from werkzeug.security import generate_password_hash
+from server.models import Business, ChangeLog, Customer, Debt, FinanceSettings, Item, Payment, User
+from server.models.changelog import DETAILS_EVENT
+from server.service.customer_balances import refresh_customer_balances
+from server.service.debt_search import refresh_customer_documents
+from server.utils.change_tracking import allocate_change_seq
+from server.utils.helper import normalize_email
+from server.utils.phone import normalize_phone
+
+logger = logging.getLogger(__name__)
+
+# Every generated user logs in with this password
+GENERATED_PASSWORD = "paysync123"
+EMAIL_DOMAIN = "gen.paysync.test"
+
+FIRST_NAMES = (
+    "Amina", "Brian", "Caroline", "David", "Esther", "Felix", "Grace", "Hassan", "Irene", "James",
+    "Kevin", "Lucy", "Mercy", "Njeri", "Otieno", "Peter", "Quincy", "Rose", "Samuel", "Wanjiru",
+)
+LAST_NAMES = (
+    "Achieng", "Barasa", "Chege", "Kamau", "Kariuki", "Kiptoo", "Mutua", "Mwangi", "Njoroge", "Ochieng",
+    "Odhiambo", "Omondi", "Otieno", "Wafula", "Wambui",
+)
+BUSINESS_KINDS = ("Hardware", "Agrovet", "Supplies", "Traders", "Wholesalers", "Distributors")
+
+# (name, category, unit price range)
+CATALOG = (
+    ("Cement 50kg", "Building", (650, 850)),
+    ("Iron sheets", "Building", (900, 1500)),
+    ("Nails 1kg", "Building", (150, 250)),
+    ("Paint 4L", "Finishing", (1800, 3200)),
+    ("PVC pipe", "Plumbing", (350, 900)),
+    ("Fertilizer 50kg", "Agriculture", (2500, 4000)),
+    ("Maize seed 2kg", "Agriculture", (450, 700)),
+    ("Solar lamp", "Electrical", (1200, 2500)),
+    ("Cable 10m", "Electrical", (400, 1100)),
+    ("Wheelbarrow", "Tools", (3500, 5500)),
+)
+
+# Share of debts by how much of them has been paid
+SETTLEMENT_WEIGHTS = (("unpaid", 25), ("partial", 45), ("paid", 30))
+PAYMENT_METHODS = (("cash", 45), ("mobile money", 45), ("bank", 10))
+TERM_DAYS = (7, 14, 30, 30, 60, 90)
+# Every reminder the app sends and logs today goes by email
+REMINDER_CHANNEL = "email"
+
+# Customers signed up over this period before as_of
+HISTORY_DAYS = 730
+
+
+@dataclass
+class GenerationStats:
+    businesses: int = 0
+    users: int = 0
+    customers: int = 0
+    debts: int = 0
+    items: int = 0
+    payments: int = 0
+    reminders: int = 0
+
+
+def generated_email(role, business_id, number=1):
+    """Login email of a generated user (salespeople are numbered from 1)."""
+    prefix = f"sales{number}" if role == "salesperson" else role
+    return f"{prefix}.b{business_id}@{EMAIL_DOMAIN}"
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+class _Ids:
+    """Next free primary keys, so child rows can point at parents without RETURNING."""
+
+    def __init__(self, session, models):
+        self.next = {
+            model: (session.execute(select(func.max(model.id))).scalar() or 0) + 1
+            for model in models
+        }
+
+    def take(self, model):
+        value = self.next[model]
+        self.next[model] += 1
+        return value
+
+
+def reset_sequences(session, models):
+    """Move Postgres id sequences past explicitly inserted ids."""
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    for model in models:
+        table = model.__tablename__
+        session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"GREATEST((SELECT MAX(id) FROM {table}), 1))"
+        ))
+
+
+def _business_rows(rng, ids, index, password_hash, salespeople, now):
+    """Owner, staff, business and finance settings of one tenant."""
+    business_id = ids.take(Business)
+    owner_id = ids.take(User)
+    tag = f"b{business_id}"
+    created_at = now - timedelta(days=HISTORY_DAYS + rng.randint(0, 60))
+
+    def user(user_id, name, role, email):
+        return {
+            "id": user_id, "name": name, "email": email, "password_hash": password_hash,
+            "phone": f"07{rng.randrange(10**8):08d}", "role": role, "created_at": created_at,
+            "is_verified": True, "business_id": business_id,
+        }
+
+    owner = user(owner_id, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", "owner", generated_email("owner", business_id))
+    staff = [user(ids.take(User), f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", "admin", generated_email("admin", business_id))]
+    staff += [
+        user(ids.take(User), f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", "salesperson", generated_email("salesperson", business_id, n))
+        for n in range(1, salespeople + 1)
+    ]
+    business = {
+        "id": business_id, "name": f"{rng.choice(LAST_NAMES)} {rng.choice(BUSINESS_KINDS)} {index + 1}",
+        "owner_id": owner_id, "phone": f"07{rng.randrange(10**8):08d}", "email": f"info.{tag}@{EMAIL_DOMAIN}",
+        "address": f"Plot {rng.randint(1, 999)}, Nairobi", "created_at": created_at,
+    }
+    settings = {
+        "business_id": business_id, "default_currency": "KES",
+        "reminder_method": _weighted(rng, (("email", 60), ("sms", 25), ("both", 15))),
+        "created_at": created_at, "updated_at": created_at, "updated_by": owner_id,
+    }
+    return owner, staff, business, settings
+
+
+def _customer_batch(rng, ids, business_id, staff_ids, debts_per_customer, first, count, phone_base, now):
+    """Rows of customers ``first`` .. ``first + count - 1`` of a business and everything they owe."""
+    rows = {Customer: [], Debt: [], Item: [], Payment: [], ChangeLog: []}
+
+    for number in range(first, first + count):
+        customer_id = ids.take(Customer)
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        joined = now - timedelta(days=rng.uniform(30, HISTORY_DAYS))
+        # Unique per business: 7919 is coprime with 10**8
+        phone = f"07{(phone_base + number * 7919) % 10**8:08d}"
+        email = f"{first_name}.{last_name}{number}@example.com".lower() if rng.random() < 0.7 else None
+        rows[Customer].append({
+            "id": customer_id, "customer_name": f"{first_name} {last_name}",
+            "phone": phone, "phone_norm": normalize_phone(phone),
+            "email": email, "email_norm": normalize_email(email),
+            "id_number": f"{rng.randrange(10**7, 10**8)}", "created_by": rng.choice(staff_ids),
+            "business_id": business_id, "created_at": joined, "updated_at": joined,
+        })
+
+        for _ in range(debts_per_customer):
+            debt_id = ids.take(Debt)
+            created_at = joined + timedelta(days=rng.uniform(0, max((now - joined).days, 1)))
+            due_date = created_at + timedelta(days=rng.choice(TERM_DAYS))
+            created_by = rng.choice(staff_ids)
+
+            total = 0.0
+            category = None
+            for _ in range(rng.choices((1, 2, 3, 4, 5), (30, 30, 20, 12, 8))[0]):
+                name, item_category, (low, high) = rng.choice(CATALOG)
+                price = float(rng.randrange(low, high + 1, 10))
+                quantity = rng.choices((1, 2, 3, 5, 10, 20), (35, 25, 15, 12, 8, 5))[0]
+                total += price * quantity
+                category = category or item_category
+                rows[Item].append({
+                    "id": ids.take(Item), "debt_id": debt_id, "name": name,
+                    "price": price, "category": item_category, "quantity": quantity,
+                })
+
+            settlement = _weighted(rng, SETTLEMENT_WEIGHTS)
+            if settlement == "paid":
+                target = total
+            elif settlement == "partial":
+                target = round(total * rng.uniform(0.1, 0.9), -1) or 10.0
+            else:
+                target = 0.0
+
+            paid = 0.0
+            payment_count = 0 if target == 0 else rng.choices((1, 2, 3), (50, 30, 20))[0]
+            last_payment = created_at
+            for n in range(payment_count):
+                amount = target - paid if n == payment_count - 1 else round((target - paid) * rng.uniform(0.2, 0.6), -1)
+                if amount <= 0:
+                    continue
+                last_payment = min(last_payment + timedelta(days=rng.uniform(0, 20)), now)
+                paid += amount
+                rows[Payment].append({
+                    "id": ids.take(Payment), "debt_id": debt_id, "amount": amount, "payment_date": last_payment,
+                    "method": _weighted(rng, PAYMENT_METHODS), "received_by": rng.choice(staff_ids),
+                })
+
+            # Reminders go out around the due date until the debt is settled
+            balance = total - paid
+            reminders = []
+            if balance > 0 and due_date - timedelta(days=3) <= now:
+                sent = due_date - timedelta(days=3)
+                while sent <= now and len(reminders) < 6:
+                    reminders.append(sent)
+                    sent += timedelta(days=rng.choice((1, 3, 7, 14)))
+            for sent in reminders:
+                rows[ChangeLog].append({
+                    "id": ids.take(ChangeLog), "entity_type": "Debt", "entity_id": debt_id, "action": "reminder",
+                    "changed_by": None, "business_id": business_id, "timestamp": sent,
+                    "details_format": DETAILS_EVENT, "entity_version": None,
+                    "details": {
+                        "channel": REMINDER_CHANNEL,
+                        "reminder_type": "before_due" if sent < due_date else "after_due",
+                        "status": "sent" if rng.random() < 0.95 else "failed",
+                        "balance": balance, "due_date": due_date.isoformat(),
+                    },
+                })
+
+            rows[Debt].append({
+                "id": debt_id, "customer_id": customer_id, "business_id": business_id, "total": total,
+                "due_date": due_date, "status": Debt.status_for(total, balance), "created_by": created_by,
+                "created_at": created_at, "updated_at": max(last_payment, created_at),
+                "last_reminder_sent": reminders[-1] if reminders else None, "reminder_count": len(reminders),
+                "category": category or "Uncategorized",
+            })
+    return rows
+
+
+def _stamp_change_seqs(session, business_id, rows):
+    """Core inserts skip the flush hook: reserve and stamp sequence numbers here."""
+    synced = rows[Customer] + rows[Debt] + rows[Item] + rows[Payment]
+    seq = allocate_change_seq(session, business_id, len(synced)) - len(synced)
+    for row in synced:
+        seq += 1
+        row["change_seq"] = seq
+
+
+def generate(session, businesses, customers, debts, seed=0, salespeople=3, batch_size=1000, as_of=None, progress=None):
+    """
+    Insert ``businesses`` tenants with ``customers`` customers of ``debts``
+    debts each. ``batch_size`` customers (with their debts) are written per
+    transaction. Returns GenerationStats.
+    """
+    now = as_of or datetime.utcnow()
+    password_hash = generate_password_hash(GENERATED_PASSWORD)
+    models = (User, Business, Customer, Debt, Item, Payment, ChangeLog)
+    ids = _Ids(session, models)
+    stats = GenerationStats()
+
+    for index in range(businesses):
+        # One stream per business: a tenant's rows don't depend on the ones before it
+        rng = random.Random(f"{seed}:{index}")
+        owner, staff, business, settings = _business_rows(rng, ids, index, password_hash, salespeople, now)
+        business_id = business["id"]
+
+        # Owner first (businesses.owner_id), business, then its users
+        session.execute(insert(User), [{**owner, "business_id": None}])
+        session.execute(insert(Business), [business])
+        session.execute(insert(User), staff)
+        session.execute(update(User.__table__).where(User.__table__.c.id == owner["id"]).values(business_id=business_id))
+        session.execute(insert(FinanceSettings), [settings])
+        session.commit()
+        stats.businesses += 1
+        stats.users += 1 + len(staff)
+
+        staff_ids = [user["id"] for user in staff]
+        phone_base = rng.randrange(10**8)
+        for first in range(0, customers, batch_size):
+            rows = _customer_batch(rng, ids, business_id, staff_ids, debts, first, min(batch_size, customers - first), phone_base, now)
+            _stamp_change_seqs(session, business_id, rows)
+            for model in (Customer, Debt, Item, Payment, ChangeLog):
+                if rows[model]:
+                    session.execute(insert(model), rows[model])
+            refresh_customer_balances(session, [row["id"] for row in rows[Customer]])
+            refresh_customer_documents(session, [row["id"] for row in rows[Customer]])
+            session.commit()
+
+            stats.customers += len(rows[Customer])
+            stats.debts += len(rows[Debt])
+            stats.items += len(rows[Item])
+            stats.payments += len(rows[Payment])
+            stats.reminders += len(rows[ChangeLog])
+            if progress:
+                progress(business_id, first + len(rows[Customer]), stats)
+
+    reset_sequences(session, models)
+    session.commit()
+    logger.info("Generated %s", stats)
+    return stats
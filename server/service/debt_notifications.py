@@ -71,7 +71,10 @@ def send_debt_notification(debt, kind: str = "receipt", via_email: bool = True,
 
     
     if via_sms and customer.phone:
-        # future  implimentation 
-        logger.info(f"[SMS placeholder] Debt {debt.id}: would send SMS to {customer.phone} [{kind}]")
+        try:
+            send_sms(customer.phone, f"{subject}. Balance: {details['balance']}")
+            logger.info(f"Debt {debt.id}: SMS sent to {customer.phone} [{kind}]")
+        except Exception as e:
+            logger.error(f"Debt {debt.id}: failed to send SMS [{kind}] -> {e}")
 
     return True
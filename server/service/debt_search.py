@@ -0,0 +1,236 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import DateTime, Text, and_, case, func, literal, literal_column, select, text
+from server.models import Customer, Debt, DebtSearchDocument, Item
+from server.service.customer_search import SearchQuery
+from server.utils.analytics import string_agg
+from server.utils.derived_tables import id_chunks, refresh_in_chunks, sqlite_table_exists
+from server.utils.phone import DEFAULT_COUNTRY_CODE
+from server.utils.upsert import dialect_insert
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+# "INV-00042", "inv42": the invoice number of debt 42
+_INVOICE = re.compile(r"\binv-?(\d+)\b", re.IGNORECASE)
+# Tsquery and FTS5 terms are built from these only
+_TERM = re.compile(r"[^\W_]+", re.UNICODE)
+
+# bm25 column weights of debt_search_fts: customer, items, categories
+FTS_WEIGHTS = (4.0, 2.0, 1.0)
+
+
+def _space():
+    return literal(" ", Text)
+
+
+def _text(*parts):
+    """``parts`` joined with spaces, NULLs as empty strings."""
+    joined = func.coalesce(parts[0], "")
+    for part in parts[1:]:
+        joined = joined + _space() + func.coalesce(part, "")
+    return joined
+
+
+def _phone_terms(customers):
+    """
+    The normalized number without its "+" and, for local numbers, the
+    national number too, so "254712..." and "0712..." queries both match.
+    Customers left without a normalized number keep the raw one.
+    """
+    prefix = f"+{DEFAULT_COUNTRY_CODE}"
+    digits = func.replace(customers.c.phone_norm, "+", "")
+    return case(
+        (customers.c.phone_norm.startswith(prefix),
+         digits + _space() + func.substr(customers.c.phone_norm, len(prefix) + 1)),
+        (customers.c.phone_norm.isnot(None), digits),
+        else_=func.coalesce(customers.c.phone, ""),
+    )
+
+
+def document_rows(debt_filter):
+    """
+    SELECT of one ``debt_search_documents`` row per debt matched by
+    ``debt_filter(debt_id_column)``, built from the debt, its customer and
+    its items.
+    """
+    debts = Debt.__table__
+    customers = Customer.__table__
+    items = (
+        select(
+            Item.debt_id,
+            string_agg(Item.name, _space()).label("names"),
+            string_agg(Item.category, _space()).label("categories"),
+        )
+        .where(debt_filter(Item.debt_id))
+        .group_by(Item.debt_id)
+        .subquery()
+    )
+    return (
+        select(
+            debts.c.id.label("debt_id"),
+            debts.c.business_id,
+            debts.c.customer_id,
+            _text(customers.c.customer_name, customers.c.id_number, _phone_terms(customers)).label("customer_text"),
+            func.coalesce(items.c.names, "").label("items_text"),
+            _text(debts.c.category, items.c.categories).label("categories_text"),
+            literal(datetime.utcnow(), DateTime).label("updated_at"),
+        )
+        .select_from(debts)
+        .join(customers, customers.c.id == debts.c.customer_id)
+        .outerjoin(items, items.c.debt_id == debts.c.id)
+        .where(debt_filter(debts.c.id))
+    )
+
+
+def write_documents(session, rows):
+    """Upsert the rows of a ``document_rows`` select into debt_search_documents."""
+    table = DebtSearchDocument.__table__
+    columns = [column.name for column in rows.selected_columns]
+    stmt = dialect_insert(session, table).from_select(columns, rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.debt_id],
+        set_={name: stmt.excluded[name] for name in columns if name != "debt_id"},
+    )
+    session.execute(stmt)
+
+
+def _refresh(session, debt_filter, chunks):
+    refresh_in_chunks(
+        session, DebtSearchDocument,
+        lambda chunk: write_documents(session, document_rows(lambda column: debt_filter(column, chunk))),
+        chunks,
+    )
+
+
+def refresh_debt_documents(session, debt_ids):
+    """
+    Rewrite the search documents of the given debts from the debt, its
+    customer and its items, one INSERT ... SELECT ... ON CONFLICT per
+    chunk, in the caller's transaction. The search indexes follow the
+    table (GIN on Postgres, triggers into FTS5 on SQLite).
+    """
+    chunks = id_chunks(debt_ids)
+    if chunks:
+        _refresh(session, lambda column, chunk: column.in_(chunk), chunks)
+
+
+def refresh_customer_documents(session, customer_ids):
+    """``refresh_debt_documents`` for every debt of the given customers."""
+    chunks = id_chunks(customer_ids)
+    if chunks:
+        owned = Debt.__table__
+        _refresh(
+            session,
+            lambda column, chunk: column.in_(select(owned.c.id).where(owned.c.customer_id.in_(chunk))),
+            chunks,
+        )
+
+
+# -- search -----------------------------------------------------------------
+
+class DebtQuery:
+    """A search string split into invoice numbers and text terms."""
+
+    def __init__(self, raw):
+        self.raw = (raw or "").strip()
+        self.debt_ids = [int(number) for number in _INVOICE.findall(self.raw)]
+        rest = SearchQuery(_INVOICE.sub(" ", self.raw))
+        self.phone = rest.phone
+        self.terms = [] if rest.phone else [term for word in rest.words for term in _TERM.findall(word)]
+
+    def __bool__(self):
+        return bool(self.debt_ids or self.phone or self.terms)
+
+    @property
+    def prefixes(self):
+        return [self.phone] if self.phone else self.terms
+
+
+@dataclass
+class SearchPage:
+    total: int
+    # [(debt_id, score)], best first
+    matches: list
+
+
+# Same expression as the Postgres index in migration f4c8a2d6e913
+def _pg_document_vector():
+    def weighted(column, weight):
+        return func.setweight(func.to_tsvector(literal_column("'simple'"), column), literal_column(f"'{weight}'"))
+
+    return (
+        weighted(DebtSearchDocument.customer_text, "A")
+        .op("||")(weighted(DebtSearchDocument.items_text, "B"))
+        .op("||")(weighted(DebtSearchDocument.categories_text, "C"))
+    )
+
+
+def _fts_scores(match):
+    weights = ", ".join(str(weight) for weight in FTS_WEIGHTS)
+    # bm25 is lower for better matches
+    return (
+        select(literal_column("rowid").label("debt_id"), literal_column(f"-bm25(debt_search_fts, {weights})").label("score"))
+        .select_from(text("debt_search_fts"))
+        .where(text("debt_search_fts MATCH :match").bindparams(match=match))
+        .subquery()
+    )
+
+
+def _text_filters(session, query):
+    """``(filters, score, joined subquery or None)`` for the query's text terms."""
+    if not query.prefixes:
+        return [], literal_column("1.0"), None
+
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{prefix}:*" for prefix in query.prefixes))
+        vector = _pg_document_vector()
+        return [vector.op("@@")(tsquery)], func.ts_rank(vector, tsquery), None
+
+    if dialect == "sqlite" and sqlite_table_exists(session, "debt_search_fts"):
+        scores = _fts_scores(" AND ".join(f'"{prefix}"*' for prefix in query.prefixes))
+        return [], scores.c.score, scores
+
+    document = func.lower(_text(
+        DebtSearchDocument.customer_text, DebtSearchDocument.items_text, DebtSearchDocument.categories_text
+    ))
+    return [document.contains(prefix, autoescape=True) for prefix in query.prefixes], literal_column("1.0"), None
+
+
+def search_debts(session, business_ids, raw_query, page=1, per_page=DEFAULT_PER_PAGE, created_by=None):
+    """
+    One page of the debts of ``business_ids`` matching ``raw_query``, as a
+    ``SearchPage``: every word must prefix a word of the customer's name,
+    id number or phone number, an item name or a category ("cement john"),
+    number-like queries match phone numbers and ``INV-00042`` picks the
+    invoice. Customer matches rank above item matches above category
+    matches, then newest debt first. ``created_by`` limits the debts to
+    one salesperson's.
+    """
+    query = DebtQuery(raw_query)
+    if not query or not business_ids:
+        return SearchPage(total=0, matches=[])
+
+    filters, score, scores = _text_filters(session, query)
+    filters.append(DebtSearchDocument.business_id.in_(business_ids))
+    if query.debt_ids:
+        filters.append(DebtSearchDocument.debt_id.in_(query.debt_ids))
+    if created_by is not None:
+        filters.append(Debt.created_by == created_by)
+
+    stmt = select(DebtSearchDocument.debt_id, score.label("score")).select_from(DebtSearchDocument)
+    if scores is not None:
+        stmt = stmt.join(scores, scores.c.debt_id == DebtSearchDocument.debt_id)
+    stmt = stmt.join(Debt, Debt.id == DebtSearchDocument.debt_id).where(and_(*filters))
+
+    total = session.execute(select(func.count()).select_from(stmt.subquery())).scalar()
+    if not total:
+        return SearchPage(total=0, matches=[])
+    rows = session.execute(
+        stmt.order_by(score.desc(), Debt.created_at.desc(), Debt.id.desc())
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+    ).all()
+    return SearchPage(total=total, matches=[(row.debt_id, float(row.score or 0)) for row in rows])
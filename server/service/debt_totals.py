@@ -0,0 +1,114 @@
+from datetime import datetime
+from sqlalchemy import case, func, select, update
+from server.models import Debt, Item, Payment
+from server.service.customer_balances import refresh_debt_customer_balances
+from server.utils.change_tracking import allocate_change_seq
+from server.utils.derived_tables import id_chunks
+
+
+def status_expr(total, paid):
+    """SQL twin of ``Debt.status_for(total, total - paid)``."""
+    return case(
+        (total - paid <= 0, "paid"),
+        (paid == 0, "unpaid"),
+        else_="partial",
+    )
+
+
+def debt_totals(debt_filter):
+    """
+    Subquery of ``(id, business_id, total, status, paid, stored_total,
+    stored_status)`` for the debts matched by ``debt_filter(debt_id_column)``,
+    with total and status recomputed from items and payments. Each
+    aggregate reads only the matched debts' rows.
+    """
+    table = Debt.__table__
+    items = (
+        select(Item.debt_id, func.sum(Item.price * Item.quantity).label("total"))
+        .where(debt_filter(Item.debt_id))
+        .group_by(Item.debt_id)
+        .subquery()
+    )
+    payments = (
+        select(Payment.debt_id, func.sum(Payment.amount).label("paid"))
+        .where(debt_filter(Payment.debt_id))
+        .group_by(Payment.debt_id)
+        .subquery()
+    )
+    total = func.coalesce(items.c.total, 0)
+    paid = func.coalesce(payments.c.paid, 0)
+    return (
+        select(
+            table.c.id,
+            table.c.business_id,
+            total.label("total"),
+            status_expr(total, paid).label("status"),
+            paid.label("paid"),
+            table.c.total.label("stored_total"),
+            table.c.status.label("stored_status"),
+        )
+        .select_from(table)
+        .outerjoin(items, items.c.debt_id == table.c.id)
+        .outerjoin(payments, payments.c.debt_id == table.c.id)
+        .where(debt_filter(table.c.id))
+        .subquery()
+    )
+
+
+def drifted(totals):
+    """Rows of a ``debt_totals`` subquery whose stored values are stale."""
+    return (totals.c.stored_total != totals.c.total) | totals.c.stored_status.is_distinct_from(totals.c.status)
+
+
+def apply_totals(session, totals, business_id, seq, now=None):
+    """
+    UPDATE debts SET total, status FROM ``totals`` for the drifted rows
+    of one business, stamping them with ``seq``. Returns the row count.
+    """
+    table = Debt.__table__
+    result = session.execute(
+        update(table)
+        .where(table.c.id == totals.c.id, totals.c.business_id == business_id, drifted(totals))
+        .values(total=totals.c.total, status=totals.c.status, change_seq=seq, updated_at=now or datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def expire_debts(session, debt_ids):
+    """Make loaded Debt instances re-read the columns updated behind the ORM."""
+    for debt_id in debt_ids:
+        debt = session.identity_map.get(session.identity_key(Debt, debt_id))
+        if debt is not None:
+            session.expire(debt, ["total", "status", "change_seq", "updated_at"])
+
+
+def recompute_debts(session, debt_ids):
+    """
+    Recompute the stored total (from items) and status (from items and
+    payments) of the given debts with one UPDATE ... FROM per business,
+    stamping changed rows with a fresh change_seq, then rewrite the
+    owning customers' customer_balances rows in the same transaction.
+    Pending ORM changes are flushed first and the debts are expired
+    afterwards, so loaded instances read the new values.
+    Returns the number of debts whose total or status changed.
+    """
+    chunks = id_chunks(debt_ids)
+    if not chunks:
+        return 0
+    session.flush()
+
+    changed = 0
+    for chunk in chunks:
+        totals = debt_totals(lambda column: column.in_(chunk))
+        stale = session.execute(select(totals.c.business_id).where(drifted(totals)).distinct()).scalars().all()
+        for business_id in stale:
+            changed += apply_totals(session, totals, business_id, allocate_change_seq(session, business_id))
+    debt_ids = [debt_id for chunk in chunks for debt_id in chunk]
+    refresh_debt_customer_balances(session, debt_ids)
+    expire_debts(session, debt_ids)
+    return changed
+
+
+def recompute_debt(session, debt):
+    return recompute_debts(session, [debt.id])
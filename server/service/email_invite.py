@@ -1,15 +1,13 @@
 import os
 import logging
-import resend
+from server.service.notifications.email_sender import send_email
 
 logger = logging.getLogger(__name__)
 
 
-resend.api_key = os.getenv("RESEND_API_KEY")
-
 def send_invitation_email(user_email, user_name, business_name, role, invite_url):
     """
-    Send an invitation email using Resend
+    Send an invitation email
     """
     sender = os.getenv("MAIL_DEFAULT_SENDER")
 
@@ -38,14 +36,14 @@ def send_invitation_email(user_email, user_name, business_name, role, invite_url
     """
 
     try:
-        response = resend.Emails.send({
-            "from": sender,
-            "to": user_email,
-            "subject": subject,
-            "html": html_content,
-        })
+        response = send_email(
+            to=user_email,
+            subject=subject,
+            html=html_content,
+            sender=sender,
+        )
         logger.info(f"Invitation email sent to {user_email}. Response: {response}")
         return True
     except Exception as e:
-        logger.error(f"Failed to send invitation email to {user_email}. Resend error: {e}")
+        logger.error(f"Failed to send invitation email to {user_email}. Error: {e}")
         return False
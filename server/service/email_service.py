@@ -1,15 +1,13 @@
 import os
 import logging
-import resend
+from server.service.notifications.email_sender import send_email
 
 logger = logging.getLogger(__name__)
 
-# Set the API key once (loads from your .env / Render env vars)
-resend.api_key = os.getenv("RESEND_API_KEY")
 
 def send_verification_email(user, otp_code):
     """
-    Send a verification email using Resend
+    Send a verification email
     """
     sender = os.getenv("MAIL_DEFAULT_SENDER")
 
@@ -37,12 +35,12 @@ def send_verification_email(user, otp_code):
         print(f"[DEBUG] About to send email to: {user.email!r}, name: {user.name!r}")
         logger.info(f"[DEBUG] About to send email to: {user.email!r}, name: {user.name!r}")
 
-        response = resend.Emails.send({
-            "from": sender,
-            "to": user.email,
-            "subject": subject,
-            "html": html_content,
-        })
+        response = send_email(
+            to=user.email,
+            subject=subject,
+            html=html_content,
+            sender=sender,
+        )
         logger.info(f"Verification email sent to {user.email}. Response: {response}")
     except Exception as e:
-        logger.error(f"Failed to send verification email to {user.email}. Resend error: {e}")
+        logger.error(f"Failed to send verification email to {user.email}. Error: {e}")
@@ -3,13 +3,12 @@ import os
 import base64
 import logging
 from typing import IO, Dict, List, Optional, Union
-import resend
+from server.service.notifications.transports import get_transport
 
-# sends the email using resend 
+# sends the email through the configured notification transport
 
 logger = logging.getLogger(__name__)
 
-resend.api_key = os.getenv("RESEND_API_KEY")
 DEFAULT_SENDER = os.getenv("MAIL_DEFAULT_SENDER", "no-reply@example.com")
 
 def _encode_attachment(filename: str, content: Union[bytes, IO[bytes]], mime: str = "application/pdf") -> Dict:
@@ -43,7 +42,7 @@ def send_email(
     if attachments:
         payload["attachments"] = attachments
     logger.info(f"Sending email to {to} with subject '{subject}'")
-    return resend.Emails.send(payload)
+    return get_transport().send_email(payload)
 
 def make_pdf_attachment(filename: str, pdf_buffer: IO[bytes]) -> Dict:
     return _encode_attachment(filename=filename, content=pdf_buffer, mime="application/pdf")
@@ -1,7 +1,9 @@
 import logging
+from server.service.notifications.transports import get_transport
 
 logger = logging.getLogger(__name__)
 
 def send_sms(phone: str, message: str) -> bool:
-    logger.info(f"[SMS placeholder] Would send to {phone}: {message}")
+    logger.info(f"Sending SMS to {phone}")
+    get_transport().send_sms(phone, message)
     return True
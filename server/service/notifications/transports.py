@@ -0,0 +1,194 @@
+# server/service/notifications/transports.py
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+# Where outgoing email and SMS go. Selected with NOTIFICATION_TRANSPORT
+# (app config or environment): resend, capture, spool or fake.
+DEFAULT_TRANSPORT = "resend"
+
+
+class NotificationTransport(ABC):
+    """Delivers email payloads (Resend's format) and SMS messages."""
+
+    name = "base"
+
+    @abstractmethod
+    def send_email(self, payload: Dict) -> Dict:
+        ...
+
+    @abstractmethod
+    def send_sms(self, phone: str, message: str) -> Dict:
+        ...
+
+
+class ResendTransport(NotificationTransport):
+    """Email through the Resend API; SMS has no provider yet and is only logged."""
+
+    name = "resend"
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key or os.getenv("RESEND_API_KEY")
+
+    def send_email(self, payload: Dict) -> Dict:
+        import resend
+
+        resend.api_key = self.api_key
+        return resend.Emails.send(payload)
+
+    def send_sms(self, phone: str, message: str) -> Dict:
+        logger.info(f"[SMS placeholder] Would send to {phone}: {message}")
+        return {"id": None}
+
+
+class CaptureTransport(NotificationTransport):
+    """Keeps every message in memory; inspect ``emails`` and ``sms``."""
+
+    name = "capture"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.emails: List[Dict] = []
+        self.sms: List[Dict] = []
+
+    def _keep(self, box: List[Dict], message: Dict) -> Dict:
+        with self.lock:
+            box.append(message)
+            return {"id": f"{self.name}-{len(box)}"}
+
+    def send_email(self, payload: Dict) -> Dict:
+        return self._keep(self.emails, payload)
+
+    def send_sms(self, phone: str, message: str) -> Dict:
+        return self._keep(self.sms, {"to": phone, "message": message})
+
+    def clear(self):
+        with self.lock:
+            self.emails.clear()
+            self.sms.clear()
+
+
+class FileSpoolTransport(NotificationTransport):
+    """Writes each message as a JSON file under ``directory``/email or ``directory``/sms."""
+
+    name = "spool"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _write(self, kind: str, message: Dict) -> Dict:
+        message_id = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        folder = os.path.join(self.directory, kind)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"{message_id}.json"), "w") as f:
+            json.dump(message, f, indent=2, default=str)
+        return {"id": message_id}
+
+    def send_email(self, payload: Dict) -> Dict:
+        return self._write("email", payload)
+
+    def send_sms(self, phone: str, message: str) -> Dict:
+        return self._write("sms", {"to": phone, "message": message})
+
+
+class FakeTransport(CaptureTransport):
+    """
+    Stands in for a remote provider: waits ``latency_ms`` (plus up to
+    ``jitter_ms``) per message and fails ``failure_rate`` of them. Only
+    counts messages unless ``keep`` is set, so long runs stay flat in memory.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, failure_rate: float = 0,
+                 keep: bool = False, seed: Optional[int] = None):
+        super().__init__()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.keep = keep
+        self.rng = random.Random(seed)
+        self.sent = 0
+        self.failed = 0
+
+    def _deliver(self, box: List[Dict], message: Dict) -> Dict:
+        with self.lock:
+            delay = self.latency_ms + self.rng.uniform(0, self.jitter_ms)
+            fails = self.rng.random() < self.failure_rate
+        if delay:
+            time.sleep(delay / 1000)
+        with self.lock:
+            if fails:
+                self.failed += 1
+            else:
+                self.sent += 1
+        if fails:
+            raise ConnectionError("fake transport: simulated delivery failure")
+        if self.keep:
+            return self._keep(box, message)
+        return {"id": f"fake-{uuid.uuid4().hex[:12]}"}
+
+    def send_email(self, payload: Dict) -> Dict:
+        return self._deliver(self.emails, payload)
+
+    def send_sms(self, phone: str, message: str) -> Dict:
+        return self._deliver(self.sms, {"to": phone, "message": message})
+
+
+def _setting(config, key, default=None):
+    value = config.get(key) if config is not None else None
+    return value if value is not None else os.getenv(key, default)
+
+
+def build_transport(config=None) -> NotificationTransport:
+    """Transport named by NOTIFICATION_TRANSPORT in ``config`` or the environment."""
+    name = (_setting(config, "NOTIFICATION_TRANSPORT", DEFAULT_TRANSPORT) or DEFAULT_TRANSPORT).lower()
+    if name == "resend":
+        return ResendTransport()
+    if name == "capture":
+        return CaptureTransport()
+    if name == "spool":
+        return FileSpoolTransport(_setting(config, "NOTIFICATION_SPOOL_DIR", "instance/outbox"))
+    if name == "fake":
+        return FakeTransport(
+            latency_ms=float(_setting(config, "NOTIFICATION_FAKE_LATENCY_MS", 0)),
+            jitter_ms=float(_setting(config, "NOTIFICATION_FAKE_JITTER_MS", 0)),
+            failure_rate=float(_setting(config, "NOTIFICATION_FAKE_FAILURE_RATE", 0)),
+        )
+    raise ValueError(f"Unknown NOTIFICATION_TRANSPORT {name!r}")
+
+
+_fallback_transport = None
+
+
+def init_notifications(app):
+    app.extensions["notification_transport"] = build_transport(app.config)
+    app.logger.info(f"Notification transport: {app.extensions['notification_transport'].name}")
+
+
+def get_transport() -> NotificationTransport:
+    """The app's transport, or one built from the environment outside an app."""
+    global _fallback_transport
+    if has_app_context() and "notification_transport" in current_app.extensions:
+        return current_app.extensions["notification_transport"]
+    if _fallback_transport is None:
+        _fallback_transport = build_transport()
+    return _fallback_transport
+
+
+def set_transport(app, transport: NotificationTransport) -> NotificationTransport:
+    """Swap the app's transport (tests, benchmarks); returns the previous one."""
+    previous = app.extensions.get("notification_transport")
+    app.extensions["notification_transport"] = transport
+    return previous
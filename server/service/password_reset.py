@@ -1,11 +1,9 @@
 import os
 import logging
-import resend
+from server.service.notifications.email_sender import send_email
 
 logger = logging.getLogger(__name__)
 
-# Configure Resend API key once
-resend.api_key = os.getenv("RESEND_API_KEY")
 
 def send_password_reset_email(email, name, reset_token):
     sender = os.getenv("MAIL_DEFAULT_SENDER")
@@ -29,14 +27,14 @@ def send_password_reset_email(email, name, reset_token):
     """
 
     try:
-        response = resend.Emails.send({
-            "from": sender,
-            "to": email,
-            "subject": subject,
-            "html": html_content,
-        })
+        response = send_email(
+            to=email,
+            subject=subject,
+            html=html_content,
+            sender=sender,
+        )
         logger.info(f"Password reset email sent to {email}. Response: {response}")
         return True
     except Exception as e:
-        logger.error(f"Failed to send password reset email to {email}. Resend error: {e}")
+        logger.error(f"Failed to send password reset email to {email}. Error: {e}")
         return False
@@ -0,0 +1,179 @@
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import func, select
+from server.models import Customer, Debt
+from server.service.customer_balances import drifted_balances, refresh_customer_balances, refresh_debt_customer_balances
+from server.service.debt_totals import apply_totals, debt_totals, drifted
+from server.utils.change_tracking import allocate_change_seq
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+MAX_SAMPLES = 20
+
+
+@dataclass
+class ReconciliationReport:
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    dry_run: bool = False
+    scanned: int = 0
+    drifted: int = 0
+    repaired: int = 0
+    # Sum of |stored total - items total| over drifted debts
+    total_drift: float = 0.0
+    status_changes: Counter = field(default_factory=Counter)
+    businesses: Counter = field(default_factory=Counter)
+    samples: List[Dict] = field(default_factory=list)
+    completed: bool = True
+    # First debt id not scanned when the time budget ran out
+    resume_from: Optional[int] = None
+    # customer_balances rows checked against their debts and payments
+    balances_scanned: int = 0
+    balances_drifted: int = 0
+    balance_samples: List[int] = field(default_factory=list)
+    balances_completed: bool = True
+    # First customer id not checked when the balances time budget ran out
+    balances_resume_from: Optional[int] = None
+
+    def as_dict(self):
+        return {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "dry_run": self.dry_run,
+            "scanned": self.scanned,
+            "drifted": self.drifted,
+            "repaired": self.repaired,
+            "total_drift": round(self.total_drift, 2),
+            "status_changes": dict(self.status_changes),
+            "businesses": {str(k): v for k, v in self.businesses.items()},
+            "samples": self.samples,
+            "completed": self.completed,
+            "resume_from": self.resume_from,
+            "balances_scanned": self.balances_scanned,
+            "balances_drifted": self.balances_drifted,
+            "balance_samples": self.balance_samples,
+            "balances_completed": self.balances_completed,
+            "balances_resume_from": self.balances_resume_from,
+        }
+
+
+def reconcile_debts(session, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, business_id=None,
+                    start_id=None, max_seconds=None, progress=None):
+    """
+    Compare every debt's stored total and status with its items and
+    payments, one id range of ``batch_size`` at a time, and repair the
+    drifted ones with one UPDATE ... FROM per business and range, along
+    with their customers' customer_balances rows. Each range is committed
+    on its own, so memory and lock time stay bounded by the batch size. With ``max_seconds`` the scan stops between ranges
+    and ``resume_from`` tells where to pick up. Every customer's
+    customer_balances row is checked by ``reconcile_balances``, on its own
+    budget.
+    """
+    report = ReconciliationReport(dry_run=dry_run)
+    table = Debt.__table__
+    scope = [table.c.business_id == business_id] if business_id is not None else []
+    low, high = session.execute(select(func.min(table.c.id), func.max(table.c.id)).where(*scope)).one()
+    if low is None:
+        report.finished_at = datetime.utcnow()
+        return report
+    if start_id is not None:
+        low = max(low, start_id)
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+
+    while low <= high:
+        upper = low + batch_size - 1
+        totals = debt_totals(lambda column: column.between(low, upper))
+        in_scope = [totals.c.business_id == business_id] if business_id is not None else []
+
+        report.scanned += session.execute(
+            select(func.count(table.c.id)).where(table.c.id.between(low, upper), *scope)
+        ).scalar()
+        rows = session.execute(select(totals).where(drifted(totals), *in_scope)).all()
+        for row in rows:
+            report.drifted += 1
+            report.total_drift += abs((row.stored_total or 0) - row.total)
+            report.businesses[row.business_id] += 1
+            if row.stored_status != row.status:
+                report.status_changes[f"{row.stored_status}->{row.status}"] += 1
+            if len(report.samples) < MAX_SAMPLES:
+                report.samples.append({
+                    "debt_id": row.id,
+                    "business_id": row.business_id,
+                    "stored_total": row.stored_total,
+                    "total": row.total,
+                    "stored_status": row.stored_status,
+                    "status": row.status,
+                })
+
+        if rows and not dry_run:
+            for bid in sorted({row.business_id for row in rows}):
+                report.repaired += apply_totals(session, totals, bid, allocate_change_seq(session, bid))
+            refresh_debt_customer_balances(session, [row.id for row in rows])
+            session.commit()
+        else:
+            session.rollback()  # end the read transaction between ranges
+
+        if progress:
+            progress(upper, report)
+        low = upper + 1
+        # Checked after a range, so every run moves the scan forward
+        if low <= high and deadline and time.monotonic() > deadline:
+            report.completed = False
+            report.resume_from = low
+            break
+
+    report.finished_at = datetime.utcnow()
+    logger.info(
+        f"Debt reconciliation: {report.scanned} scanned, {report.drifted} drifted, "
+        f"{report.repaired} repaired{' (dry run)' if dry_run else ''}"
+    )
+    return report
+
+
+def reconcile_balances(session, report, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, business_id=None,
+                       start_id=None, max_seconds=None):
+    """
+    Compare every customer's customer_balances row with the live aggregate
+    of its debts and payments, one customer id range at a time, and
+    rewrite the drifted ones (a debt moved to another customer, a write
+    that skipped the refresh). Counts go into ``report``. With
+    ``max_seconds`` the scan stops between ranges and
+    ``balances_resume_from`` tells where to pick up.
+    """
+    table = Customer.__table__
+    scope = [table.c.business_id == business_id] if business_id is not None else []
+    low, high = session.execute(select(func.min(table.c.id), func.max(table.c.id)).where(*scope)).one()
+    if low is not None and start_id is not None:
+        low = max(low, start_id)
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    while low is not None and low <= high:
+        upper = low + batch_size - 1
+        in_range = [table.c.id.between(low, upper), *scope]
+        report.balances_scanned += session.execute(select(func.count(table.c.id)).where(*in_range)).scalar()
+        customer_ids = session.execute(
+            drifted_balances(lambda column: column.in_(select(table.c.id).where(*in_range)))
+        ).scalars().all()
+        report.balances_drifted += len(customer_ids)
+        report.balance_samples.extend(customer_ids[:MAX_SAMPLES - len(report.balance_samples)])
+        if customer_ids and not dry_run:
+            refresh_customer_balances(session, customer_ids)
+            session.commit()
+        else:
+            session.rollback()
+        low = upper + 1
+        if low <= high and deadline and time.monotonic() > deadline:
+            report.balances_completed = False
+            report.balances_resume_from = low
+            break
+
+    report.finished_at = datetime.utcnow()
+    logger.info(
+        f"Customer balance reconciliation: {report.balances_scanned} scanned, "
+        f"{report.balances_drifted} drifted{' (dry run)' if dry_run else ''}"
+    )
+    return report
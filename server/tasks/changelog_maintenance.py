@@ -0,0 +1,22 @@
+import logging
+from server.extension import db
+from server.service.changelog_storage import apply_retention, ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+
+def run_changelog_maintenance(app):
+    """Keep partitions ahead of time and archive changelogs past retention."""
+    with app.app_context():
+        # A failing partition step must not hold back retention
+        try:
+            ensure_partitions(db.session)
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Error creating changelog partitions: {e}", exc_info=True)
+            db.session.rollback()
+        try:
+            apply_retention(db.session)
+        except Exception as e:
+            logger.error(f"Error applying changelog retention: {e}", exc_info=True)
+            db.session.rollback()
@@ -5,15 +5,17 @@ from server.extension import db
 from server.models import Debt, Customer, Business, FinanceSettings
 from server.service.debt_notifications import send_debt_notification
 from server.utils.reminders import should_send_today_qexpr, log_reminder
+from server.utils.change_logger import queued_changelog
+from server.utils.analytics import days_between
 
 logger = logging.getLogger(__name__)
 
 
 def process_payment_reminders():
     """Run for ALL businesses on schedule."""
-    from server import create_app  
+    from server.app import create_app
     app = create_app()
-    with app.app_context():
+    with app.app_context(), queued_changelog(app):
         try:
             businesses = Business.query.join(FinanceSettings).all()
             for business in businesses:
@@ -80,7 +82,8 @@ def _process_after_due(business, settings, actor_user_id=None):
     window_start = now - timedelta(days=settings.reminder_after_days)
 
     debts = (
-        Debt.query.join(Customer)
+        db.session.query(Debt, days_between(now, Debt.due_date))
+        .join(Customer)
         .filter(
             Customer.business_id == business.id,
             Debt.status.in_(["unpaid", "partial"]),
@@ -92,12 +95,11 @@ def _process_after_due(business, settings, actor_user_id=None):
         .all()
     )
 
-    for debt in debts:
+    for debt, days_overdue in debts:
         if not debt.customer or not debt.customer.email:
             continue
 
-      
-        days_overdue = (now - debt.due_date).days
+        days_overdue = int(days_overdue)
         late_fee_amount = 0
         if settings.late_fee_type != "none" and days_overdue > settings.grace_period_days:
             if settings.late_fee_type == "percentage":
@@ -0,0 +1,61 @@
+import logging
+from server.extension import db
+from server.models import JobCursor
+from server.service.reconciliation import ReconciliationReport, reconcile_balances, reconcile_debts
+
+logger = logging.getLogger(__name__)
+
+# Time budgets per night; a scan that runs out resumes from where it
+# stopped the next night and starts over once it has reached the end
+RECONCILIATION_MAX_SECONDS = 30 * 60
+BALANCE_RECONCILIATION_MAX_SECONDS = 15 * 60
+
+DEBT_CURSOR = "debt_reconciliation"
+BALANCE_CURSOR = "balance_reconciliation"
+
+
+def read_cursor(session, name):
+    cursor = session.get(JobCursor, name)
+    return cursor.position if cursor else None
+
+
+def write_cursor(session, name, position):
+    cursor = session.get(JobCursor, name)
+    if cursor is None:
+        cursor = JobCursor(name=name)
+        session.add(cursor)
+    cursor.position = position
+    session.commit()
+
+
+def run_debt_reconciliation(app):
+    """Repair debts and customer balances that drifted from their items and payments."""
+    with app.app_context():
+        try:
+            report = reconcile_debts(
+                db.session, start_id=read_cursor(db.session, DEBT_CURSOR), max_seconds=RECONCILIATION_MAX_SECONDS
+            )
+            write_cursor(db.session, DEBT_CURSOR, report.resume_from)
+            if report.drifted:
+                logger.warning(f"Debt reconciliation repaired drift: {report.as_dict()}")
+            if not report.completed:
+                logger.warning(f"Debt reconciliation stopped at debt {report.resume_from} (time budget)")
+        except Exception as e:
+            logger.error(f"Error during debt reconciliation: {e}", exc_info=True)
+            db.session.rollback()
+
+        try:
+            report = reconcile_balances(
+                db.session, ReconciliationReport(), start_id=read_cursor(db.session, BALANCE_CURSOR),
+                max_seconds=BALANCE_RECONCILIATION_MAX_SECONDS,
+            )
+            write_cursor(db.session, BALANCE_CURSOR, report.balances_resume_from)
+            if report.balances_drifted:
+                logger.warning(f"Customer balance reconciliation repaired drift: {report.as_dict()}")
+            if not report.balances_completed:
+                logger.warning(
+                    f"Customer balance reconciliation stopped at customer {report.balances_resume_from} (time budget)"
+                )
+        except Exception as e:
+            logger.error(f"Error during customer balance reconciliation: {e}", exc_info=True)
+            db.session.rollback()
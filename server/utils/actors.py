@@ -0,0 +1,17 @@
+from server.models import User
+
+# Keep IN (...) lists well under the bound-parameter limits of SQLite/Postgres
+IN_CHUNK_SIZE = 1000
+
+
+def resolve_actors(user_ids):
+    """
+    Load the users behind a page of rows with one IN query per chunk.
+    Returns {user_id: User}; ids without a user are simply missing.
+    """
+    ids = list({user_id for user_id in user_ids if user_id is not None})
+    actors = {}
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        for user in User.query.filter(User.id.in_(ids[start:start + IN_CHUNK_SIZE])):
+            actors[user.id] = user
+    return actors
@@ -0,0 +1,173 @@
+"""
+Analytics expressions that compile for both Postgres and SQLite, so the
+dashboards and jobs run unchanged on a local SQLite database.
+"""
+import math
+from sqlalchemy import case, func, literal_column, null, select, union_all
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import DateTime, Float, Integer, Text
+
+SECONDS_PER_DAY = 86400
+
+TRUNC_UNITS = ("hour", "day", "week", "month", "year")
+
+# SQLite datetime() modifiers per unit; weeks start on Monday like Postgres
+_SQLITE_TRUNC = {
+    "day": ("start of day",),
+    "week": ("-6 days", "weekday 1", "start of day"),
+    "month": ("start of month",),
+    "year": ("start of year",),
+}
+
+
+class days_between(FunctionElement):
+    """Fractional days from ``earlier`` to ``later`` (negative if later is before)."""
+    type = Float()
+    inherit_cache = True
+    name = "days_between"
+
+    def __init__(self, later, earlier):
+        super().__init__(later, earlier)
+
+
+@compiles(days_between)
+def _days_between_default(element, compiler, **kw):
+    later, earlier = element.clauses
+    return "CAST(EXTRACT(EPOCH FROM (%s - %s)) AS DOUBLE PRECISION) / %d" % (
+        compiler.process(later, **kw), compiler.process(earlier, **kw), SECONDS_PER_DAY
+    )
+
+
+@compiles(days_between, "sqlite")
+def _days_between_sqlite(element, compiler, **kw):
+    later, earlier = element.clauses
+    return "(julianday(%s) - julianday(%s))" % (compiler.process(later, **kw), compiler.process(earlier, **kw))
+
+
+class whole_days_between(FunctionElement):
+    """``days_between`` floored to an integer, like ``timedelta.days``."""
+    type = Integer()
+    inherit_cache = True
+    name = "whole_days_between"
+
+    def __init__(self, later, earlier):
+        super().__init__(later, earlier)
+
+
+@compiles(whole_days_between)
+def _whole_days_between_default(element, compiler, **kw):
+    return "CAST(FLOOR(%s) AS INTEGER)" % compiler.process(days_between(*element.clauses), **kw)
+
+
+@compiles(whole_days_between, "sqlite")
+def _whole_days_between_sqlite(element, compiler, **kw):
+    # CAST truncates toward zero; step negative fractions down one day
+    days = compiler.process(days_between(*element.clauses), **kw)
+    return "(CAST(%s AS INTEGER) - (%s < CAST(%s AS INTEGER)))" % (days, days, days)
+
+
+class date_trunc(FunctionElement):
+    """``expr`` truncated to the start of its hour/day/week/month/year."""
+    type = DateTime()
+    inherit_cache = True
+    name = "date_trunc"
+
+    def __init__(self, unit, expr):
+        if unit not in TRUNC_UNITS:
+            raise ValueError(f"unit must be one of {', '.join(TRUNC_UNITS)}")
+        self.unit = unit
+        # The unit is a clause too, so it is part of the statement cache key
+        super().__init__(literal_column(f"'{unit}'"), expr)
+
+
+@compiles(date_trunc)
+def _date_trunc_default(element, compiler, **kw):
+    return "date_trunc(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(date_trunc, "sqlite")
+def _date_trunc_sqlite(element, compiler, **kw):
+    expr = list(element.clauses)[1]
+    if element.unit == "hour":
+        truncated = func.strftime("%Y-%m-%d %H:00:00", expr)
+    else:
+        truncated = func.datetime(expr, *_SQLITE_TRUNC[element.unit])
+    # Inline the format strings so GROUP BY repeats the very same expression
+    return compiler.process(truncated, **{**kw, "literal_binds": True})
+
+
+class string_agg(FunctionElement):
+    """``expr`` of the group's rows joined with ``separator`` (NULLs skipped)."""
+    type = Text()
+    inherit_cache = True
+    name = "string_agg"
+
+    def __init__(self, expr, separator):
+        super().__init__(expr, separator)
+
+
+@compiles(string_agg)
+def _string_agg_default(element, compiler, **kw):
+    return "string_agg(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(string_agg, "sqlite")
+def _string_agg_sqlite(element, compiler, **kw):
+    return "group_concat(%s)" % compiler.process(element.clauses, **kw)
+
+
+def bucket(expr, bounds, labels):
+    """
+    CASE expression putting ``expr`` into ``labels[i]`` for the first
+    ``expr <= bounds[i]``, or the last label above every bound.
+    """
+    if len(labels) != len(bounds) + 1:
+        raise ValueError("bucket needs one more label than bounds")
+    return case(
+        *[(expr <= bound, label) for bound, label in zip(bounds, labels)],
+        else_=labels[-1],
+    )
+
+
+def percentile(session, values, fraction):
+    """
+    Continuous percentile (0..1) of the single column selected by
+    ``values``, or None when it selects no rows. Postgres uses
+    percentile_cont; elsewhere the two neighbouring rows are read and
+    interpolated.
+    """
+    if not 0 <= fraction <= 1:
+        raise ValueError("fraction must be between 0 and 1")
+    subquery = values.subquery()
+    column = list(subquery.c)[0]
+
+    if session.get_bind().dialect.name == "postgresql":
+        result = session.execute(
+            select(func.percentile_cont(fraction).within_group(column.asc())).select_from(subquery)
+        ).scalar()
+        return float(result) if result is not None else None
+
+    present = select(column).where(column.isnot(None))
+    count = session.execute(select(func.count()).select_from(present.subquery())).scalar()
+    if not count:
+        return None
+    rank = fraction * (count - 1)
+    low = math.floor(rank)
+    rows = session.execute(present.order_by(column.asc()).offset(low).limit(2)).scalars().all()
+    if len(rows) == 1 or rank == low:
+        return float(rows[0])
+    return float(rows[0]) + (float(rows[1]) - float(rows[0])) * (rank - low)
+
+
+def with_rollup(session, stmt, group_column):
+    """
+    ``stmt`` (first column ``group_column``, the rest aggregates) grouped
+    per group plus one grand total row whose group is NULL: GROUP BY
+    ROLLUP on Postgres, a UNION ALL of both groupings elsewhere.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        return stmt.group_by(func.rollup(group_column))
+    columns = list(stmt.selected_columns)
+    total = stmt.with_only_columns(null().label(columns[0].name), *columns[1:], maintain_column_froms=True)
+    return union_all(stmt.group_by(group_column), total)
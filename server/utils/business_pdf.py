@@ -43,13 +43,13 @@ def generate_dashboard_pdf(dashboard_data):
     elements.append(Paragraph("Top Debtors", subtitle_style))
     customers = dashboard_data.get("customer_segmentation", {}).get("top_debtors", [])
     if customers:
-        cust_data = [["Customer", "Phone", "Amount Due", "Status"]]
+        cust_data = [["Customer", "Phone", "Amount Due", "Open Debts"]]
         for cust in customers:
             cust_data.append([
                 cust['customer'],
                 cust['phone'],
                 f"{cust['amount']:.2f}",
-                cust['status']
+                cust['open_debts']
             ])
         cust_table = Table(cust_data, hAlign='LEFT')
         cust_table.setStyle(TableStyle([
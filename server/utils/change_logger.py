@@ -1,21 +1,221 @@
-from server.extension import db
-from server.models import ChangeLog
+import logging
+import queue
+import threading
+import time
+from datetime import date, datetime
+from flask import current_app, g, has_app_context
 from flask_jwt_extended import get_jwt_identity
-from datetime import datetime
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.orm import Session
+from server.extension import db
+from server.models import ChangeLog, User
+from server.utils.change_tracking import TRACKED_MODELS, allocate_change_seq, business_id_for
+from server.utils.changelog_versions import assign_versions
+
+logger = logging.getLogger(__name__)
+
+
+# Bookkeeping columns that would turn every entry into a change
+SNAPSHOT_EXCLUDE = ("change_seq",)
+
+
+def snapshot(obj):
+    """Column values of a model instance as JSON-safe data (no relationships)."""
+    data = {}
+    for attr in inspect(obj).mapper.column_attrs:
+        if attr.key in SNAPSHOT_EXCLUDE:
+            continue
+        value = getattr(obj, attr.key)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        data[attr.key] = value
+    return data
+
+
+def _resolve(entry):
+    """Turn a buffered entry into a changelogs row, snapshotting its entity now."""
+    row = dict(entry)
+    entity = row.pop("entity", None)
+    if entity is not None:
+        row["state"] = snapshot(entity)
+        if row["entity_id"] is None:
+            row["entity_id"] = entity.id
+    return row
+
+
+def entity_business_id(entity):
+    """Business an entity belongs to, if it has one."""
+    if isinstance(entity, TRACKED_MODELS):
+        return business_id_for(db.session, entity)
+    return getattr(entity, "business_id", None)
+
+
+def write_changelog_rows(session, entries):
+    """
+    Insert changelog entries (versioned against their entity's history)
+    with one multi-row INSERT and move the data version of their
+    businesses (Core inserts skip the flush hook). Entries without a
+    business belong to their actor's.
+    """
+    if not entries:
+        return
+    rows = [_resolve(entry) for entry in entries]
+
+    actor_ids = {row["changed_by"] for row in rows if row.get("business_id") is None and row["changed_by"] is not None}
+    if actor_ids:
+        actor_businesses = dict(session.query(User.id, User.business_id).filter(User.id.in_(actor_ids)))
+        for row in rows:
+            if row.get("business_id") is None:
+                row["business_id"] = actor_businesses.get(row["changed_by"])
+    for row in rows:
+        row.setdefault("business_id", None)
+
+    assign_versions(session, rows)
+    session.execute(insert(ChangeLog), rows)
+
+    for business_id in sorted({row["business_id"] for row in rows if row["business_id"] is not None}):
+        allocate_change_seq(session, business_id)
+
+
+class ChangeLogQueue:
+    """
+    Bounded background writer for long jobs. Entries are written in their
+    own transaction once ``batch_size`` are waiting or ``interval`` seconds
+    have passed; ``put`` blocks while the queue is full.
+    """
+
+    def __init__(self, app, maxsize=1000, batch_size=200, interval=2.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._closed = object()
+        self._thread = threading.Thread(target=self._run, name="changelog-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def put(self, entry):
+        self._queue.put(entry)
 
-def log_change(entity_type, entity_id, action, details=None):
+    def close(self):
+        """Write whatever is left and stop the writer thread."""
+        self._queue.put(self._closed)
+        self._thread.join()
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                entry = None
+
+            if entry is self._closed:
+                self._write(batch)
+                return
+            if entry is not None:
+                batch.append(entry)
+                if deadline is None:
+                    deadline = time.monotonic() + self.interval
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                batch = []
+                deadline = None
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            with self.app.app_context():
+                with Session(db.engine) as session, session.begin():
+                    write_changelog_rows(session, batch)
+        except Exception:
+            logger.error("Failed to write %d changelog entries", len(batch), exc_info=True)
+
+
+class queued_changelog:
+    """
+    Route changelog entries of the current app context to a ChangeLogQueue:
+
+        with app.app_context(), queued_changelog(app):
+            ...
+    """
+
+    def __init__(self, app=None, **options):
+        self.app = app
+        self.options = options
+
+    def __enter__(self):
+        app = self.app or current_app._get_current_object()
+        self.queue = ChangeLogQueue(app, **self.options).start()
+        self.previous = g.get("changelog_queue")
+        g.changelog_queue = self.queue
+        return self.queue
+
+    def __exit__(self, *exc_info):
+        g.changelog_queue = self.previous
+        self.queue.close()
+        return False
+
+
+def record_change(entry):
+    """Hand an entry to the job's queue, or buffer it until the session commits."""
+    changelog_queue = g.get("changelog_queue")
+    if changelog_queue is not None:
+        changelog_queue.put(entry)
+        return
+    if "changelog_buffer" not in g:
+        g.changelog_buffer = []
+    g.changelog_buffer.append(entry)
+
+
+def log_change(entity_type, entity_id, action, details=None, entity=None, business_id=None):
+    """
+    Buffer a changelog entry. Pass ``entity`` instead of ``details`` to add
+    the entry to that entity's history (its columns are read when the entry
+    is written and stored as a snapshot or a diff). The entry belongs to
+    ``business_id``, else the entity's business, else the actor's.
+    """
     try:
         user_id = get_jwt_identity()
     except RuntimeError:
         user_id = None  # In case JWT is not active in this context
 
-    log_entry = ChangeLog(
-        entity_type=entity_type,
-        entity_id=entity_id,
-        action=action,
-        changed_by=user_id,
-        timestamp=datetime.utcnow(),
-        details=details or {}
-    )
-    db.session.add(log_entry)
-    
+    record_change({
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "action": action,
+        "changed_by": user_id,
+        "business_id": business_id if business_id is not None or entity is None else entity_business_id(entity),
+        "timestamp": datetime.utcnow(),
+        "details": details or {},
+        "entity": entity,
+    })
+
+
+def _flush_changelog_buffer(session):
+    if not has_app_context() or session is not db.session():
+        return
+    entries = g.get("changelog_buffer")
+    if entries:
+        g.changelog_buffer = []
+        # Flush first so snapshots see ids and onupdate values
+        session.flush()
+        write_changelog_rows(session, entries)
+
+
+def _discard_changelog_buffer(session, previous_transaction):
+    if has_app_context() and session is db.session() and not session.in_transaction():
+        g.pop("changelog_buffer", None)
+
+
+def init_changelog_writer():
+    """Write buffered changelog entries in the transaction that commits them."""
+    if not event.contains(Session, "before_commit", _flush_changelog_buffer):
+        event.listen(Session, "before_commit", _flush_changelog_buffer)
+        event.listen(Session, "after_soft_rollback", _discard_changelog_buffer)
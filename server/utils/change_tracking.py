@@ -0,0 +1,132 @@
+# server/utils/change_tracking.py
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from server.extension import db
+from server.models import Business, ChangeLog, Customer, Debt, Item, Payment, SyncCounter, SyncTombstone, User
+from server.utils.upsert import dialect_insert
+
+# Rows that clients can pull through GET /sync
+TRACKED_MODELS = (Customer, Debt, Item, Payment)
+
+# Rows that are not synced but still change what business endpoints return;
+# writing them bumps the business counter so cached responses go stale
+VERSIONED_MODELS = (ChangeLog, User, Business)
+
+
+def allocate_change_seq(session, business_id, count=1):
+    """
+    Reserve ``count`` consecutive change sequence numbers for a business and
+    return the last one. The counter row stays locked until commit, so writers
+    of the same business commit in sequence order and a cursor never skips
+    a row that commits late.
+    """
+    table = SyncCounter.__table__
+    stmt = (
+        update(table)
+        .where(table.c.business_id == business_id)
+        .values(value=table.c.value + count, updated_at=datetime.utcnow())
+        .returning(table.c.value)
+    )
+    last = session.execute(stmt).scalar()
+    if last is None:
+        session.execute(
+            dialect_insert(session, table)
+            .values(business_id=business_id, value=0, updated_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=[table.c.business_id])
+        )
+        last = session.execute(stmt).scalar()
+    return last
+
+
+def business_id_for(session, obj):
+    """Resolve the owning business of a tracked row."""
+    if isinstance(obj, (Customer, Debt)):
+        return obj.business_id
+    debt = obj.debt
+    if debt is None and obj.debt_id:
+        debt = session.get(Debt, obj.debt_id)
+    return debt.business_id if debt else None
+
+
+def versioned_business_id(session, obj):
+    """Resolve the business whose responses a versioned row shows up in."""
+    if isinstance(obj, Business):
+        return obj.id
+    if isinstance(obj, User):
+        return obj.business_id
+    if obj.business_id is not None:
+        return obj.business_id
+    actor = session.get(User, obj.changed_by) if obj.changed_by else None
+    return actor.business_id if actor else None
+
+
+def data_version(business_ids):
+    """
+    Current ``(version, last_modified)`` of the given businesses' data.
+    The version only grows, so it is safe to build validators from it.
+    """
+    if not business_ids:
+        return 0, None
+    version, last_modified = db.session.execute(
+        select(func.coalesce(func.sum(SyncCounter.value), 0), func.max(SyncCounter.updated_at))
+        .where(SyncCounter.business_id.in_(business_ids))
+    ).one()
+    return int(version), last_modified
+
+
+def _assign_change_seqs(session, flush_context, instances):
+    changed = defaultdict(list)
+    deleted = defaultdict(list)
+
+    for obj in session.new:
+        if isinstance(obj, TRACKED_MODELS):
+            changed[business_id_for(session, obj)].append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, TRACKED_MODELS) and session.is_modified(obj, include_collections=False):
+            changed[business_id_for(session, obj)].append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, TRACKED_MODELS) and obj.id is not None:
+            deleted[business_id_for(session, obj)].append(obj)
+
+    touched = set()
+    for obj in session.new:
+        # Changelog entries created without a tenant belong to their actor's business
+        if isinstance(obj, ChangeLog) and obj.business_id is None:
+            obj.business_id = versioned_business_id(session, obj)
+        if isinstance(obj, VERSIONED_MODELS):
+            touched.add(versioned_business_id(session, obj))
+    for obj in session.dirty:
+        if isinstance(obj, VERSIONED_MODELS) and session.is_modified(obj, include_collections=False):
+            touched.add(versioned_business_id(session, obj))
+    for obj in session.deleted:
+        if isinstance(obj, VERSIONED_MODELS):
+            touched.add(versioned_business_id(session, obj))
+
+    for business_id in set(changed) | set(deleted) | touched:
+        if business_id is None:
+            continue
+        rows, removed = changed[business_id], deleted[business_id]
+        # One extra number for versioned rows: it moves the counter, nothing is stamped with it
+        bump = 1 if business_id in touched else 0
+        seq = allocate_change_seq(session, business_id, len(rows) + len(removed) + bump) - len(rows) - len(removed) - bump
+
+        for obj in rows:
+            seq += 1
+            obj.change_seq = seq
+        for obj in removed:
+            seq += 1
+            session.add(SyncTombstone(
+                business_id=business_id,
+                entity_type=type(obj).__name__,
+                entity_id=obj.id,
+                change_seq=seq,
+                deleted_at=datetime.utcnow()
+            ))
+
+
+def init_change_tracking():
+    """Stamp tracked rows with a change sequence on every flush."""
+    if not event.contains(Session, "before_flush", _assign_change_seqs):
+        event.listen(Session, "before_flush", _assign_change_seqs)
@@ -0,0 +1,171 @@
+"""
+Field-level history for changelog entries.
+
+Entries logged with an entity store a full snapshot every
+CHANGELOG_SNAPSHOT_INTERVAL versions and a diff against the previous
+version otherwise; ``changelog_heads`` keeps the latest state to diff
+against so writers never replay history.
+"""
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import delete, select, tuple_
+from server.models import ChangeLog, ChangeLogHead
+from server.models.changelog import DETAILS_SNAPSHOT, DETAILS_DELTA, DETAILS_EVENT
+from server.utils.upsert import dialect_insert
+
+DEFAULT_SNAPSHOT_INTERVAL = 20
+
+# Keep IN (...) lists well under the bound-parameter limits of SQLite/Postgres
+IN_CHUNK_SIZE = 500
+
+
+def snapshot_interval():
+    return max(int(current_app.config.get("CHANGELOG_SNAPSHOT_INTERVAL", DEFAULT_SNAPSHOT_INTERVAL)), 1)
+
+
+def diff_states(old, new):
+    """Changes turning ``old`` into ``new``."""
+    return {
+        "set": {key: value for key, value in new.items() if key not in old or old[key] != value},
+        "unset": [key for key in old if key not in new],
+    }
+
+
+def apply_delta(state, delta):
+    state = dict(state)
+    state.update(delta.get("set", {}))
+    for key in delta.get("unset", []):
+        state.pop(key, None)
+    return state
+
+
+def _load_heads(session, keys):
+    """
+    ``{key: (version, state)}`` of the entities' heads, locked FOR UPDATE.
+    Missing heads are inserted first (version 0, ON CONFLICT DO NOTHING),
+    so two first writes to one entity queue on the same row instead of
+    both recording version 1.
+    """
+    heads = {}
+    keys = sorted(keys)
+    table = ChangeLogHead.__table__
+    now = datetime.utcnow()
+    for start in range(0, len(keys), IN_CHUNK_SIZE):
+        chunk = keys[start:start + IN_CHUNK_SIZE]
+        session.execute(
+            dialect_insert(session, table)
+            .values([
+                {"entity_type": entity_type, "entity_id": entity_id, "version": 0, "state": {}, "updated_at": now}
+                for entity_type, entity_id in chunk
+            ])
+            .on_conflict_do_nothing(index_elements=["entity_type", "entity_id"])
+        )
+        stmt = (
+            select(table.c.entity_type, table.c.entity_id, table.c.version, table.c.state)
+            .where(tuple_(table.c.entity_type, table.c.entity_id).in_(chunk))
+            .with_for_update()
+        )
+        for row in session.execute(stmt):
+            # A placeholder head has no state to diff against yet
+            heads[(row.entity_type, row.entity_id)] = (row.version, row.state) if row.version else (0, None)
+    return heads
+
+
+def assign_versions(session, rows):
+    """
+    Fill entity_version, details_format and details of changelog rows.
+    Rows carrying a ``state`` (entity snapshot) join the entity history;
+    the rest are stored as events. Heads are updated in the same session.
+    """
+    versioned = []
+    for row in rows:
+        if "state" in row:
+            versioned.append(row)
+        else:
+            row["entity_version"] = None
+            row["details_format"] = DETAILS_EVENT
+    if not versioned:
+        return
+
+    interval = snapshot_interval()
+    heads = _load_heads(session, {(row["entity_type"], row["entity_id"]) for row in versioned})
+    deleted = set()
+
+    for row in versioned:
+        key = (row["entity_type"], row["entity_id"])
+        state = row.pop("state")
+        version, previous = heads.get(key, (0, None))
+        version += 1
+
+        if previous is None or (version - 1) % interval == 0:
+            row["details_format"] = DETAILS_SNAPSHOT
+            row["details"] = state
+        else:
+            row["details_format"] = DETAILS_DELTA
+            row["details"] = diff_states(previous, state)
+        row["entity_version"] = version
+        heads[key] = (version, state)
+
+        if row["action"] == "delete":
+            deleted.add(key)
+        else:
+            deleted.discard(key)
+
+    changed = [key for key in {(row["entity_type"], row["entity_id"]) for row in versioned} if key not in deleted]
+    if changed:
+        stmt = dialect_insert(session, ChangeLogHead.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["entity_type", "entity_id"],
+            set_={"version": stmt.excluded.version, "state": stmt.excluded.state, "updated_at": stmt.excluded.updated_at},
+        )
+        now = versioned[-1]["timestamp"]
+        session.execute(stmt, [
+            {"entity_type": key[0], "entity_id": key[1], "version": heads[key][0], "state": heads[key][1], "updated_at": now}
+            for key in changed
+        ])
+    # A deleted entity has no next version to diff
+    if deleted:
+        table = ChangeLogHead.__table__
+        session.execute(delete(table).where(tuple_(table.c.entity_type, table.c.entity_id).in_(list(deleted))))
+
+
+def reconstruct(session, entity_type, entity_id, version):
+    """
+    State of an entity at ``version``: the nearest snapshot at or before it
+    with the following deltas applied. Returns None if that version was
+    never recorded.
+    """
+    table = ChangeLog.__table__
+    base = session.execute(
+        select(table.c.entity_version)
+        .where(
+            table.c.entity_type == entity_type,
+            table.c.entity_id == entity_id,
+            table.c.details_format == DETAILS_SNAPSHOT,
+            table.c.entity_version <= version,
+        )
+        .order_by(table.c.entity_version.desc())
+        .limit(1)
+    ).scalar()
+    if base is None:
+        return None
+
+    entries = session.execute(
+        select(table.c.entity_version, table.c.details_format, table.c.details)
+        .where(
+            table.c.entity_type == entity_type,
+            table.c.entity_id == entity_id,
+            table.c.entity_version.between(base, version),
+        )
+        .order_by(table.c.entity_version)
+    ).all()
+    if not entries or entries[-1].entity_version != version:
+        return None
+
+    state = None
+    for entry in entries:
+        if entry.details_format == DETAILS_SNAPSHOT:
+            state = dict(entry.details)
+        else:
+            state = apply_delta(state, entry.details)
+    return state
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
-from sqlalchemy import func, extract
+from sqlalchemy import func
 from server.models import db, User, Business, Debt, Customer, Item, ChangeLog, Payment
+from server.utils.analytics import bucket, date_trunc, whole_days_between
 
 class DashboardService:
     @staticmethod
@@ -60,37 +61,30 @@ class DashboardService:
 
     @staticmethod
     def get_time_based_analytics(business_ids, date_filter):
+        month = date_trunc("month", Debt.created_at).label("month")
         trends = (
-            db.session.query(
-                extract("year", Debt.created_at).label("year"),
-                extract("month", Debt.created_at).label("month"),
-                func.sum(Debt.total).label("total")
-            )
+            db.session.query(month, func.sum(Debt.total).label("total"))
             .join(Customer)
             .filter(Customer.business_id.in_(business_ids), *date_filter)
-            .group_by("year", "month")
-            .order_by("year", "month")
+            .group_by(month)
+            .order_by(month)
             .all()
         )
-        return [{"year": int(y), "month": int(m), "total": float(t)} for y, m, t in trends]
+        return [{"year": m.year, "month": m.month, "total": float(t)} for m, t in trends]
 
     @staticmethod
     def get_customer_segmentation(business_ids, date_filter):
+        now = datetime.utcnow()
+        days_overdue = whole_days_between(now, func.coalesce(Debt.due_date, now))
+        risk = bucket(days_overdue, (7, 30), ("low_risk", "medium_risk", "high_risk")).label("risk")
         segmentation = {"high_risk": 0, "medium_risk": 0, "low_risk": 0}
-        debts = db.session.query(Debt).join(Customer).filter(
-            Customer.business_id.in_(business_ids),
-            *date_filter
-        ).all()
-
-        for debt in debts:
-            if debt.balance > 0:
-                days_overdue = (datetime.utcnow() - (debt.due_date or datetime.utcnow())).days
-                if days_overdue > 30:
-                    segmentation["high_risk"] += 1
-                elif 7 < days_overdue <= 30:
-                    segmentation["medium_risk"] += 1
-                else:
-                    segmentation["low_risk"] += 1
+        segmentation.update(
+            db.session.query(risk, func.count(Debt.id))
+            .join(Customer)
+            .filter(Customer.business_id.in_(business_ids), *date_filter, Debt.balance > 0)
+            .group_by(risk)
+            .all()
+        )
         return segmentation
 
     @staticmethod
@@ -1,7 +1,11 @@
+import hashlib
+import time
+from datetime import datetime
 from functools import wraps
 from flask_jwt_extended import get_jwt, verify_jwt_in_request, get_jwt_identity
-from flask import g
-from server.models import User
+from flask import g, request, after_this_request, make_response
+from server.models import User, Business
+from server.utils.change_tracking import data_version
 from .roles import ROLE_SALESPERSON, ROLE_ADMIN, ROLE_OWNER, ALL_ROLES
 
 def role_required(*roles):
@@ -34,3 +38,67 @@ def role_required(*roles):
             return fn(*args, **kwargs)
         return decorator
     return wrapper
+
+
+def visible_business_ids(user):
+    """Businesses whose data can show up in the user's responses."""
+    business_ids = {user.business_id} if user.business_id else set()
+    if user.role == ROLE_OWNER:
+        business_ids.update(b.id for b in Business.query.with_entities(Business.id).filter_by(owner_id=user.id))
+    return sorted(business_ids)
+
+
+def conditional_get(time_bucket=None):
+    """
+    Weak ETag / Last-Modified validators for GET endpoints, built from the
+    per-business data version before the view runs. A matching If-None-Match
+    (or If-Modified-Since) returns 304 without running the view.
+    Must sit under role_required, which sets g.current_user.
+
+    time_bucket (seconds) is for views that depend on the clock as well
+    as the data (e.g. "overdue" dashboards): validators roll over with it.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(resource, *args, **kwargs):
+            # Only the resource serving the request; other views may call it directly
+            if request.endpoint is None or request.endpoint.rsplit(".", 1)[-1] != type(resource).__name__.lower():
+                return fn(resource, *args, **kwargs)
+
+            user = g.current_user
+            version, last_modified = data_version(visible_business_ids(user))
+            bucket = None
+            if time_bucket:
+                bucket = int(time.time() // time_bucket)
+                bucket_start = datetime.utcfromtimestamp(bucket * time_bucket)
+                last_modified = max(last_modified, bucket_start) if last_modified else bucket_start
+
+            key = "|".join(str(part) for part in (
+                request.path, sorted(request.args.items(multi=True)), user.id, user.role, version, bucket
+            ))
+            etag = hashlib.sha1(key.encode()).hexdigest()
+            last_modified = last_modified.replace(microsecond=0) if last_modified else None
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = bool(since and last_modified and last_modified <= since.replace(tzinfo=None))
+
+            if not_modified:
+                response = make_response("", 304)
+                response.set_etag(etag, weak=True)
+                return response
+
+            @after_this_request
+            def add_validators(response):
+                if response.status_code == 200:
+                    response.set_etag(etag, weak=True)
+                    if last_modified:
+                        response.last_modified = last_modified
+                    response.headers["Cache-Control"] = "private, no-cache"
+                return response
+
+            return fn(resource, *args, **kwargs)
+        return decorator
+    return wrapper
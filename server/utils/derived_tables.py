@@ -0,0 +1,52 @@
+"""
+Helpers for the tables derived from others by set-based statements
+(customer_balances, debt_search_documents, the stored debt totals) and
+for the SQLite FTS5 tables the search services read when present.
+"""
+import threading
+import weakref
+from sqlalchemy import text
+
+# Postgres and SQLite both cap bound parameters per statement
+ID_CHUNK = 1000
+
+_sqlite_tables = weakref.WeakKeyDictionary()
+_sqlite_tables_lock = threading.Lock()
+
+
+def id_chunks(ids):
+    """The distinct non-None ``ids``, sorted, in lists of at most ID_CHUNK."""
+    ids = sorted({value for value in ids if value is not None})
+    return [ids[start:start + ID_CHUNK] for start in range(0, len(ids), ID_CHUNK)]
+
+
+def refresh_in_chunks(session, model, write, chunks):
+    """
+    Flush pending changes, call ``write(chunk)`` for each chunk, then
+    expire the loaded ``model`` instances so they re-read the rows the
+    statements rewrote behind the ORM.
+    """
+    session.flush()
+    for chunk in chunks:
+        write(chunk)
+    for key in list(session.identity_map.keys()):
+        if key[0] is model:
+            session.expire(session.identity_map[key])
+
+
+def sqlite_table_exists(session, name):
+    """
+    Whether the session's SQLite database has table ``name``. Probed once
+    per engine: the FTS5 tables only come and go with migrations.
+    """
+    engine = session.get_bind()
+    with _sqlite_tables_lock:
+        known = _sqlite_tables.setdefault(engine, {})
+        if name in known:
+            return known[name]
+    exists = session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name").bindparams(name=name)
+    ).first() is not None
+    with _sqlite_tables_lock:
+        known[name] = exists
+    return exists
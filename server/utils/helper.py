@@ -1,5 +1,9 @@
+from datetime import datetime, timedelta
 from flask import request
 
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
 def parse_json(required_fields=None, allowed_roles=None):
     data = request.get_json(force=True) or {}
 
@@ -13,3 +17,41 @@ def parse_json(required_fields=None, allowed_roles=None):
 
     return data, None, None
 
+
+def parse_date_range(args):
+    """(start, end) datetimes from ?start_date/?end_date, end exclusive (day after end_date)."""
+    start = datetime.strptime(args["start_date"], "%Y-%m-%d") if args.get("start_date") else None
+    end = datetime.strptime(args["end_date"], "%Y-%m-%d") + timedelta(days=1) if args.get("end_date") else None
+    return start, end
+
+
+def pagination_args(default_per_page=DEFAULT_PER_PAGE, max_per_page=MAX_PER_PAGE):
+    """``(page, per_page)`` from the query string; raises ValueError."""
+    page = max(int(request.args.get("page", 1)), 1)
+    per_page = min(max(int(request.args.get("per_page", default_per_page)), 1), max_per_page)
+    return page, per_page
+
+
+def pagination(page, per_page, total):
+    """The ``pagination`` block of a paginated response."""
+    return {
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": (total + per_page - 1) // per_page,
+    }
+
+
+def paginated(key, query, page, per_page, dump):
+    """One page of ``query`` under ``key``, each row through ``dump``."""
+    result = query.paginate(page=page, per_page=per_page, error_out=False)
+    return {
+        key: [dump(row) for row in result.items],
+        "pagination": pagination(result.page, result.per_page, result.total),
+    }
+
+
+def normalize_email(email):
+    """Lower-cased, trimmed email, or None when empty."""
+    email = (email or "").strip().lower()
+    return email or None
@@ -0,0 +1,9 @@
+import orjson
+from flask import make_response
+
+
+def output_json(data, code, headers=None):
+    """Flask-RESTful representation for application/json encoded with orjson."""
+    resp = make_response(orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS) + b"\n", code)
+    resp.headers.extend(headers or {})
+    return resp
@@ -0,0 +1,41 @@
+import os
+import re
+
+# Country calling code assumed for numbers written in national format (0712 ...)
+DEFAULT_COUNTRY_CODE = os.getenv("DEFAULT_PHONE_COUNTRY_CODE", "254")
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def phone_digits(phone):
+    """Only the digits of ``phone``: "+254 712-345 678" -> "254712345678"."""
+    return _NON_DIGITS.sub("", phone or "")
+
+
+def national_number(phone, country_code=DEFAULT_COUNTRY_CODE):
+    """
+    The number without country code or trunk prefix, so the national and
+    international spellings compare equal: "0712 345 678" and
+    "+254712345678" both give "712345678".
+    """
+    digits = phone_digits(phone)
+    if digits.startswith(country_code):
+        return digits[len(country_code):]
+    if digits.startswith("0"):
+        return digits.lstrip("0")
+    return digits
+
+
+def normalize_phone(phone, country_code=DEFAULT_COUNTRY_CODE):
+    """
+    E.164-style key of a phone number: "0712 345 678", "712345678" and
+    "+254 712-345-678" all give "+254712345678". Numbers written with
+    another country code keep it. None when there are no digits.
+    """
+    digits = phone_digits(phone)
+    if not digits:
+        return None
+    if (phone or "").lstrip().startswith("+") or digits.startswith(country_code):
+        return f"+{digits}"
+    return f"+{country_code}{digits.lstrip('0')}"
+
@@ -0,0 +1,50 @@
+from functools import lru_cache
+from flask import request
+
+VIEW_SUMMARY = "summary"
+VIEW_FULL = "full"
+VIEWS = (VIEW_SUMMARY, VIEW_FULL)
+
+
+class ListProjection:
+    """
+    Turns ``?view=summary|full`` and ``?fields=a,b,c`` into a row serializer.
+
+    The serializer is built from ``schema_class(many=True, only=...)``, so the
+    chosen fields decide both the columns selected and the related tables
+    read. ``fields`` wins over ``view``; ``full`` is the default.
+    """
+
+    def __init__(self, schema_class, serializer_class, summary_fields, **schema_kwargs):
+        self.schema_class = schema_class
+        self.serializer_class = serializer_class
+        self.summary_fields = tuple(summary_fields)
+        self.schema_kwargs = schema_kwargs
+        self.serializer = lru_cache(maxsize=32)(self._build)
+
+    def _build(self, only):
+        schema = self.schema_class(many=True, only=only, **self.schema_kwargs)
+        return self.serializer_class(schema)
+
+    def field_names(self):
+        return list(self.serializer(None).schema.dump_fields)
+
+    def from_request(self):
+        """Return ``(serializer, error, status)`` for the current request."""
+        view = request.args.get("view", VIEW_FULL)
+        if view not in VIEWS:
+            return None, {"message": f"view must be one of: {', '.join(VIEWS)}"}, 400
+
+        requested = request.args.get("fields")
+        if requested:
+            wanted = {name.strip() for name in requested.split(",") if name.strip()}
+            known = self.field_names()
+            unknown = sorted(wanted - set(known))
+            if unknown:
+                return None, {"message": f"Unknown fields: {', '.join(unknown)}"}, 400
+            # Declared order keeps the output (and the cache key) stable
+            return self.serializer(tuple(name for name in known if name in wanted)), None, None
+
+        if view == VIEW_SUMMARY:
+            return self.serializer(self.summary_fields), None, None
+        return self.serializer(None), None, None
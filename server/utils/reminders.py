@@ -4,7 +4,8 @@ from flask import has_request_context
 from flask_jwt_extended import get_jwt_identity
 from sqlalchemy import or_
 from server.extension import db
-from server.models import ChangeLog, Debt
+from server.models import Debt
+from server.utils.change_logger import record_change
 
 REMINDER_COOLDOWN_DAYS = 1  # avoid resending within 24h
 
@@ -15,25 +16,26 @@ def should_send_today_qexpr(now=None):
     return or_(Debt.last_reminder_sent.is_(None), Debt.last_reminder_sent < cutoff)
 
 def log_reminder(debt, channel, reminder_type, status="sent", actor_user_id=None):
-    """Create a ChangeLog row for a reminder (works with/without request ctx)."""
+    """Record a changelog entry for a reminder (works with/without request ctx)."""
     try:
         if actor_user_id is None and has_request_context():
             actor_user_id = get_jwt_identity()
     except Exception:
         actor_user_id = actor_user_id  # leave as passed (None/system)
 
-    entry = ChangeLog(
-        entity_type="Debt",
-        entity_id=debt.id,
-        action="reminder",
-        changed_by=actor_user_id,  # None == system/auto
-        details={
+    record_change({
+        "entity_type": "Debt",
+        "entity_id": debt.id,
+        "action": "reminder",
+        "changed_by": actor_user_id,  # None == system/auto
+        "business_id": debt.business_id,
+        "timestamp": datetime.utcnow(),
+        "details": {
             "channel": channel,                
             "reminder_type": reminder_type,     
             "status": status,
             "debt_status": debt.status,
             "balance": float(debt.balance),
             "due_date": debt.due_date.isoformat() if debt.due_date else None,
-        }
-    )
-    db.session.add(entry)
+        },
+    })
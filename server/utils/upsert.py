@@ -0,0 +1,16 @@
+from sqlalchemy import insert
+
+
+def dialect_insert(session, table):
+    """
+    Return an INSERT construct for the session's dialect so callers can use
+    ``on_conflict_do_nothing`` / ``on_conflict_do_update`` on Postgres and SQLite.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(table)
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(table)
+    return insert(table)